@@ -1,23 +1,33 @@
 """FastAPI application — serves REST API for the Next.js frontend."""
 
+import asyncio
 import threading
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from api.routers import admin, ai, alerts, auth, feed, market, news, portfolio, watchlist
+from api.routers import admin, ai, alerts, auth, feed, market, news, portfolio, stream, watchlist
 
 
 def _startup_preload():
     """Run all startup preloads sequentially in a background thread."""
-    from services.yahoo_finance import preload_popular_stocks
+    from services.price_refresher import price_refresher
     from api.routers.ai import _ensure_pool
 
-    # 1. Preload prices & sparklines for popular stocks
-    preload_popular_stocks()
+    # 1. Warm prices & sparklines for the hot ticker set, then keep them warm
+    try:
+        price_refresher.run_cycle()
+    except Exception as e:
+        print(f"[Startup] Hot ticker warm-up failed: {e}")
+    price_refresher.start(run_immediately=False)
+
+    # 2. Start evaluating price alerts against the price hub
+    from services.alert_engine import alert_engine
 
-    # 2. Pre-generate matchmaker pool so first user request is instant
+    alert_engine.start()
+
+    # 3. Pre-generate matchmaker pool so first user request is instant
     try:
         _ensure_pool(force=False)
     except Exception as e:
@@ -26,10 +36,33 @@ def _startup_preload():
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Apply pending schema migrations before serving (no DDL runs on request paths)
+    from core.migrations import migrate_on_startup
+
+    await asyncio.to_thread(migrate_on_startup)
     # Startup: preload all data in background thread
     t = threading.Thread(target=_startup_preload, daemon=True)
     t.start()
+    # Async DB pool for the routers (connections are opened in the background)
+    from core.async_models import adb
+
+    try:
+        await adb.open()
+    except Exception as e:
+        print(f"[Startup] Async DB pool unavailable: {e}")
     yield
+    from services.alert_engine import alert_engine
+    from services.http_client import http_client
+    from services.notifier import notifier
+    from services.price_hub import price_hub
+    from services.price_refresher import price_refresher
+
+    alert_engine.stop()
+    notifier.stop()
+    price_hub.stop()
+    price_refresher.stop()
+    await http_client.aclose()
+    await adb.close()
 
 
 app = FastAPI(
@@ -56,6 +89,7 @@ app.include_router(portfolio.router)
 app.include_router(market.router)
 app.include_router(alerts.router)
 app.include_router(news.router)
+app.include_router(stream.router)
 app.include_router(watchlist.router)
 
 
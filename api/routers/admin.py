@@ -1,11 +1,10 @@
 """Admin-only endpoints."""
 
-import asyncio
-
 from fastapi import APIRouter, HTTPException, status
 
 from api.deps import CurrentUser
-from core.models import get_online_users, update_user_last_seen
+from core.async_models import adb, clear_user_last_seen, get_online_users, update_user_last_seen
+from core.models import db_pool
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
@@ -13,25 +12,14 @@ router = APIRouter(prefix="/api/admin", tags=["admin"])
 @router.post("/heartbeat")
 async def heartbeat(user: CurrentUser):
     """Update last_seen for the current user."""
-    await asyncio.to_thread(update_user_last_seen, user.user_id)
+    await update_user_last_seen(user.user_id)
     return {"ok": True}
 
 
 @router.post("/offline")
 async def offline(user: CurrentUser):
     """Clear last_seen when user closes the app."""
-    def _clear(uid: str):
-        from core.models import get_db_connection
-        try:
-            with get_db_connection() as conn:
-                c = conn.cursor()
-                c.execute("UPDATE users SET last_seen = NULL WHERE user_id = %s", (uid,))
-                conn.commit()
-                c.close()
-        except Exception:
-            pass
-
-    await asyncio.to_thread(_clear, user.user_id)
+    await clear_user_last_seen(user.user_id)
     return {"ok": True}
 
 
@@ -40,4 +28,38 @@ async def online_users(user: CurrentUser):
     """Return users active in the last 2 minutes. Admin only."""
     if user.role != "admin":
         raise HTTPException(status.HTTP_403_FORBIDDEN, "Admin only")
-    return await asyncio.to_thread(get_online_users)
+    return await get_online_users()
+
+
+@router.get("/metrics")
+async def metrics(user: CurrentUser):
+    """Runtime instrumentation (cache hit rates, evictions, coalesced fetches). Admin only."""
+    if user.role != "admin":
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Admin only")
+    from api.routers.stream import stream_stats
+    from services.alert_engine import alert_engine
+    from services.http_client import http_client
+    from services.market_cache import market_cache
+    from services.notifier import notifier
+    from services.price_hub import price_hub
+    from services.price_refresher import price_refresher
+    from services.shared_cache import shared_cache
+    from services.yahoo_finance import indicator_tracker, ohlcv_store, price_fetcher, price_revalidator, yf_download_flight
+
+    return {
+        "market_cache": market_cache.stats(),
+        "shared_cache": shared_cache.stats(),
+        "yf_download_coalescing": yf_download_flight.stats(),
+        "price_refresher": price_refresher.stats(),
+        "stale_while_revalidate": price_revalidator.stats(),
+        "price_fetch_tiers": price_fetcher.stats(),
+        "ohlcv_store": ohlcv_store.stats(),
+        "indicator_state": indicator_tracker.stats(),
+        "price_hub": price_hub.stats(),
+        "quote_stream": stream_stats(),
+        "alert_engine": alert_engine.stats(),
+        "notifier": notifier.stats(),
+        "http_client": http_client.stats(),
+        "db_async": adb.stats(),
+        "db_pool": db_pool.stats() if db_pool else {},
+    }
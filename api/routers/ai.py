@@ -15,17 +15,38 @@ from services.gemini_ai import (
     generate_port_doctor_diagnosis,
     generate_rebalance_strategy,
 )
-from services.yahoo_finance import get_advanced_stock_info, get_live_price, get_real_fear_and_greed, get_real_sector_rotation, get_sparkline_data, get_ticker_info, GLOBAL_PRICE_CACHE, GLOBAL_SPARKLINE_CACHE
+from services.shared_cache import shared_cache
+from services.yahoo_finance import get_advanced_stock_info, get_live_price, get_real_fear_and_greed, get_real_sector_rotation, get_sparkline_data, get_ticker_info, peek_cached_price, peek_cached_sparkline
 
 router = APIRouter(prefix="/api/ai", tags=["ai"])
 
-# ── Shared matchmaker pool (server-wide, all users share this) ──
-_POOL: list[dict] = []          # enriched recommendations pool
-_POOL_TIME: float = 0
+# ── Shared matchmaker pool (server-wide, all users and workers share this) ──
+# Lives in services/shared_cache.py so every uvicorn worker serves the same pool
+# and only one of them pays for a Gemini generation at a time.
+_POOL_KEY = "ai:matchmaker_pool"            # enriched recommendations pool
+_POOL_LEASE = "ai:matchmaker_pool:generate"  # held while a worker is generating
 _POOL_TTL = 86400 * 3           # 3 days
-_POOL_GENERATING = False        # prevent concurrent generation
-# Per-user tracking: which tickers each user has already seen
-_USER_SEEN: dict[str, set[str]] = {}  # user_id -> set of tickers
+_POOL_GENERATE_TIMEOUT = 300    # lease expiry if a generating worker dies
+# Per-user tracking: which tickers each user has already seen (ai:seen:<user_id>)
+_SEEN_KEY = "ai:seen:{}"
+
+
+def _get_pool() -> tuple[list[dict], float]:
+    hit = shared_cache.get(_POOL_KEY)
+    return (list(hit[0]), hit[1]) if hit is not None else ([], 0.0)
+
+
+def _pool_generating() -> bool:
+    return shared_cache.held(_POOL_LEASE)
+
+
+def _get_seen(uid: str) -> set[str]:
+    hit = shared_cache.get(_SEEN_KEY.format(uid))
+    return set(hit[0]) if hit is not None else set()
+
+
+def _set_seen(uid: str, seen: set[str]) -> None:
+    shared_cache.set(_SEEN_KEY.format(uid), seen)
 
 
 class PortDoctorRequest(BaseModel):
@@ -55,12 +76,12 @@ def _enrich_recommendation(rec: dict, fast: bool = False) -> dict:
     ticker = rec.get("ticker", "")
 
     # Price from preloaded cache
-    price = GLOBAL_PRICE_CACHE.get(ticker, 0.0)
+    price = peek_cached_price(ticker)
     if price <= 0 and not fast:
         price = get_live_price(ticker) or 0.0
 
     # Sparkline from preloaded cache
-    sparkline = GLOBAL_SPARKLINE_CACHE.get(ticker, [])
+    sparkline = peek_cached_sparkline(ticker)
     if not sparkline and not fast:
         spark_result = get_sparkline_data(ticker, days=30)
         sparkline = spark_result[0] if spark_result else []
@@ -90,19 +111,17 @@ def _enrich_recommendation(rec: dict, fast: bool = False) -> dict:
 
 def _ensure_pool(force: bool = False) -> None:
     """Generate or refresh the shared recommendation pool."""
-    global _POOL, _POOL_TIME, _POOL_GENERATING
-
+    pool, pool_time = _get_pool()
     now = time.time()
-    if not force and _POOL and (now - _POOL_TIME) < _POOL_TTL:
+    if not force and pool and (now - pool_time) < _POOL_TTL:
         return  # pool still valid
 
-    if _POOL_GENERATING:
-        return  # another request is already generating
+    if not shared_cache.acquire(_POOL_LEASE, _POOL_GENERATE_TIMEOUT):
+        return  # another request (possibly in another worker) is already generating
 
-    _POOL_GENERATING = True
     try:
         # Exclude tickers already in pool to get fresh ones
-        existing_tickers = {r.get("ticker", "").upper() for r in _POOL}
+        existing_tickers = {r.get("ticker", "").upper() for r in pool}
         recs = generate_matchmaker_pool(exclude_tickers=existing_tickers)
         if not recs:
             return
@@ -116,15 +135,15 @@ def _ensure_pool(force: bool = False) -> None:
                 enriched.append({**rec, "price": 0, "sparkline": []})
 
         if force:
-            existing_tickers_in_pool = {r.get("ticker", "").upper() for r in _POOL}
+            existing_tickers_in_pool = {r.get("ticker", "").upper() for r in pool}
             for e in enriched:
                 if e.get("ticker", "").upper() not in existing_tickers_in_pool:
-                    _POOL.append(e)
+                    pool.append(e)
         else:
-            _POOL = enriched
+            pool = enriched
 
         # Pre-warm price cache for all pool tickers in one batch call
-        pool_tickers = [r.get("ticker", "") for r in _POOL if r.get("ticker")]
+        pool_tickers = [r.get("ticker", "") for r in pool if r.get("ticker")]
         if pool_tickers:
             try:
                 from services.yahoo_finance import batch_get_prices
@@ -132,43 +151,46 @@ def _ensure_pool(force: bool = False) -> None:
             except Exception:
                 pass
 
-        _POOL_TIME = now
+        shared_cache.set(_POOL_KEY, pool, now)
     finally:
-        _POOL_GENERATING = False
+        shared_cache.release(_POOL_LEASE)
 
 
 def _run_matchmaker(uid: str, portfolio_tickers: list[str], watchlist_tickers: list[str]) -> list[dict]:
     """Synchronous matchmaker logic — runs in a thread pool."""
     from services.yahoo_finance import batch_get_prices
-    global _POOL, _POOL_GENERATING
 
     # Build exclusion set: portfolio + watchlist + already seen by this user
     exclude = {t.upper() for t in portfolio_tickers}
     exclude |= {t.upper() for t in watchlist_tickers}
-    exclude |= _USER_SEEN.get(uid, set())
+    exclude |= _get_seen(uid)
 
     _ensure_pool(force=False)
+    pool, _ = _get_pool()
 
     # If pool is still being generated (startup or expired), wait up to 90s
-    if not _POOL and _POOL_GENERATING:
+    if not pool and _pool_generating():
         waited = 0
-        while _POOL_GENERATING and waited < 90:
+        while _pool_generating() and waited < 90:
             time.sleep(1)
             waited += 1
         # If still empty after waiting, try one more time
-        if not _POOL:
+        pool, _ = _get_pool()
+        if not pool:
             _ensure_pool(force=False)
+            pool, _ = _get_pool()
 
-    available = [r for r in _POOL if r.get("ticker", "").upper() not in exclude]
+    available = [r for r in pool if r.get("ticker", "").upper() not in exclude]
 
     if len(available) < 10:
         _ensure_pool(force=True)
-        available = [r for r in _POOL if r.get("ticker", "").upper() not in exclude]
+        pool, _ = _get_pool()
+        available = [r for r in pool if r.get("ticker", "").upper() not in exclude]
 
     if len(available) < 5:
-        _USER_SEEN[uid] = set()
+        _set_seen(uid, set())
         exclude = {t.upper() for t in portfolio_tickers} | {t.upper() for t in watchlist_tickers}
-        available = [r for r in _POOL if r.get("ticker", "").upper() not in exclude]
+        available = [r for r in pool if r.get("ticker", "").upper() not in exclude]
 
     random.shuffle(available)
 
@@ -178,7 +200,7 @@ def _run_matchmaker(uid: str, portfolio_tickers: list[str], watchlist_tickers: l
     candidate_tickers = [r.get("ticker", "") for r in candidates if r.get("ticker")]
     if candidate_tickers:
         try:
-            batch_get_prices(candidate_tickers)  # warms GLOBAL_PRICE_CACHE
+            batch_get_prices(candidate_tickers)  # warms the shared price cache
         except Exception:
             pass
 
@@ -199,11 +221,12 @@ def _run_matchmaker(uid: str, portfolio_tickers: list[str], watchlist_tickers: l
             continue
 
     if skipped_tickers:
-        _POOL[:] = [r for r in _POOL if r.get("ticker", "") not in skipped_tickers]
+        pool, pool_time = _get_pool()
+        shared_cache.set(_POOL_KEY, [r for r in pool if r.get("ticker", "") not in skipped_tickers], pool_time)
 
-    seen = _USER_SEEN.get(uid, set())
+    seen = _get_seen(uid)
     seen |= {r.get("ticker", "").upper() for r in results}
-    _USER_SEEN[uid] = seen
+    _set_seen(uid, seen)
 
     return results
 
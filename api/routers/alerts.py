@@ -6,7 +6,8 @@ from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel, Field
 
 from api.deps import CurrentUser
-from core.models import delete_price_alert, get_user_price_alerts, set_user_price_alert
+from core.async_models import delete_price_alert, get_user_price_alerts, set_user_price_alert
+from services.alert_engine import alert_engine
 from services.yahoo_finance import batch_get_prices, get_live_price
 
 router = APIRouter(prefix="/api/alerts", tags=["alerts"])
@@ -18,9 +19,8 @@ class AlertCreate(BaseModel):
     condition: str = Field(pattern="^(above|below)$")
 
 
-def _build_alerts_response(uid: str) -> list:
+def _build_alerts_response(alerts: list) -> list:
     """Synchronous helper — runs in a thread pool."""
-    alerts = get_user_price_alerts(uid)
     if not alerts:
         return []
 
@@ -69,7 +69,8 @@ def _build_alerts_response(uid: str) -> list:
 
 @router.get("")
 async def list_alerts(user: CurrentUser):
-    enriched = await asyncio.to_thread(_build_alerts_response, user.user_id)
+    alerts = await get_user_price_alerts(user.user_id)
+    enriched = await asyncio.to_thread(_build_alerts_response, alerts)
     return {"alerts": enriched}
 
 
@@ -78,15 +79,17 @@ async def create_alert(user: CurrentUser, body: AlertCreate):
     if user.role.lower() == "free":
         raise HTTPException(status.HTTP_403_FORBIDDEN, "Upgrade to VIP or PRO to create price alerts")
 
-    ok = await asyncio.to_thread(set_user_price_alert, user.user_id, body.symbol, body.target_price, body.condition)
+    ok = await set_user_price_alert(user.user_id, body.symbol, body.target_price, body.condition)
     if not ok:
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to create alert")
+    alert_engine.request_resync()
     return {"ok": True, "symbol": body.symbol.upper()}
 
 
 @router.delete("/{alert_id}")
 async def remove_alert(alert_id: int, user: CurrentUser):
-    ok = await asyncio.to_thread(delete_price_alert, alert_id)
+    ok = await delete_price_alert(alert_id)
     if not ok:
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to delete alert")
+    alert_engine.request_resync()
     return {"ok": True}
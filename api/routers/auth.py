@@ -1,6 +1,5 @@
 """Auth endpoints — login, token-login, me."""
 
-import asyncio
 from hmac import compare_digest
 
 import jwt
@@ -15,7 +14,7 @@ from core.config import (
     AUTH_SHARED_PASSCODE,
     DASHBOARD_LOGIN_SECRET,
 )
-from core.models import get_user_by_telegram
+from core.async_models import get_user_by_telegram
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
@@ -91,7 +90,7 @@ async def login(body: LoginRequest):
     except ValueError:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid Telegram ID")
 
-    user = await asyncio.to_thread(get_user_by_telegram, tid_int)
+    user = await get_user_by_telegram(tid_int)
     if not user:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "User not found")
 
@@ -113,7 +112,7 @@ async def token_login(body: TokenLoginRequest):
     except ValueError:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid telegram_id in token")
 
-    user = await asyncio.to_thread(get_user_by_telegram, tid_int)
+    user = await get_user_by_telegram(tid_int)
     if not user:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "User not found")
 
@@ -122,7 +121,7 @@ async def token_login(body: TokenLoginRequest):
 
 @router.get("/me")
 async def me(user: CurrentUser):
-    user_info = await asyncio.to_thread(get_user_by_telegram, int(user.telegram_id))
+    user_info = await get_user_by_telegram(int(user.telegram_id))
     if not user_info:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "User not found")
     return {
@@ -140,7 +139,7 @@ async def refresh_token(user: CurrentUser):
     """Re-issue JWT with the latest role from DB.
     Call this after admin promotes/changes a user role so the JWT reflects the new role.
     """
-    user_info = await asyncio.to_thread(get_user_by_telegram, int(user.telegram_id))
+    user_info = await get_user_by_telegram(int(user.telegram_id))
     if not user_info:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "User not found")
     return _build_auth_response(user_info, user.telegram_id)
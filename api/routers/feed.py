@@ -1,12 +1,10 @@
 """Social Feed — community trade ideas & market views."""
 
-import asyncio
-
 from fastapi import APIRouter, HTTPException, Query, status
 from pydantic import BaseModel, Field
 
 from api.deps import CurrentUser
-from core.models import (
+from core.async_models import (
     add_post_comment,
     count_user_posts_today,
     create_feed_post,
@@ -16,6 +14,7 @@ from core.models import (
     get_post_comments,
     toggle_feed_like,
 )
+from core.models import decode_feed_cursor
 
 router = APIRouter(prefix="/api/feed", tags=["feed"])
 
@@ -36,11 +35,17 @@ class CommentCreate(BaseModel):
 @router.get("")
 async def list_posts(
     user: CurrentUser,
-    offset: int = Query(0, ge=0),
+    cursor: str | None = None,
     limit: int = Query(20, ge=1, le=50),
 ):
-    posts = await asyncio.to_thread(get_feed_posts, offset, limit, user.user_id)
-    return {"posts": posts}
+    """Newest posts first; pass the previous page's ``next_cursor`` to get the next one."""
+    before = None
+    if cursor:
+        try:
+            before = decode_feed_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid cursor")
+    return await get_feed_posts(limit, user.user_id, before)
 
 
 @router.post("")
@@ -48,13 +53,13 @@ async def create_post(user: CurrentUser, body: PostCreate):
     if user.role.lower() not in PRO_ROLES:
         raise HTTPException(status.HTTP_403_FORBIDDEN, "PRO or ADMIN required to post")
 
-    count = await asyncio.to_thread(count_user_posts_today, user.user_id)
+    count = await count_user_posts_today(user.user_id)
     if count >= DAILY_POST_LIMIT:
         raise HTTPException(status.HTTP_429_TOO_MANY_REQUESTS, f"Limit {DAILY_POST_LIMIT} posts per day")
 
     ticker = body.ticker.strip().upper() if body.ticker else None
-    post_id = await asyncio.to_thread(
-        create_feed_post, user.user_id, user.username, user.role.lower(), body.content.strip(), ticker
+    post_id = await create_feed_post(
+        user.user_id, user.username, user.role.lower(), body.content.strip(), ticker
     )
     if not post_id:
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to create post")
@@ -64,7 +69,7 @@ async def create_post(user: CurrentUser, body: PostCreate):
 @router.delete("/{post_id}")
 async def delete_post(post_id: int, user: CurrentUser):
     is_admin = user.role.lower() == "admin"
-    deleted = await asyncio.to_thread(delete_feed_post, post_id, user.user_id, is_admin)
+    deleted = await delete_feed_post(post_id, user.user_id, is_admin)
     if not deleted:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Post not found or not authorized")
     return {"ok": True}
@@ -72,20 +77,20 @@ async def delete_post(post_id: int, user: CurrentUser):
 
 @router.post("/{post_id}/like")
 async def like_post(post_id: int, user: CurrentUser):
-    result = await asyncio.to_thread(toggle_feed_like, post_id, user.user_id)
+    result = await toggle_feed_like(post_id, user.user_id)
     return result
 
 
 @router.get("/{post_id}/comments")
 async def list_comments(post_id: int, user: CurrentUser):
-    comments = await asyncio.to_thread(get_post_comments, post_id)
+    comments = await get_post_comments(post_id)
     return {"comments": comments}
 
 
 @router.delete("/{post_id}/comments/{comment_id}")
 async def delete_comment(post_id: int, comment_id: int, user: CurrentUser):
     is_admin = user.role.lower() == "admin"
-    deleted = await asyncio.to_thread(delete_post_comment, comment_id, user.user_id, is_admin)
+    deleted = await delete_post_comment(comment_id, user.user_id, is_admin)
     if not deleted:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Comment not found or not authorized")
     return {"ok": True}
@@ -96,8 +101,7 @@ async def create_comment(post_id: int, user: CurrentUser, body: CommentCreate):
     if user.role.lower() not in PRO_ROLES:
         raise HTTPException(status.HTTP_403_FORBIDDEN, "PRO or ADMIN required to comment")
 
-    cid = await asyncio.to_thread(
-        add_post_comment, post_id, user.user_id, user.username, user.role.lower(), body.content.strip()
+    cid = await add_post_comment(post_id, user.user_id, user.username, user.role.lower(), body.content.strip()
     )
     if not cid:
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to add comment")
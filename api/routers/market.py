@@ -1,19 +1,24 @@
 """Market data endpoints — charts, macro, indicators."""
 
 import asyncio
-import math
-import time
 
 from fastapi import APIRouter, Query
+from fastapi.responses import Response
 
 from api.deps import CurrentUser
 from core.config import MARKET_INDICES
+from services import chart_payload
+from services.market_cache import (
+    BENCHMARK_NS,
+    EARNINGS_NS,
+    LOGO_SLUG_NS,
+    MACRO_NS,
+    SP500_NS,
+    market_cache,
+)
 from services.yahoo_finance import (
-    calculate_bollinger_bands,
-    calculate_macd_series,
-    calculate_rsi_series,
-    get_candlestick_data,
-    get_live_price,
+    get_chart_series,
+    get_live_quote,
     get_market_summary,
     get_real_fear_and_greed,
     get_real_sector_rotation,
@@ -30,44 +35,28 @@ async def market_summary(user: CurrentUser):
     return {"indices": raw}
 
 
-def _build_chart(ticker: str, period: str, indicators: str) -> dict:
-    """Synchronous helper — safe to run in a thread."""
-    candles = get_candlestick_data(ticker, period=period)
-    if not candles:
-        return {"candles": [], "indicators": {}}
-
-    result: dict = {"candles": candles, "indicators": {}}
-    closes = [c["close"] for c in candles]
-    requested = {s.strip().lower() for s in indicators.split(",") if s.strip()}
-
-    def _clean(v):
-        if isinstance(v, float) and (math.isnan(v) or math.isinf(v)):
-            return None
-        return v
-
-    def _clean_list(lst):
-        return [_clean(x) for x in lst]
+_CHART_INDICATORS = {"rsi": ("rsi", 15), "macd": ("macd", 35), "bollinger": ("bollinger", 20)}
 
-    if "rsi" in requested and len(closes) >= 15:
-        result["indicators"]["rsi"] = _clean_list(calculate_rsi_series(closes))
 
-    if "macd" in requested and len(closes) >= 35:
-        macd_line, signal_line, histogram = calculate_macd_series(closes)
-        result["indicators"]["macd"] = {
-            "macd": _clean_list(macd_line),
-            "signal": _clean_list(signal_line),
-            "histogram": _clean_list(histogram),
-        }
-
-    if "bollinger" in requested and len(closes) >= 20:
-        upper, sma, lower = calculate_bollinger_bands(closes)
-        result["indicators"]["bollinger"] = [
-            _clean_list(upper),
-            _clean_list(sma),
-            _clean_list(lower),
-        ]
+def _build_chart(ticker: str, period: str, indicators: str, fmt: str = "rows", points: int | None = None, downsample: str = "minmax"):
+    """Synchronous helper — safe to run in a thread."""
+    requested = {s.strip().lower() for s in indicators.split(",") if s.strip()}
+    specs = [spec for name, (spec, _) in _CHART_INDICATORS.items() if name in requested]
+    try:
+        bars, values = get_chart_series(ticker, period, "1d", specs)
+    except Exception:
+        bars, values = None, {}
+    if bars is None or bars.empty:
+        return {"candles": [], "indicators": {}} if fmt == "rows" else {"ticker": ticker.upper(), "n": 0, "t": [], "indicators": {}}
 
-    return result
+    # Too few bars for an indicator → omit it rather than send an all-null line.
+    values = {spec: v for spec, v in values.items() if len(bars) >= _CHART_INDICATORS[spec][1]}
+    meta, columns = chart_payload.build_columns(bars, values, points, downsample)
+    if fmt == "binary":
+        return Response(chart_payload.encode_binary(meta, columns), media_type=chart_payload.BINARY_MEDIA_TYPE)
+    if fmt == "columnar":
+        return chart_payload.to_columnar(meta, columns)
+    return chart_payload.to_rows(meta, columns)
 
 
 @router.get("/chart/{ticker}")
@@ -76,19 +65,22 @@ async def chart_data(
     user: CurrentUser,
     period: str = Query("3mo", pattern="^(1mo|3mo|6mo|1y|2y|5y|10y|20y|max)$"),
     indicators: str = Query("", description="Comma-separated: rsi,macd,bollinger"),
+    format: str = Query("rows", pattern="^(rows|columnar|binary)$", description="rows (per-candle dicts), columnar (parallel arrays) or binary"),
+    points: int | None = Query(None, ge=50, le=20000, description="Downsample to at most this many bars"),
+    downsample: str = Query("minmax", pattern="^(minmax|lttb)$"),
 ):
-    return await asyncio.to_thread(_build_chart, ticker, period, indicators)
+    return await asyncio.to_thread(_build_chart, ticker, period, indicators, format, points, downsample)
 
 
 @router.get("/price/{ticker}")
 async def live_price(ticker: str, user: CurrentUser):
-    price = await asyncio.to_thread(get_live_price, ticker)
-    return {"ticker": ticker.upper(), "price": price or 0.0}
-
-
-_MACRO_CACHE: dict = {}
-_MACRO_CACHE_TIME: float = 0
-_MACRO_CACHE_TTL = 300  # 5 minutes
+    quote = await asyncio.to_thread(get_live_quote, ticker)
+    return {
+        "ticker": ticker.upper(),
+        "price": quote["price"] or 0.0,
+        "as_of": quote["as_of"],
+        "stale": quote["stale"],
+    }
 
 
 def _fetch_macro():
@@ -130,20 +122,10 @@ def _fetch_macro():
 
 @router.get("/macro")
 async def macro_data(user: CurrentUser):
-    import asyncio
-    global _MACRO_CACHE, _MACRO_CACHE_TIME
-
-    now = time.time()
-    if _MACRO_CACHE and (now - _MACRO_CACHE_TIME) < _MACRO_CACHE_TTL:
-        return _MACRO_CACHE
-
     try:
-        data = await asyncio.to_thread(_fetch_macro)
-        _MACRO_CACHE = data
-        _MACRO_CACHE_TIME = now
-        return data
+        return await asyncio.to_thread(market_cache.get_or_compute, MACRO_NS, "macro", _fetch_macro)
     except Exception:
-        return _MACRO_CACHE or {"fear_greed": {"value": 0, "text": "Unavailable"}, "vix": 0, "indices": {}, "sectors": {}}
+        return market_cache.peek(MACRO_NS, "macro") or {"fear_greed": {"value": 0, "text": "Unavailable"}, "vix": 0, "indices": {}, "sectors": {}}
 
 
 @router.get("/support-resistance/{ticker}")
@@ -207,11 +189,6 @@ _SP500_MCAP: dict[str, int] = {
     "VMC": 35, "MLM": 35, "PPG": 30, "ALB": 10,
 }
 
-_SP500_CACHE: dict = {}
-_SP500_CACHE_TIME: float = 0
-_SP500_CACHE_TTL = 300  # 5 minutes
-
-
 def _fetch_sp500_data() -> dict:
     import yfinance as yf
     all_tickers = [t for tickers in _SP500_BY_SECTOR.values() for t in tickers]
@@ -244,18 +221,10 @@ def _fetch_sp500_data() -> dict:
 @router.get("/sp500-heatmap")
 async def sp500_heatmap(user: CurrentUser):
     """Return S&P 500 stocks grouped by sector with today's price change. Cached 5 min."""
-    global _SP500_CACHE, _SP500_CACHE_TIME
-    import asyncio
-
-    now = time.time()
-    if _SP500_CACHE and (now - _SP500_CACHE_TIME) < _SP500_CACHE_TTL:
-        return _SP500_CACHE
-
-    data = await asyncio.to_thread(_fetch_sp500_data)
-    if data:
-        _SP500_CACHE = data
-        _SP500_CACHE_TIME = now
-    return data or _SP500_CACHE
+    data = await asyncio.to_thread(
+        market_cache.get_or_compute, SP500_NS, "heatmap", lambda: _fetch_sp500_data() or None, 90.0
+    )
+    return data or market_cache.peek(SP500_NS, "heatmap", {})
 
 
 # ── Economic Calendar ──
@@ -334,12 +303,11 @@ _LOGO_DIR = _pathlib.Path(__file__).resolve().parent.parent.parent / "static" /
 _LOGO_DIR.mkdir(parents=True, exist_ok=True)
 
 
-_SLUG_CACHE: dict = {}
-
 def _ticker_to_slug(ticker: str) -> list[str]:
     """Convert ticker to possible TradingView company-name slugs via yfinance."""
-    if ticker in _SLUG_CACHE:
-        return _SLUG_CACHE[ticker]
+    cached = market_cache.get(LOGO_SLUG_NS, ticker)
+    if cached is not None:
+        return cached
     import re
     try:
         from services.yahoo_finance import get_ticker_info
@@ -370,11 +338,11 @@ def _ticker_to_slug(ticker: str) -> list[str]:
             slugs = [slug]
             if first_word != slug:
                 slugs.append(first_word)
-            _SLUG_CACHE[ticker] = slugs
+            market_cache.set(LOGO_SLUG_NS, ticker, slugs)
             return slugs
     except Exception:
         pass
-    _SLUG_CACHE[ticker] = []
+    market_cache.set(LOGO_SLUG_NS, ticker, [])
     return []
 
 
@@ -397,9 +365,10 @@ def _make_fallback_svg(ticker: str) -> str:
 async def stock_logo(ticker: str):
     """Proxy stock logo from TradingView — cached to disk."""
     import asyncio
-    import httpx
     from fastapi.responses import Response, FileResponse
 
+    from services.http_client import http_client
+
     clean = ticker.strip().upper().replace(".BK", "")
 
     # Check disk cache first (includes previously saved fallbacks)
@@ -421,22 +390,21 @@ async def stock_logo(ticker: str):
         urls.append(f"https://s3-symbol-logo.tradingview.com/{slug}--big.svg")
     urls.append(f"https://s3-symbol-logo.tradingview.com/{clean.lower()}--big.svg")
 
-    async with httpx.AsyncClient(timeout=4.0, follow_redirects=True) as client:
-        for url in urls:
-            try:
-                resp = await client.get(url, headers=headers)
-                if resp.status_code == 200 and len(resp.content) > 100:
-                    content_type = resp.headers.get("content-type", "image/png")
-                    ext = ".svg" if "svg" in content_type else ".png"
-                    save_path = _LOGO_DIR / f"{clean}{ext}"
-                    save_path.write_bytes(resp.content)
-                    return Response(
-                        content=resp.content,
-                        media_type=content_type,
-                        headers={"Cache-Control": "public, max-age=86400"},
-                    )
-            except Exception:
-                continue
+    for url in urls:
+        try:
+            resp = await http_client.aget(url, headers=headers, timeout=4.0)
+            if resp.status_code == 200 and len(resp.content) > 100:
+                content_type = resp.headers.get("content-type", "image/png")
+                ext = ".svg" if "svg" in content_type else ".png"
+                save_path = _LOGO_DIR / f"{clean}{ext}"
+                save_path.write_bytes(resp.content)
+                return Response(
+                    content=resp.content,
+                    media_type=content_type,
+                    headers={"Cache-Control": "public, max-age=86400"},
+                )
+        except Exception:
+            continue
 
     # Fallback: save styled SVG to disk so we don't retry TradingView next time
     svg = _make_fallback_svg(clean)
@@ -446,11 +414,6 @@ async def stock_logo(ticker: str):
 
 
 # ── Earnings Calendar ──
-_EARNINGS_CACHE: dict = {}
-_EARNINGS_CACHE_TIME: float = 0
-_EARNINGS_CACHE_TTL = 3600  # 1 hour
-
-
 def _fetch_earnings(tickers: list[str]) -> list[dict]:
     """Fetch next earnings dates for a list of tickers using yfinance."""
     import yfinance as yf
@@ -509,37 +472,28 @@ def _fetch_earnings(tickers: list[str]) -> list[dict]:
 @router.get("/earnings-calendar")
 async def earnings_calendar(user: CurrentUser):
     """Return upcoming earnings dates for user's portfolio stocks. Cached 1 hour."""
-    import asyncio
-    global _EARNINGS_CACHE, _EARNINGS_CACHE_TIME
-
-    now = time.time()
     uid = user.user_id
 
     # Per-user cache key
     cache_key = f"earnings_{uid}"
-    if cache_key in _EARNINGS_CACHE and (now - _EARNINGS_CACHE_TIME) < _EARNINGS_CACHE_TTL:
-        return _EARNINGS_CACHE[cache_key]
+    cached = market_cache.get(EARNINGS_NS, cache_key)
+    if cached is not None:
+        return cached
 
     # Get user's portfolio tickers
-    from core.models import get_portfolio
-    portfolio = get_portfolio(uid)
+    from core.async_models import get_portfolio
+    portfolio = await get_portfolio(uid)
     tickers = [p["ticker"] for p in portfolio]
 
     if not tickers:
         return {"earnings": []}
 
-    data = await asyncio.to_thread(_fetch_earnings, tickers)
-    result = {"earnings": data}
-    _EARNINGS_CACHE[cache_key] = result
-    _EARNINGS_CACHE_TIME = now
-    return result
+    return await asyncio.to_thread(
+        market_cache.get_or_compute, EARNINGS_NS, cache_key, lambda: {"earnings": _fetch_earnings(tickers)}
+    )
 
 
 # ── Portfolio vs Benchmark ──
-_BENCH_CACHE: dict = {}
-_BENCH_CACHE_TTL = 600  # 10 minutes
-
-
 @router.get("/benchmark")
 async def portfolio_benchmark(
     user: CurrentUser,
@@ -547,18 +501,17 @@ async def portfolio_benchmark(
     benchmark: str = Query("SPY"),
 ):
     """Return portfolio growth vs benchmark (SPY/QQQ). Cached 10 min."""
-    import asyncio
     from services.yahoo_finance import get_portfolio_historical_growth
-    from core.models import get_portfolio
+    from core.async_models import get_portfolio
 
-    now = time.time()
     uid = user.user_id
     cache_key = f"bench_{uid}_{period}_{benchmark}"
 
-    if cache_key in _BENCH_CACHE and (now - _BENCH_CACHE.get(f"{cache_key}_t", 0)) < _BENCH_CACHE_TTL:
-        return _BENCH_CACHE[cache_key]
+    cached = market_cache.get(BENCHMARK_NS, cache_key)
+    if cached is not None:
+        return cached
 
-    portfolio = get_portfolio(uid)
+    portfolio = await get_portfolio(uid)
     if not portfolio:
         return {"labels": [], "portfolio_values": [], "benchmark_values": [], "benchmark_ticker": benchmark, "portfolio_metrics": {}, "benchmark_metrics": {}}
 
@@ -568,11 +521,11 @@ async def portfolio_benchmark(
     period_map = {"1mo": "1mo", "3mo": "3mo", "6mo": "6mo", "1y": "1y", "2y": "2y", "3y": "3y", "5y": "5y"}
     yf_period = period_map.get(period, "1y")
 
-    data = await asyncio.to_thread(
-        get_portfolio_historical_growth,
-        portfolio_items, period=yf_period, interval="1d", benchmark=benchmark.upper()
+    return await asyncio.to_thread(
+        market_cache.get_or_compute,
+        BENCHMARK_NS,
+        cache_key,
+        lambda: get_portfolio_historical_growth(
+            portfolio_items, period=yf_period, interval="1d", benchmark=benchmark.upper()
+        ),
     )
-
-    _BENCH_CACHE[cache_key] = data
-    _BENCH_CACHE[f"{cache_key}_t"] = now
-    return data
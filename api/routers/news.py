@@ -6,7 +6,7 @@ from concurrent.futures import ThreadPoolExecutor
 from fastapi import APIRouter
 
 from api.deps import CurrentUser
-from core.models import get_portfolio
+from core.async_models import get_portfolio
 from services.news_fetcher import fetch_stock_news_summary
 
 router = APIRouter(prefix="/api/news", tags=["news"])
@@ -16,7 +16,7 @@ _executor = ThreadPoolExecutor(max_workers=3)
 
 @router.get("")
 async def portfolio_news(user: CurrentUser):
-    portfolio = get_portfolio(user.user_id)
+    portfolio = await get_portfolio(user.user_id)
     tickers = [s["ticker"] for s in portfolio]
     if not tickers:
         return {"news": []}
@@ -1,16 +1,20 @@
 """Portfolio CRUD endpoints."""
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, status
 from pydantic import BaseModel, Field
 
+from api import versioning
 from api.deps import CurrentUser
-from core.models import (
+from core.async_models import (
     add_portfolio_stock,
     delete_portfolio_stock,
     get_portfolio,
     update_portfolio_stock,
 )
-from services.yahoo_finance import get_live_price, get_real_dividend_data, get_sparkline_data, get_usd_thb_rate, batch_get_prices
+from services.alert_engine import alert_engine
+from services.market_cache import FX_NS, PRICE_NS, SPARKLINE_NS, market_cache
+from services.portfolio_valuator import portfolio_valuator
+from services.yahoo_finance import get_real_dividend_data, get_usd_thb_rate, batch_get_prices, batch_get_sparklines
 
 router = APIRouter(prefix="/api/portfolio", tags=["portfolio"])
 
@@ -34,77 +38,93 @@ def _build_portfolio_response(portfolio: list, currency: str) -> dict:
     actual_thb_rate = get_usd_thb_rate()
     thb_rate = actual_thb_rate if currency == "THB" else 1.0
 
-    # Batch fetch all prices in ONE yfinance call (much faster than N individual calls)
+    # Batch fetch all prices/sparklines in ONE call each, then value every position at once
     tickers = [s["ticker"] for s in portfolio]
     prices = batch_get_prices(tickers)
+    sparklines = batch_get_sparklines(tickers)
+    val = portfolio_valuator.value(portfolio, prices, fx_rate=thb_rate)
 
-    items = []
-    total_value = 0.0
-    total_cost = 0.0
-
-    for stock in portfolio:
-        ticker = stock["ticker"]
-        shares = stock["shares"]
-        avg_cost = stock["avg_cost"]
-
-        price = prices.get(ticker, 0.0)
-        value = price * shares
-        cost = avg_cost * shares
-        pnl = value - cost
-        pnl_pct = (pnl / cost * 100) if cost > 0 else 0.0
-
-        spark_result = get_sparkline_data(ticker, days=7)
-        spark_values = spark_result[0] if spark_result else []
-
-        items.append({
+    items = [
+        {
             "ticker": ticker,
-            "shares": shares,
-            "avg_cost": round(avg_cost * thb_rate, 2),
-            "price": round(price * thb_rate, 2),
-            "value": round(value * thb_rate, 2),
-            "cost": round(cost * thb_rate, 2),
-            "pnl": round(pnl * thb_rate, 2),
-            "pnl_pct": round(pnl_pct, 2),
+            "shares": stock["shares"],
+            "avg_cost": avg_cost,
+            "price": price,
+            "value": value,
+            "cost": cost,
+            "pnl": pnl,
+            "pnl_pct": pnl_pct,
             "asset_group": stock.get("asset_group", "ALL"),
             "alert_price": stock.get("alert_price", 0.0),
-            "sparkline": spark_values,
-        })
-
-        total_value += value
-        total_cost += cost
-
-    total_pnl = total_value - total_cost
-    total_pnl_pct = (total_pnl / total_cost * 100) if total_cost > 0 else 0.0
+            "sparkline": sparklines.get(ticker) or [],
+        }
+        for stock, ticker, avg_cost, price, value, cost, pnl, pnl_pct in zip(
+            portfolio, val.tickers, val.rounded("avg_cost"), val.rounded("price"), val.rounded("value"),
+            val.rounded("cost"), val.rounded("pnl"), val.rounded("pnl_pct"),
+        )
+    ]
+    totals = val.totals
 
     return {
         "items": items,
         "summary": {
-            "total_value": round(total_value * thb_rate, 2),
-            "total_cost": round(total_cost * thb_rate, 2),
-            "total_pnl": round(total_pnl * thb_rate, 2),
-            "total_pnl_pct": round(total_pnl_pct, 2),
+            "total_value": round(totals["total_value"], 2),
+            "total_cost": round(totals["total_cost"], 2),
+            "total_pnl": round(totals["total_pnl"], 2),
+            "total_pnl_pct": round(totals["total_pnl_pct"], 2),
             "currency": currency,
             "thb_rate": round(actual_thb_rate, 4),
         },
     }
 
 
-def _get_portfolio_full(user_id: str, currency: str) -> dict:
-    """Synchronous helper — DB + yfinance in one thread."""
-    portfolio = get_portfolio(user_id)
+_EMPTY_PORTFOLIO = {"items": [], "summary": {"total_value": 0, "total_cost": 0, "total_pnl": 0, "total_pnl_pct": 0}}
+
+
+def _portfolio_version(portfolio: list, currency: str) -> str:
+    """Version of the response for ``portfolio`` — holdings plus the cache stamps of every quote it reads."""
+    tickers = [s["ticker"] for s in portfolio]
+    return versioning.compute_version(
+        currency,
+        portfolio,
+        versioning.quote_stamps(tickers, (PRICE_NS, SPARKLINE_NS)),
+        market_cache.stamps(FX_NS, ["USDTHB"]),
+    )
+
+
+def _get_portfolio_full(portfolio: list, currency: str, is_current=lambda version: False) -> tuple[str, dict | None]:
+    """Synchronous helper — yfinance/cache work for the holdings already loaded from the DB.
+
+    Returns ``(version, payload)``; payload is None when ``is_current(version)``
+    (the client already has it) and every quote is still fresh, so nothing is built.
+    """
+    version = _portfolio_version(portfolio, currency)
+    tickers = [s["ticker"] for s in portfolio]
+    fresh = versioning.quotes_fresh(tickers, (PRICE_NS, SPARKLINE_NS)) and market_cache.all_fresh(FX_NS, ["USDTHB"])
+    if fresh and is_current(version):
+        return version, None
     if not portfolio:
-        return {"items": [], "summary": {"total_value": 0, "total_cost": 0, "total_pnl": 0, "total_pnl_pct": 0}}
-    return _build_portfolio_response(portfolio, currency)
+        return version, _EMPTY_PORTFOLIO
+    payload = _build_portfolio_response(portfolio, currency)
+    # Building may have fetched quotes that were missing — stamp what was actually served.
+    return _portfolio_version(portfolio, currency), payload
 
 
 @router.get("")
-async def list_portfolio(user: CurrentUser, currency: str = "USD"):
+async def list_portfolio(request: Request, user: CurrentUser, currency: str = "USD", since: str | None = None):
+    """Holdings with live valuation. ``ETag``/``If-None-Match`` → 304; ``since=<version>`` → changed rows only."""
     import asyncio
 
     try:
-        return await asyncio.to_thread(_get_portfolio_full, user.user_id, currency)
+        portfolio = await get_portfolio(user.user_id) or []
+        version, payload = await asyncio.to_thread(
+            _get_portfolio_full, portfolio, currency, lambda v: versioning.not_modified(request, v)
+        )
     except Exception:
-        return {"items": [], "summary": {"total_value": 0, "total_cost": 0, "total_pnl": 0, "total_pnl_pct": 0}}
+        return _EMPTY_PORTFOLIO
+    if payload is None or versioning.not_modified(request, version):
+        return versioning.not_modified_response(version)
+    return versioning.versioned_response("portfolio", user.user_id, version, payload, key="ticker", since=since)
 
 
 STOCK_LIMITS = {"free": 3, "vip": 10}  # pro/admin = unlimited
@@ -112,20 +132,18 @@ STOCK_LIMITS = {"free": 3, "vip": 10}  # pro/admin = unlimited
 
 @router.post("", status_code=status.HTTP_201_CREATED)
 async def add_stock(user: CurrentUser, body: StockAdd):
-    import asyncio
-
     role = user.role.lower()
     limit = STOCK_LIMITS.get(role)
     if limit is not None:
-        current = await asyncio.to_thread(get_portfolio, user.user_id) or []
+        current = await get_portfolio(user.user_id) or []
         if len(current) >= limit:
             raise HTTPException(
                 status.HTTP_403_FORBIDDEN,
                 f"{role.upper()} can hold max {limit} stocks. Upgrade to unlock more!",
             )
 
-    ok = await asyncio.to_thread(
-        add_portfolio_stock, user.user_id, body.ticker, body.shares, body.avg_cost, body.asset_group
+    ok = await add_portfolio_stock(
+        user.user_id, body.ticker, body.shares, body.avg_cost, body.asset_group
     )
     if not ok:
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to add stock")
@@ -134,23 +152,25 @@ async def add_stock(user: CurrentUser, body: StockAdd):
 
 @router.put("/{ticker}")
 async def update_stock(ticker: str, user: CurrentUser, body: StockUpdate):
-    import asyncio
-
-    ok = await asyncio.to_thread(
-        update_portfolio_stock, user.user_id, ticker, body.shares, body.avg_cost, body.asset_group, body.alert_price
+    holdings = await get_portfolio(user.user_id) or []
+    old_alert = next((s["alert_price"] for s in holdings if s["ticker"].upper() == ticker.upper()), 0.0)
+    ok = await update_portfolio_stock(
+        user.user_id, ticker, body.shares, body.avg_cost, body.asset_group, body.alert_price
     )
     if not ok:
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to update stock")
+    if body.alert_price != old_alert:
+        # Evaluate the new level now, and stop the old one firing against its stale target
+        alert_engine.request_resync()
     return {"ok": True, "ticker": ticker.upper()}
 
 
 @router.delete("/{ticker}")
 async def remove_stock(ticker: str, user: CurrentUser):
-    import asyncio
-
-    ok = await asyncio.to_thread(delete_portfolio_stock, user.user_id, ticker)
+    ok = await delete_portfolio_stock(user.user_id, ticker)
     if not ok:
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, "Failed to delete stock")
+    alert_engine.request_resync()
     return {"ok": True, "ticker": ticker.upper()}
 
 
@@ -161,45 +181,34 @@ def _build_dividends_response(portfolio: list, currency: str) -> dict:
     prices = batch_get_prices(tickers)
     thb_rate = get_usd_thb_rate() if currency == "THB" else 1.0
 
-    items = []
-    total_annual = 0.0
-
-    for stock in portfolio:
-        ticker = stock["ticker"]
-        shares = stock["shares"]
-        price = prices.get(ticker, 0.0)
-        value = price * shares
+    yields = {t: div_data.get(t, {}).get("yield", 0) or 0 for t in tickers}
+    val = portfolio_valuator.value(portfolio, prices, fx_rate=thb_rate, dividend_yields=yields)
 
+    items = []
+    for stock, ticker, price, value, div_yield, annual_div, monthly_div in zip(
+        portfolio, val.tickers, val.rounded("price"), val.rounded("value"), val.rounded("div_yield"),
+        val.rounded("annual_div"), val.rounded("monthly_div"),
+    ):
         info = div_data.get(ticker, {})
-        div_yield = info.get("yield", 0)
-        amount_per_share = info.get("amount_per_share", 0)
-        ex_date = info.get("ex_date", "N/A")
-
-        annual_div = value * (div_yield / 100) if div_yield > 0 else 0
-        monthly_div = annual_div / 12
-
         items.append({
             "ticker": ticker,
-            "shares": shares,
-            "price": round(price * thb_rate, 2),
-            "value": round(value * thb_rate, 2),
-            "div_yield": round(div_yield, 2),
-            "amount_per_share": round(amount_per_share, 4),
-            "annual_div": round(annual_div * thb_rate, 2),
-            "monthly_div": round(monthly_div * thb_rate, 2),
-            "ex_date": ex_date,
+            "shares": stock["shares"],
+            "price": price,
+            "value": value,
+            "div_yield": div_yield,
+            "amount_per_share": round(info.get("amount_per_share", 0), 4),
+            "annual_div": annual_div,
+            "monthly_div": monthly_div,
+            "ex_date": info.get("ex_date", "N/A"),
         })
-        total_annual += annual_div
-
-    total_monthly = total_annual / 12
-    avg_yield = (sum(i["div_yield"] for i in items) / len(items)) if items else 0
+    totals = val.totals
 
     return {
         "items": items,
         "summary": {
-            "total_annual": round(total_annual * thb_rate, 2),
-            "total_monthly": round(total_monthly * thb_rate, 2),
-            "avg_yield": round(avg_yield, 2),
+            "total_annual": round(totals["total_annual_div"], 2),
+            "total_monthly": round(totals["total_monthly_div"], 2),
+            "avg_yield": round(totals["avg_yield"], 2),
             "currency": currency,
         },
     }
@@ -209,7 +218,7 @@ def _build_dividends_response(portfolio: list, currency: str) -> dict:
 async def portfolio_dividends(user: CurrentUser, currency: str = "USD"):
     import asyncio
 
-    portfolio = get_portfolio(user.user_id)
+    portfolio = await get_portfolio(user.user_id)
     if not portfolio:
         return {"items": [], "summary": {"total_annual": 0, "total_monthly": 0, "avg_yield": 0}}
 
@@ -0,0 +1,110 @@
+"""Live quotes pushed from the central price hub (services/price_hub.py)."""
+
+import json
+import threading
+import time
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+
+from api.deps import CurrentUser
+from api.routers.portfolio import STOCK_LIMITS
+from api.routers.watchlist import ROLE_LIMITS
+from core.config import MARKET_INDICES
+from services.price_hub import price_hub
+
+router = APIRouter(prefix="/api/stream", tags=["stream"])
+
+# Comment frame sent when nothing changed, so proxies keep the connection open
+_HEARTBEAT_SECONDS = 15.0
+# A frame that takes longer than this to drain means the client cannot keep up;
+# the stream ends and the client reconnects to a fresh snapshot.
+_SLOW_CLIENT_SECONDS = 10.0
+# Shared market symbols (ticker tape, VIX) never count against a role's cap
+_PUBLIC_SYMBOLS = frozenset(MARKET_INDICES) | {"^VIX", "THB=X"}
+
+_stats_lock = threading.Lock()
+_stats = {"open": 0, "connections": 0, "frames": 0, "capped": 0, "slow_disconnects": 0}
+
+
+def _count(**deltas: int) -> None:
+    with _stats_lock:
+        for key, n in deltas.items():
+            _stats[key] += n
+
+
+def stream_stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def stream_limit(role: str) -> int:
+    """Tickers one connection may follow: the role's portfolio cap plus its watchlist cap."""
+    watch = ROLE_LIMITS.get(role, 3)
+    return STOCK_LIMITS.get(role, watch) + watch
+
+
+def _apply_limit(tickers: list[str], limit: int) -> tuple[list[str], list[str]]:
+    """``(kept, dropped)`` — public symbols always kept, the rest in request order up to ``limit``."""
+    kept, dropped, counted = [], [], 0
+    for t in dict.fromkeys(t.strip().upper() for t in tickers if t.strip()):
+        if t in _PUBLIC_SYMBOLS:
+            kept.append(t)
+        elif counted < limit:
+            kept.append(t)
+            counted += 1
+        else:
+            dropped.append(t)
+    return kept, dropped
+
+
+def _sse(event: str, data: dict, seq: int | None = None) -> str:
+    frame = f"id: {seq}\n" if seq is not None else ""
+    return f"{frame}event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+@router.get("")
+async def stream_quotes(request: Request, user: CurrentUser, tickers: str = Query(..., min_length=1)):
+    """Server-Sent Events feed of delta quotes for a ticker set.
+
+    Frames:
+      - ``subscribed`` — ``{tickers, dropped, limit}``; tickers past the role's cap are dropped.
+      - ``quotes``     — ``{ticker: price}`` holding only prices that changed (the first one
+        carries every known price).
+      - ``: ping``     — heartbeat comment every 15s without changes.
+
+    Backpressure: the hub merges prices a slow client has not collected yet
+    (latest wins), so a client only ever receives the freshest value and
+    memory per connection is bounded by its ticker set. A client that takes
+    longer than 10s to drain one frame is disconnected.
+    """
+    limit = stream_limit(user.role.lower())
+    kept, dropped = _apply_limit(tickers.split(","), limit)
+
+    async def events():
+        sub = price_hub.subscribe(kept)
+        _count(open=1, connections=1, capped=1 if dropped else 0)
+        seq = 0
+        try:
+            yield "retry: 3000\n" + _sse("subscribed", {"tickers": kept, "dropped": dropped, "limit": limit})
+            while not await request.is_disconnected():
+                changes = await sub.get(timeout=_HEARTBEAT_SECONDS)
+                if not changes:
+                    yield ": ping\n\n"
+                    continue
+                seq += 1
+                started = time.monotonic()
+                yield _sse("quotes", changes, seq)
+                _count(frames=1)
+                if time.monotonic() - started > _SLOW_CLIENT_SECONDS:
+                    _count(slow_disconnects=1)
+                    break
+        finally:
+            sub.close()
+            _count(open=-1)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
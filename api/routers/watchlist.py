@@ -2,15 +2,17 @@
 
 import asyncio
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, status
 from pydantic import BaseModel
 
+from api import versioning
 from api.deps import CurrentUser
-from core.models import (
+from core.async_models import (
     get_user_watchlist,
     add_watchlist_item,
     remove_watchlist_item,
 )
+from services.market_cache import PRICE_NS, SPARKLINE_NS, TICKER_INFO_NS
 from services.yahoo_finance import batch_get_prices, get_sparkline_data, get_ticker_info
 
 router = APIRouter(prefix="/api/watchlist", tags=["watchlist"])
@@ -59,18 +61,40 @@ def _build_watchlist_response(tickers: list[str]) -> list:
     return items
 
 
+def _watchlist_version(tickers: list[str]) -> str:
+    """Version of the response for ``tickers`` — the list plus the cache stamps of every quote it reads."""
+    return versioning.compute_version(
+        tickers, versioning.quote_stamps(tickers, (PRICE_NS, SPARKLINE_NS, TICKER_INFO_NS))
+    )
+
+
+def _get_watchlist_full(tickers: list[str], is_current=lambda version: False) -> tuple[str, dict | None]:
+    """Synchronous helper — ``(version, payload)``, payload None when the client already has ``version``
+    and every quote is still fresh (expired ones are refetched by the build)."""
+    version = _watchlist_version(tickers)
+    if is_current(version) and versioning.quotes_fresh(tickers, (PRICE_NS, SPARKLINE_NS, TICKER_INFO_NS)):
+        return version, None
+    items = _build_watchlist_response(tickers)
+    return _watchlist_version(tickers), {"items": items}
+
+
 @router.get("")
-async def list_watchlist(user: CurrentUser):
-    tickers = await asyncio.to_thread(get_user_watchlist, user.user_id)
-    items = await asyncio.to_thread(_build_watchlist_response, tickers)
-    return {"items": items}
+async def list_watchlist(request: Request, user: CurrentUser, since: str | None = None):
+    """Watchlist quotes. ``ETag``/``If-None-Match`` → 304; ``since=<version>`` → changed rows only."""
+    tickers = await get_user_watchlist(user.user_id) or []
+    version, payload = await asyncio.to_thread(
+        _get_watchlist_full, tickers, lambda v: versioning.not_modified(request, v)
+    )
+    if payload is None or versioning.not_modified(request, version):
+        return versioning.not_modified_response(version)
+    return versioning.versioned_response("watchlist", user.user_id, version, payload, key="ticker", since=since)
 
 
 @router.post("")
 async def add_to_watchlist(user: CurrentUser, body: WatchlistAdd):
     role = user.role.lower()
     limit = ROLE_LIMITS.get(role, 3)
-    current = await asyncio.to_thread(get_user_watchlist, user.user_id)
+    current = await get_user_watchlist(user.user_id)
     if len(current) >= limit:
         raise HTTPException(
             status.HTTP_403_FORBIDDEN,
@@ -81,11 +105,11 @@ async def add_to_watchlist(user: CurrentUser, body: WatchlistAdd):
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Ticker required")
     if ticker in current:
         raise HTTPException(status.HTTP_409_CONFLICT, "Already in watchlist")
-    await asyncio.to_thread(add_watchlist_item, user.user_id, ticker)
+    await add_watchlist_item(user.user_id, ticker)
     return {"ok": True}
 
 
 @router.delete("/{ticker}")
 async def remove_from_watchlist(user: CurrentUser, ticker: str):
-    await asyncio.to_thread(remove_watchlist_item, user.user_id, ticker.upper())
+    await remove_watchlist_item(user.user_id, ticker.upper())
     return {"ok": True}
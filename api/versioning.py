@@ -0,0 +1,85 @@
+"""Version tokens for list endpoints — ETag / 304 and ``since=<version>`` deltas.
+
+A version is a short hash of everything a response is built from: the user's
+rows (holdings or watchlist tickers), request options such as currency, and
+the ``stored_at`` stamps of the cached quotes it reads. Stamps change exactly
+when the cached data changes, so the version can be computed *before* the
+response is built — a matching ``If-None-Match`` gets a 304 without touching
+prices, sparklines or JSON serialization. That shortcut is only taken while
+every quote is still within its namespace TTL (``quotes_fresh``); once one
+has expired the response is rebuilt, which refreshes the cache and so the
+version.
+
+Each full response also records a digest per row under its version. A client
+that sends ``since=<version>`` gets only rows whose digest changed plus the
+keys that disappeared; if that version is no longer known (expired, or built
+before a restart) the full response is returned with ``"delta": false``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Iterable
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+from services.market_cache import RESPONSE_VERSION_NS, market_cache
+
+
+def _digest(value: Any, size: int = 16) -> str:
+    raw = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(raw.encode(), digest_size=size // 2).hexdigest()
+
+
+def quote_stamps(tickers: list[str], namespaces: Iterable[str]) -> list:
+    """Cache stamps of ``tickers`` in each namespace, in a stable order."""
+    return [market_cache.stamps(ns, tickers) for ns in namespaces]
+
+
+def quotes_fresh(tickers: list[str], namespaces: Iterable[str]) -> bool:
+    """True while every quote of ``tickers`` in ``namespaces`` is within its TTL (safe to answer 304)."""
+    return all(market_cache.all_fresh(ns, tickers) for ns in namespaces)
+
+
+def compute_version(*parts: Any) -> str:
+    return _digest(parts)
+
+
+def etag(version: str) -> str:
+    return f'W/"{version}"'
+
+
+def not_modified(request: Request, version: str) -> bool:
+    """True when the request's ``If-None-Match`` already names ``version``."""
+    header = request.headers.get("if-none-match", "")
+    if not header:
+        return False
+    tags = {t.strip().removeprefix("W/").strip('"') for t in header.split(",")}
+    return version in tags or "*" in tags
+
+
+def not_modified_response(version: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag(version)})
+
+
+def versioned_response(scope: str, owner: str, version: str, payload: dict, key: str, since: str | None = None) -> JSONResponse:
+    """Full ``payload`` (or its delta against ``since``) with ``version`` in the body and ETag.
+
+    ``payload["items"]`` rows are identified by ``row[key]``. A delta keeps
+    every other top-level field and adds ``removed`` (keys no longer present).
+    """
+    items = payload.get("items") or []
+    digests = {str(row[key]): _digest(row) for row in items}
+    market_cache.set(RESPONSE_VERSION_NS, f"{scope}:{owner}:{version}", digests)
+
+    body = {**payload, "version": version}
+    if since:
+        previous = market_cache.get(RESPONSE_VERSION_NS, f"{scope}:{owner}:{since}")
+        body["since"] = since
+        body["delta"] = previous is not None
+        if previous is not None:
+            body["items"] = [row for row in items if previous.get(str(row[key])) != digests[str(row[key])]]
+            body["removed"] = [k for k in previous if k not in digests]
+    return JSONResponse(body, headers={"ETag": etag(version)})
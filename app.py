@@ -22,12 +22,14 @@ from urllib.parse import quote_plus
 # Components & Services
 from web.components import charts
 from web.components.ticker import create_ticker
+from web.components.price_stream import stream_prices
 from web.components.stats import create_stats_cards
 from web.components.table import create_portfolio_table, get_logo_url_for_ticker
 from web.components.charts import show_candlestick_chart
 from services.yahoo_finance import (
     get_sparkline_data,
     get_live_price,
+    get_close_history,
     update_global_cache_batch,
     get_real_dividend_data,
     get_portfolio_historical_growth,
@@ -37,7 +39,9 @@ from services.yahoo_finance import (
     get_real_sector_rotation,
     get_usd_thb_rate,
 )
+from services.dashboard_data import VIX_TICKER, get_dashboard_market_data
 from services.news_fetcher import fetch_stock_news_summary
+from services.portfolio_valuator import portfolio_valuator
 from services.gemini_ai import generate_apexify_report
 
 # DB & Auth
@@ -351,6 +355,11 @@ ui.add_head_html('''
 # ==========================================
 # หน้าต่างจัดการสินทรัพย์ (ADD & EDIT)
 # ==========================================
+def _resync_alerts():
+    """ให้ alert engine โหลดการแจ้งเตือนใหม่ทันที ไม่ต้องรอรอบ resync ถัดไป"""
+    from services.alert_engine import alert_engine
+    alert_engine.request_resync()
+
 async def handle_add_asset():
     app.storage.client['modal_open'] = True
     user_id = app.storage.user.get('user_id')
@@ -406,7 +415,9 @@ async def handle_add_asset():
                     if not t: ui.notify('กรุณาใส่ชื่อหุ้น', type='warning'); return
                     a = float(alert_input.value or 0)
                     if add_portfolio_stock(user_id, t, float(shares_input.value or 0), float(cost_input.value or 0), group_select.value):
-                        if a > 0: set_user_price_alert(user_id, t, a, 'above' if a > get_live_price(t) else 'below')
+                        if a > 0:
+                            set_user_price_alert(user_id, t, a, 'above' if a > get_live_price(t) else 'below')
+                            _resync_alerts()
                         ui.notify(f'เพิ่ม {t} สำเร็จ', type='positive')
                         ui.run_javascript('window.location.reload()')
                 ui.button('Confirm', on_click=save_new).classes('w-full sm:flex-[2] bg-[#FCD535] text-black font-bold py-3 rounded-lg hover:bg-[#E5C02A] transition-colors')
@@ -462,12 +473,16 @@ async def handle_edit(ticker):
 
             with ui.row().classes('w-full p-5 pt-0 gap-3 shrink-0 flex flex-col sm:flex-row'):
                 def do_del():
-                    if delete_portfolio_stock(user_id, ticker): ui.run_javascript('window.location.reload()')
+                    if delete_portfolio_stock(user_id, ticker):
+                        _resync_alerts()
+                        ui.run_javascript('window.location.reload()')
                 ui.button('Delete', on_click=do_del).classes('w-full sm:flex-1 bg-transparent text-[#F6465D] border border-[#F6465D]/50 font-bold py-3 rounded-lg hover:bg-[#F6465D]/10 order-last sm:order-first')
                 def do_save():
                     new_alert = float(alert_input.value)
                     if update_portfolio_stock(user_id, ticker, shares_input.value, cost_input.value, group_select.value, new_alert):
                         if new_alert > 0: set_user_price_alert(user_id, ticker, new_alert, '>' if new_alert > current_price else '<')
+                        if new_alert > 0 or new_alert != saved_alert:
+                            _resync_alerts()
                         ui.run_javascript('window.location.reload()')
                 ui.button('Save & Sync', on_click=do_save).classes('w-full sm:flex-[2] bg-[#FCD535] text-black font-bold py-3 rounded-lg hover:bg-[#E5C02A]')
     dialog.on('hide', lambda: app.storage.client.update({'modal_open': False}))
@@ -552,11 +567,15 @@ async def handle_edit(ticker):
                         cond = 'above' if new_alert > current_price else 'below'
                         set_user_price_alert(user_id, ticker, new_alert, cond)
 
+                    if new_alert > 0 or new_alert != saved_alert:
+                        _resync_alerts()
+
                     ui.notify('บันทึกข้อมูลและซิงค์การแจ้งเตือนสำเร็จ', type='positive')
                     ui.run_javascript('window.scrollTo(0, 0); setTimeout(() => { window.location.href = "/"; }, 200);')
 
             def confirm_delete():
                 if delete_portfolio_stock(user_id, ticker):
+                    _resync_alerts()
                     ui.notify(f'ลบ {ticker} ออกจากพอร์ตแล้ว', type='warning')
                     ui.run_javascript('window.scrollTo(0, 0); setTimeout(() => { window.location.href = "/"; }, 200);')
 
@@ -1160,55 +1179,38 @@ async def main_page(client):
         raw_portfolio = await run.io_bound(get_portfolio, user_id) if user_id else []
         raw_asset_count = len(raw_portfolio)
 
-        assets = []
-        total_invested, net_worth = 0, 0
-        price_warning_symbols = []
-        
         # ==========================================
-        # 1. ลูปดึงราคาและคำนวณหุ้น (อัปเดตเพิ่ม Sparkline)
+        # 1. ดึงราคา + Sparkline ทุกตัวในครั้งเดียว (แชร์ระหว่างทุกแท็บของ user เดียวกัน)
         # ==========================================
+        holdings = []
         for item in raw_portfolio:
             item_group = normalize_group(item.get('asset_group', 'ALL'))
             # กรองตามกลุ่มที่เลือก (ALL, DCA, DIV, TRADING)
             if current_group != 'ALL' and item_group != current_group:
                 continue
-                
-            ticker = item['ticker']
-            shares = float(item['shares'])
-            avg_cost = float(item['avg_cost'])
-            
-            # ดึงราคาแบบ Real-time และกราฟ Sparkline
-            live_price_raw = await run.io_bound(get_live_price, ticker)
-            try:
-                live_price = float(live_price_raw)
-            except (TypeError, ValueError):
-                live_price = 0.0
-
-            if live_price <= 0:
-                # Price feed fallback: protect dashboard from false drawdown when feed returns 0.
-                last_price = float(avg_cost) if float(avg_cost) > 0 else 0.0
-                price_status = 'fallback_avg_cost'
-                fallback_used = True
-                price_warning_symbols.append(str(ticker))
-            else:
-                last_price = live_price
-                price_status = 'live'
-                fallback_used = False
+            holdings.append({**item, 'asset_group': item_group})
+
+        market = await run.io_bound(get_dashboard_market_data, str(user_id or telegram_id or 'guest'), [h['ticker'] for h in raw_portfolio])
+        live_prices = market['prices']
+        sparklines = market['sparklines']
+
+        # ==========================================
+        # 2. คำนวณมูลค่า/กำไรทุกตัวพร้อมกัน (PortfolioValuator)
+        # ==========================================
+        # Price feed fallback: ราคาเป็น 0 → ใช้ทุนเฉลี่ยแทน กันพอร์ตดูเหมือนขาดทุนหมด
+        val = portfolio_valuator.value(holdings, live_prices, fallback_to_cost=True)
+        price_warning_symbols = [t for t, fb in zip(val.tickers, val.price_fallback.tolist()) if fb]
 
-            raw_sparkline, _ = await run.io_bound(get_sparkline_data, ticker)
-            sparkline_data = ensure_sparkline_series(raw_sparkline)
+        assets = []
+        for item, ticker, shares, avg_cost, last_price, current_value, profit, profit_pct, fallback_used in zip(
+            holdings, val.tickers, val.shares.tolist(), val.avg_cost.tolist(), val.price.tolist(),
+            val.value.tolist(), val.pnl.tolist(), val.pnl_pct.tolist(), val.price_fallback.tolist(),
+        ):
+            raw_sparkline = sparklines.get(ticker)
             if raw_sparkline and len(raw_sparkline) > 1:
                 is_up = bool(raw_sparkline[-1] >= raw_sparkline[0])
             else:
                 is_up = bool(last_price >= avg_cost)
-            current_value = shares * last_price
-            invested = shares * avg_cost
-            profit = current_value - invested
-            profit_pct = (profit / invested * 100) if invested > 0 else 0
-            
-            net_worth += current_value
-            total_invested += invested
-            
             assets.append({
                 'ticker': ticker,
                 'shares': shares,
@@ -1217,25 +1219,24 @@ async def main_page(client):
                 'total_value': current_value,
                 'profit': profit,
                 'profit_pct': profit_pct,
-                'asset_group': item_group,
+                'asset_group': item['asset_group'],
                 'alert_price': item.get('alert_price', 0),
-                'sparkline': sparkline_data, # ส่งกราฟไปให้ตารางวาด
+                'sparkline': ensure_sparkline_series(raw_sparkline), # ส่งกราฟไปให้ตารางวาด
                 'is_up': is_up,              # ส่งสีเขียว/แดงไปให้ตาราง
-                'price_status': price_status,
+                'price_status': 'fallback_avg_cost' if fallback_used else 'live',
                 'price_used': last_price,
                 'fallback_used': fallback_used,
             })
 
-       # ==========================================
-        # 2. คำนวณกำไรรวม และหา Top Gainer / Top Loser
+        # ==========================================
+        # 3. คำนวณกำไรรวม และหา Top Gainer / Top Loser
         # ==========================================
         # แปลงยอดเงินทั้งหมดตามสกุลเงินที่เลือก (USD หรือ THB)
-        net_worth = net_worth * curr_rate
-        total_invested = total_invested * curr_rate
+        net_worth = val.totals['total_value'] * curr_rate
+        total_invested = val.totals['total_cost'] * curr_rate
         
         total_profit = net_worth - total_invested
         is_profit_overall = total_profit >= 0
-        
         sorted_assets = sorted(assets, key=lambda x: x['ticker'])
         filtered_count = len(sorted_assets)
         profit_sorted = sorted(assets, key=lambda x: x['profit_pct'], reverse=True)
@@ -1255,11 +1256,10 @@ async def main_page(client):
         top_loser = profit_sorted[-1] if profit_sorted and profit_sorted[-1]['profit_pct'] < 0 else None
 
         # ==========================================
-        # 3. Sidebar pulse data (Fear & Greed + VIX)
+        # 4. Sidebar pulse data (Fear & Greed + VIX)
         # ==========================================
-        from services.yahoo_finance import get_real_fear_and_greed
-        real_fg_value, real_fg_label = await run.io_bound(get_real_fear_and_greed)
-        vix = await run.io_bound(get_live_price, '^VIX') or 0.0
+        real_fg_value, real_fg_label = market['fear_greed']
+        vix = market['vix'] or 0.0
         
         fg_value = real_fg_value
         
@@ -1343,6 +1343,7 @@ async def main_page(client):
             selected_group = str(e.value or 'ALL').strip().upper()
             app.storage.client['dashboard_group'] = selected_group if selected_group in {'ALL', 'DCA', 'TRADING', 'DIV'} else 'ALL'
             await smart_update() # รันทันที ปลอดภัย 100%
+            price_stream.update(dashboard_tickers())
 
         # แถวบน: 2-column fixed (desktop) + compact stack (mobile)
         with ui.grid(columns='grid-cols-1 lg:grid-cols-2').classes('w-full gap-3 md:gap-4 items-stretch'):
@@ -2340,8 +2341,16 @@ async def main_page(client):
                         ui_refs[f'spark_{t}'].options['series'][0]['areaStyle']['color'] = s_color
                         ui_refs[f'spark_{t}'].update()
 
+    # ราคาถูก push มาจาก price hub กลางเฉพาะตอนที่หุ้นในพอร์ต (หรือ VIX) เปลี่ยนราคา แทน timer 8 วินาทีต่อ client
+    def dashboard_tickers():
+        return [a['ticker'] for a in d['sorted_assets']] + [VIX_TICKER]
+
+    async def on_prices(_changes):
+        await smart_update()
+        price_stream.update(dashboard_tickers())
+
     await smart_update()
-    ui.timer(8.0, smart_update)    
+    price_stream = stream_prices(dashboard_tickers(), on_prices)
        # อัปเดตข้อมูลให้ตารางและสั่ง refresh
     
 # ==========================================
@@ -3363,6 +3372,7 @@ async def alerts_page():
                             user_id_for_alert = app.storage.user.get('user_id') or str(tid)
                             success = await run.io_bound(set_user_price_alert, str(user_id_for_alert), sym, float(price_val), cond_val)
                             if success:
+                                _resync_alerts()
                                 ui.notify(f'ตั้งแจ้งเตือน {sym} @ ${float(price_val):,.4f} สำเร็จ', type='positive')
                                 alert_dialog.close()
                                 ui.navigate.reload()
@@ -3411,6 +3421,7 @@ async def alerts_page():
                             
                             def do_delete(alert_id=a_id):
                                 if delete_price_alert(alert_id):
+                                    _resync_alerts()
                                     ui.notify('ลบการแจ้งเตือนแล้ว', type='info')
                                     ui.navigate.reload()
 
@@ -3450,21 +3461,8 @@ async def macro_page(client):
             ui.label(tr('macro.subtitle', lang)).classes('text-sm md:text-lg text-gray-400 mt-2 px-4 text-center')
 
         # ดึงข้อมูล 3 อินดิเคเตอร์หลักพร้อม sparkline 30 วัน
-        import yfinance as yf_macro
-
         async def _fetch_macro_sparkline(ticker: str):
-            try:
-                data = await run.io_bound(
-                    lambda: yf_macro.download(ticker, period='30d', interval='1d', progress=False)
-                )
-                if data.empty:
-                    return []
-                col = data['Close']
-                if hasattr(col, 'columns'):
-                    col = col.iloc[:, 0]
-                return [float(v) for v in col.dropna().tolist()]
-            except Exception:
-                return []
+            return await run.io_bound(get_close_history, ticker, '30d')
 
         try:
             vix = await run.io_bound(get_live_price, '^VIX') or 0.0
@@ -3718,7 +3716,27 @@ def healthz():
 # สิ้นสุดไฟล์
 # ==========================================
 def run_web() -> None:
+    from core.migrations import migrate_on_startup
+    from services.alert_engine import alert_engine
+    from services.http_client import http_client
+    from services.notifier import notifier
+    from services.price_hub import price_hub
+    from services.price_refresher import price_refresher
+
     app.add_static_files('/static', Path(__file__).parent / 'static')
+    # Schema migrations once per process, before the first page touches the DB
+    app.on_startup(migrate_on_startup)
+    # Keep the hot ticker set warm so the price hub reads cached prices
+    app.on_startup(price_refresher.start)
+    app.on_shutdown(price_refresher.stop)
+    # Live pages subscribe to the price hub; its thread starts with the first subscriber
+    app.on_shutdown(price_hub.stop)
+    # Fire price alerts from hub ticks (each alert is deactivated and notified once across processes)
+    app.on_startup(alert_engine.start)
+    app.on_shutdown(alert_engine.stop)
+    # Outbound Telegram queue; only the process holding the sender lease actually sends
+    app.on_shutdown(notifier.stop)
+    app.on_shutdown(http_client.close)
     ui.run(
         title=APP_TITLE,
         dark=True,
@@ -5,8 +5,17 @@ from telegram.handlers import bot, register_handlers
 def run_bot() -> None:
     if not TELEGRAM_TOKEN:
         raise RuntimeError("Missing TELEGRAM_TOKEN")
+    from core.migrations import migrate_on_startup
+    from services.notifier import notifier
+
+    migrate_on_startup()
     register_handlers()
-    bot.infinity_polling(skip_pending=True, timeout=30, long_polling_timeout=30)
+    # Drain the outbound queue (alerts, briefings) alongside polling
+    notifier.start()
+    try:
+        bot.infinity_polling(skip_pending=True, timeout=30, long_polling_timeout=30)
+    finally:
+        notifier.stop()
 
 
 if __name__ == "__main__":
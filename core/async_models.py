@@ -0,0 +1,484 @@
+"""Async database access for the FastAPI layer (psycopg 3 + psycopg_pool).
+
+core/models.py stays the synchronous API for the NiceGUI app, the bot and
+background threads. API routers await the functions here instead, so a DB
+call no longer parks an ``asyncio.to_thread`` worker while it waits on the
+network. Each function mirrors its namesake in core/models.py — same SQL,
+same return shape, same "log and return a default" error handling.
+
+- ``AsyncConnectionPool`` (DB_ASYNC_POOL_MIN..DB_ASYNC_POOL_MAX connections),
+  opened in the API lifespan; a request waits at most DB_POOL_TIMEOUT seconds
+  for a connection.
+- Server-side prepared statements: psycopg prepares a query once it has run
+  DB_PREPARE_THRESHOLD times on a connection. Set it to -1 behind a
+  transaction-mode pooler (PgBouncer / Supabase port 6543), which cannot
+  keep prepared statements.
+- ``adb.stats()`` — pool size/usage, and how long requests waited for a
+  connection (histogram), reported under ``db_async`` in /api/admin/metrics.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any
+
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+
+from core.config import DB_ASYNC_POOL_MAX, DB_ASYNC_POOL_MIN, DB_POOL_TIMEOUT, DB_PREPARE_THRESHOLD
+from core.models import ADD_COMMENT_SQL, DB_URL, DELETE_COMMENT_SQL, FEED_QUERY, _user_from_row, feed_page
+
+# Upper bounds (ms) of the pool wait histogram buckets; the last bucket is open-ended
+_WAIT_BUCKETS_MS = (1, 5, 25, 100, 500, 2000)
+
+
+class AsyncDatabase:
+    """Lazily opened async pool plus fetch/execute helpers that record pool wait time."""
+
+    def __init__(self, dsn: str | None, min_size: int, max_size: int, timeout: float, prepare_threshold: int):
+        self.dsn = dsn
+        self.min_size = max(int(min_size), 1)
+        self.max_size = max(int(max_size), self.min_size)
+        self.timeout = float(timeout)
+        # psycopg: None disables automatic preparation
+        self.prepare_threshold = None if prepare_threshold < 0 else int(prepare_threshold)
+        self._pool: AsyncConnectionPool | None = None
+        self._open_lock: asyncio.Lock | None = None
+        self._lock = threading.Lock()
+        self._acquired = 0
+        self._timeouts = 0
+        self._errors = 0
+        self._wait_total_ms = 0.0
+        self._wait_max_ms = 0.0
+        self._wait_buckets = [0] * (len(_WAIT_BUCKETS_MS) + 1)
+
+    async def open(self) -> None:
+        """Open the pool on the running loop (idempotent). Connections are made in the background."""
+        if self._pool is not None:
+            return
+        if self._open_lock is None:
+            self._open_lock = asyncio.Lock()
+        async with self._open_lock:
+            if self._pool is not None:
+                return
+            if not self.dsn:
+                raise RuntimeError("DATABASE_URL is not set")
+            pool = AsyncConnectionPool(
+                self.dsn,
+                min_size=self.min_size,
+                max_size=self.max_size,
+                timeout=self.timeout,
+                kwargs={"prepare_threshold": self.prepare_threshold},
+                name="api",
+                open=False,
+            )
+            await pool.open(wait=False)
+            self._pool = pool
+
+    async def close(self) -> None:
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            await pool.close()
+
+    def _record_wait(self, waited_ms: float) -> None:
+        idx = next((i for i, b in enumerate(_WAIT_BUCKETS_MS) if waited_ms <= b), len(_WAIT_BUCKETS_MS))
+        with self._lock:
+            self._acquired += 1
+            self._wait_total_ms += waited_ms
+            self._wait_max_ms = max(self._wait_max_ms, waited_ms)
+            self._wait_buckets[idx] += 1
+
+    @asynccontextmanager
+    async def connection(self):
+        """A pooled connection; the transaction commits on exit, or rolls back on error."""
+        await self.open()
+        pool = self._pool
+        started = time.perf_counter()
+        try:
+            conn = await pool.getconn()
+        except PoolTimeout:
+            with self._lock:
+                self._timeouts += 1
+            raise
+        except Exception:
+            with self._lock:
+                self._errors += 1
+            raise
+        self._record_wait((time.perf_counter() - started) * 1000)
+        try:
+            yield conn
+            await conn.commit()
+        except BaseException:
+            try:
+                await conn.rollback()
+            except Exception:
+                pass  # broken connection — the pool discards it on putconn
+            raise
+        finally:
+            await pool.putconn(conn)
+
+    async def fetchall(self, sql: str, params: Any = None) -> list[tuple]:
+        async with self.connection() as conn:
+            cur = await conn.execute(sql, params)
+            return await cur.fetchall()
+
+    async def fetchone(self, sql: str, params: Any = None) -> tuple | None:
+        async with self.connection() as conn:
+            cur = await conn.execute(sql, params)
+            return await cur.fetchone()
+
+    async def execute(self, sql: str, params: Any = None) -> int:
+        """Run one statement and commit. Returns the affected row count."""
+        async with self.connection() as conn:
+            cur = await conn.execute(sql, params)
+            return cur.rowcount
+
+    def stats(self) -> dict:
+        pool_stats = self._pool.get_stats() if self._pool is not None else {}
+        labels = [f"le_{b}ms" for b in _WAIT_BUCKETS_MS] + ["gt_2000ms"]
+        with self._lock:
+            return {
+                "open": self._pool is not None,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "timeout": self.timeout,
+                "prepare_threshold": self.prepare_threshold,
+                "pool_size": pool_stats.get("pool_size", 0),
+                "pool_available": pool_stats.get("pool_available", 0),
+                "requests_waiting": pool_stats.get("requests_waiting", 0),
+                "connections_errors": pool_stats.get("connections_errors", 0),
+                "acquired": self._acquired,
+                "timeouts": self._timeouts,
+                "errors": self._errors,
+                "wait_ms": {
+                    "avg": round(self._wait_total_ms / self._acquired, 2) if self._acquired else 0.0,
+                    "max": round(self._wait_max_ms, 2),
+                    "histogram": dict(zip(labels, self._wait_buckets)),
+                },
+            }
+
+
+adb = AsyncDatabase(
+    DB_URL,
+    min_size=DB_ASYNC_POOL_MIN,
+    max_size=DB_ASYNC_POOL_MAX,
+    timeout=DB_POOL_TIMEOUT,
+    prepare_threshold=DB_PREPARE_THRESHOLD,
+)
+
+
+def _iso(ts) -> str | None:
+    return (ts.isoformat() + "Z") if ts else None
+
+
+# ─── Users ───
+
+async def get_user_by_telegram(telegram_id: int):
+    try:
+        row = await adb.fetchone(
+            "SELECT user_id, status, role, expiry_date, username FROM users WHERE user_id = %s", (str(telegram_id),)
+        )
+        return _user_from_row(row, f"User_{str(telegram_id)[-4:]}") if row else None
+    except Exception as e:
+        print(f"❌ DB Error (async get_user_by_telegram): {e}")
+        return None
+
+
+async def update_user_last_seen(user_id: str):
+    try:
+        await adb.execute("UPDATE users SET last_seen = NOW() WHERE user_id = %s", (str(user_id),))
+        return True
+    except Exception:
+        return False
+
+
+async def clear_user_last_seen(user_id: str):
+    try:
+        await adb.execute("UPDATE users SET last_seen = NULL WHERE user_id = %s", (str(user_id),))
+        return True
+    except Exception:
+        return False
+
+
+async def get_online_users():
+    try:
+        rows = await adb.fetchall("""
+            SELECT user_id, username, role, status, last_seen
+            FROM users
+            WHERE last_seen >= NOW() - INTERVAL '2 minutes'
+            ORDER BY last_seen DESC
+        """)
+        return [
+            {
+                "user_id": r[0],
+                "username": r[1] or f"User_{str(r[0])[-4:]}",
+                "role": r[2] or "free",
+                "status": r[3] or "active",
+                "last_seen": _iso(r[4]),
+            }
+            for r in rows
+        ]
+    except Exception as e:
+        print(f"❌ DB Error (async get_online_users): {e}")
+        return []
+
+
+# ─── Portfolio ───
+
+async def get_portfolio(user_id: str):
+    try:
+        rows = await adb.fetchall(
+            "SELECT ticker, shares, avg_cost, asset_group, alert_price FROM portfolios WHERE user_id = %s", (str(user_id),)
+        )
+        return [
+            {
+                'ticker': r[0],
+                'shares': float(r[1]),
+                'avg_cost': float(r[2]),
+                'asset_group': r[3] or 'ALL',
+                'alert_price': float(r[4]) if r[4] else 0.0,
+            }
+            for r in rows
+        ]
+    except Exception as e:
+        print(f"❌ DB Error (async get_portfolio): {e}")
+        return []
+
+
+async def add_portfolio_stock(user_id: str, ticker: str, shares: float, avg_cost: float, asset_group: str = 'ALL'):
+    try:
+        ticker = ticker.upper().strip()
+        async with adb.connection() as conn:
+            cur = await conn.execute(
+                "SELECT shares, avg_cost FROM portfolios WHERE user_id = %s AND ticker = %s FOR UPDATE", (str(user_id), ticker)
+            )
+            row = await cur.fetchone()
+            if row:
+                old_shares = float(row[0])
+                old_cost = float(row[1])
+                new_shares = old_shares + float(shares)
+                new_avg_cost = ((old_shares * old_cost) + (float(shares) * float(avg_cost))) / new_shares
+                await conn.execute(
+                    "UPDATE portfolios SET shares = %s, avg_cost = %s, asset_group = %s WHERE user_id = %s AND ticker = %s",
+                    (new_shares, new_avg_cost, asset_group, str(user_id), ticker),
+                )
+            else:
+                await conn.execute(
+                    "INSERT INTO portfolios (user_id, ticker, shares, avg_cost, asset_group, alert_price) VALUES (%s, %s, %s, %s, %s, 0)",
+                    (str(user_id), ticker, float(shares), float(avg_cost), asset_group),
+                )
+        return True
+    except Exception as e:
+        print(f"❌ DB Error (async add_portfolio_stock): {e}")
+        return False
+
+
+async def update_portfolio_stock(user_id: str, ticker: str, shares: float, avg_cost: float, asset_group: str = 'ALL', alert_price: float = 0.0):
+    try:
+        await adb.execute("""
+            UPDATE portfolios
+            SET shares = %s, avg_cost = %s, asset_group = %s, alert_price = %s
+            WHERE user_id = %s AND ticker = %s
+        """, (float(shares), float(avg_cost), asset_group, float(alert_price), str(user_id), ticker.upper()))
+        return True
+    except Exception as e:
+        print(f"❌ DB Error (async update_portfolio): {e}")
+        return False
+
+
+async def delete_portfolio_stock(user_id: str, ticker: str):
+    try:
+        await adb.execute("DELETE FROM portfolios WHERE user_id = %s AND ticker = %s", (str(user_id), ticker.upper()))
+        return True
+    except Exception as e:
+        print(f"❌ DB Error (async delete_portfolio): {e}")
+        return False
+
+
+# ─── Price alerts ───
+
+async def get_user_price_alerts(user_id: str):
+    try:
+        rows = await adb.fetchall(
+            "SELECT id, symbol, target_price, condition, is_active FROM user_price_alerts WHERE user_id = %s ORDER BY is_active DESC, id DESC",
+            (str(user_id),),
+        )
+        return [{"id": r[0], "symbol": r[1], "target_price": float(r[2]), "condition": r[3], "is_active": int(r[4])} for r in rows]
+    except Exception as e:
+        print(f"❌ DB Error (async get_user_price_alerts): {e}")
+        return []
+
+
+async def delete_price_alert(alert_id: int):
+    try:
+        await adb.execute("DELETE FROM user_price_alerts WHERE id = %s", (alert_id,))
+        return True
+    except Exception as e:
+        print(f"❌ DB Error (async delete_price_alert): {e}")
+        return False
+
+
+async def set_user_price_alert(user_id: str, symbol: str, target_price: float, condition: str):
+    if target_price <= 0:
+        return False
+    try:
+        async with adb.connection() as conn:
+            cur = await conn.execute(
+                "SELECT id FROM user_price_alerts WHERE user_id = %s AND symbol = %s AND is_active = 1", (str(user_id), symbol.upper())
+            )
+            row = await cur.fetchone()
+            if row:
+                await conn.execute(
+                    "UPDATE user_price_alerts SET target_price = %s, condition = %s WHERE id = %s", (float(target_price), condition, row[0])
+                )
+            else:
+                await conn.execute(
+                    "INSERT INTO user_price_alerts (user_id, symbol, target_price, condition, is_active) VALUES (%s, %s, %s, %s, 1)",
+                    (str(user_id), symbol.upper(), float(target_price), condition),
+                )
+        return True
+    except Exception as e:
+        print(f"❌ DB Error (async set_user_price_alert): {e}")
+        return False
+
+
+# ─── Watchlist ───
+
+async def get_user_watchlist(user_id: str) -> list[str]:
+    try:
+        rows = await adb.fetchall("SELECT ticker FROM user_watchlist WHERE user_id = %s ORDER BY created_at", (str(user_id),))
+        return [r[0] for r in rows]
+    except Exception as e:
+        print(f"❌ DB Error (async get_user_watchlist): {e}")
+        return []
+
+
+async def add_watchlist_item(user_id: str, ticker: str):
+    try:
+        await adb.execute(
+            "INSERT INTO user_watchlist (user_id, ticker) VALUES (%s, %s) ON CONFLICT DO NOTHING", (str(user_id), ticker.upper())
+        )
+        return True
+    except Exception as e:
+        print(f"❌ DB Error (async add_watchlist_item): {e}")
+        return False
+
+
+async def remove_watchlist_item(user_id: str, ticker: str):
+    try:
+        await adb.execute("DELETE FROM user_watchlist WHERE user_id = %s AND ticker = %s", (str(user_id), ticker.upper()))
+        return True
+    except Exception as e:
+        print(f"❌ DB Error (async remove_watchlist_item): {e}")
+        return False
+
+
+# ─── Social feed ───
+
+async def get_feed_posts(limit: int = 20, viewer_id: str = "", before: tuple | None = None) -> dict:
+    """One feed page after the keyset ``before`` = (created_at, id); see core.models.get_feed_posts."""
+    try:
+        async with adb.connection() as conn:
+            if before:
+                cur = await conn.execute(FEED_QUERY.format(where="WHERE (created_at, id) < (%s, %s)"), (before[0], before[1], limit + 1))
+            else:
+                cur = await conn.execute(FEED_QUERY.format(where=""), (limit + 1,))
+            rows = await cur.fetchall()
+            liked_ids = set()
+            if rows and viewer_id:
+                cur = await conn.execute("SELECT post_id FROM social_likes WHERE user_id = %s AND post_id = ANY(%s)",
+                                         (str(viewer_id), [r[0] for r in rows[:limit]]))
+                liked_ids = {r[0] for r in await cur.fetchall()}
+        return feed_page(rows, liked_ids, limit)
+    except Exception as e:
+        print(f"❌ DB Error (async get_feed_posts): {e}")
+        return {"posts": [], "next_cursor": None}
+
+
+async def create_feed_post(user_id: str, username: str, role: str, content: str, ticker: str | None = None) -> int | None:
+    try:
+        row = await adb.fetchone("""
+            INSERT INTO social_posts (user_id, username, role, content, ticker)
+            VALUES (%s, %s, %s, %s, %s) RETURNING id
+        """, (str(user_id), username, role, content, ticker))
+        return row[0]
+    except Exception as e:
+        print(f"❌ DB Error (async create_feed_post): {e}")
+        return None
+
+
+async def delete_feed_post(post_id: int, user_id: str, is_admin: bool = False) -> bool:
+    try:
+        if is_admin:
+            return await adb.execute("DELETE FROM social_posts WHERE id = %s", (post_id,)) > 0
+        return await adb.execute("DELETE FROM social_posts WHERE id = %s AND user_id = %s", (post_id, str(user_id))) > 0
+    except Exception as e:
+        print(f"❌ DB Error (async delete_feed_post): {e}")
+        return False
+
+
+async def toggle_feed_like(post_id: int, user_id: str) -> dict:
+    try:
+        async with adb.connection() as conn:
+            cur = await conn.execute("SELECT 1 FROM social_likes WHERE post_id = %s AND user_id = %s", (post_id, str(user_id)))
+            if await cur.fetchone():
+                await conn.execute("DELETE FROM social_likes WHERE post_id = %s AND user_id = %s", (post_id, str(user_id)))
+                await conn.execute("UPDATE social_posts SET like_count = GREATEST(0, like_count - 1) WHERE id = %s", (post_id,))
+                liked = False
+            else:
+                await conn.execute("INSERT INTO social_likes (post_id, user_id) VALUES (%s, %s)", (post_id, str(user_id)))
+                await conn.execute("UPDATE social_posts SET like_count = like_count + 1 WHERE id = %s", (post_id,))
+                liked = True
+            cur = await conn.execute("SELECT like_count FROM social_posts WHERE id = %s", (post_id,))
+            count = (await cur.fetchone())[0] or 0
+        return {"liked": liked, "count": count}
+    except Exception as e:
+        print(f"❌ DB Error (async toggle_feed_like): {e}")
+        return {"liked": False, "count": 0}
+
+
+async def get_post_comments(post_id: int) -> list:
+    try:
+        rows = await adb.fetchall("""
+            SELECT id, user_id, username, role, content, created_at
+            FROM social_comments WHERE post_id = %s
+            ORDER BY created_at ASC
+        """, (post_id,))
+        return [
+            {"id": r[0], "user_id": r[1], "username": r[2], "role": r[3], "content": r[4], "created_at": _iso(r[5])}
+            for r in rows
+        ]
+    except Exception as e:
+        print(f"❌ DB Error (async get_post_comments): {e}")
+        return []
+
+
+async def add_post_comment(post_id: int, user_id: str, username: str, role: str, content: str) -> int | None:
+    try:
+        row = await adb.fetchone(ADD_COMMENT_SQL, (post_id, str(user_id), username, role, content))
+        return row[0]
+    except Exception as e:
+        print(f"❌ DB Error (async add_post_comment): {e}")
+        return None
+
+
+async def delete_post_comment(comment_id: int, user_id: str, is_admin: bool = False) -> bool:
+    try:
+        if is_admin:
+            return await adb.execute(DELETE_COMMENT_SQL.format(owner=""), (comment_id,)) > 0
+        return await adb.execute(DELETE_COMMENT_SQL.format(owner="AND user_id = %s"), (comment_id, str(user_id))) > 0
+    except Exception as e:
+        print(f"❌ DB Error (async delete_post_comment): {e}")
+        return False
+
+
+async def count_user_posts_today(user_id: str) -> int:
+    try:
+        row = await adb.fetchone(
+            "SELECT COUNT(*) FROM social_posts WHERE user_id = %s AND created_at >= CURRENT_DATE", (str(user_id),)
+        )
+        return row[0] or 0
+    except Exception:
+        return 0
@@ -70,6 +70,66 @@ DASHBOARD_LOGIN_TOKEN_TTL = _to_int("DASHBOARD_LOGIN_TOKEN_TTL", 86400)
 FEATURE_PHASE_B_SIGNALS = _to_bool("FEATURE_PHASE_B_SIGNALS", True)
 FEATURE_UPSELL_TRACKING = _to_bool("FEATURE_UPSELL_TRACKING", True)
 
+# Market data cache (services/market_cache.py) — default per-namespace entry limit
+MARKET_CACHE_MAX_ENTRIES = _to_int("MARKET_CACHE_MAX_ENTRIES", 2048)
+
+# Background price refresher (services/price_refresher.py) — keeps the hot ticker set warm.
+# Interval must stay below the 300s price TTL so entries are refreshed before they expire.
+PRICE_REFRESH_ENABLED = _to_bool("PRICE_REFRESH_ENABLED", True)
+PRICE_REFRESH_INTERVAL = _to_int("PRICE_REFRESH_INTERVAL", 240)
+PRICE_REFRESH_CHUNK_SIZE = _to_int("PRICE_REFRESH_CHUNK_SIZE", 50)
+
+# Cross-process cache (services/shared_cache.py): "local" (in-process) or "sqlite"
+# (one file shared by all uvicorn workers). Path empty → $XDG_RUNTIME_DIR/apexify,
+# else .cache/shared; its directory must belong to this user (created 0700).
+SHARED_CACHE_BACKEND = os.getenv("SHARED_CACHE_BACKEND", "local").strip().lower()
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", "")
+SHARED_CACHE_MAX_AGE = _to_int("SHARED_CACHE_MAX_AGE", 86400 * 8)
+
+# Stale-while-revalidate: expired prices/sparklines younger than this are served
+# immediately (marked stale) while one background refresh runs; older ones block.
+MARKET_MAX_STALENESS = _to_int("MARKET_MAX_STALENESS", 1800)
+
+# Tiered price fetch (services/price_fetcher.py) — tickers per multi-ticker download
+PRICE_FETCH_CHUNK_SIZE = _to_int("PRICE_FETCH_CHUNK_SIZE", 100)
+
+# Columnar OHLCV history store (services/ohlcv_store.py) — max (ticker, interval) series kept
+OHLCV_STORE_MAX_SERIES = _to_int("OHLCV_STORE_MAX_SERIES", 512)
+# On-disk Arrow copy of that history (services/history_disk_cache.py) — survives restarts
+HISTORY_CACHE_ENABLED = _to_bool("HISTORY_CACHE_ENABLED", True)
+HISTORY_CACHE_DIR = os.getenv("HISTORY_CACHE_DIR", str(BASE_DIR / ".cache" / "history"))
+# Incremental chart indicator state (services/indicator_state.py) — max (ticker, interval, period) entries
+INDICATOR_STATE_MAX_ENTRIES = _to_int("INDICATOR_STATE_MAX_ENTRIES", 256)
+# Central price hub (services/price_hub.py) — seconds between pushes of changed prices to live clients
+PRICE_HUB_INTERVAL = _to_int("PRICE_HUB_INTERVAL", 8)
+# Price-alert engine (services/alert_engine.py) — seconds between full reloads of active alerts
+ALERT_ENGINE_ENABLED = _to_bool("ALERT_ENGINE_ENABLED", True)
+ALERT_RESYNC_INTERVAL = _to_int("ALERT_RESYNC_INTERVAL", 60)
+# Outbound Telegram queue (services/notifier.py) — SQLite outbox on persistent disk, sender limits
+TELEGRAM_QUEUE_PATH = os.getenv("TELEGRAM_QUEUE_PATH", str(BASE_DIR / ".cache" / "telegram_outbox.sqlite3"))
+TELEGRAM_SEND_WORKERS = _to_int("TELEGRAM_SEND_WORKERS", 4)
+TELEGRAM_GLOBAL_RATE = _to_int("TELEGRAM_GLOBAL_RATE", 25)
+TELEGRAM_CHAT_INTERVAL = _to_int("TELEGRAM_CHAT_INTERVAL", 1)
+TELEGRAM_MAX_ATTEMPTS = _to_int("TELEGRAM_MAX_ATTEMPTS", 6)
+# Morning briefing (services/scheduler.py) — concurrent news/summary fetches, one per distinct ticker
+BRIEFING_WORKERS = _to_int("BRIEFING_WORKERS", 4)
+# Outbound HTTP (services/http_client.py) — shared keep-alive pools, per-host concurrency, default timeout (s)
+HTTP_TIMEOUT = _to_int("HTTP_TIMEOUT", 10)
+HTTP_MAX_CONNECTIONS = _to_int("HTTP_MAX_CONNECTIONS", 100)
+HTTP_MAX_KEEPALIVE = _to_int("HTTP_MAX_KEEPALIVE", 20)
+HTTP_MAX_PER_HOST = _to_int("HTTP_MAX_PER_HOST", 8)
+# Async Postgres pool for the API (core/async_models.py); DB_POOL_TIMEOUT (s) bounds the wait for a connection in both pools.
+# DB_PREPARE_THRESHOLD=-1 behind a transaction-mode pooler
+DB_ASYNC_POOL_MIN = _to_int("DB_ASYNC_POOL_MIN", 2)
+DB_ASYNC_POOL_MAX = _to_int("DB_ASYNC_POOL_MAX", 20)
+DB_POOL_TIMEOUT = _to_int("DB_POOL_TIMEOUT", 10)
+DB_PREPARE_THRESHOLD = _to_int("DB_PREPARE_THRESHOLD", 5)
+# Sync Postgres pool (core/db_pool.py) shared by NiceGUI, to_thread workers, the bot and background jobs;
+# idle connections older than DB_HEALTHCHECK_IDLE seconds get a SELECT 1 on checkout
+DB_POOL_MIN = _to_int("DB_POOL_MIN", 1)
+DB_POOL_MAX = _to_int("DB_POOL_MAX", 20)
+DB_HEALTHCHECK_IDLE = _to_int("DB_HEALTHCHECK_IDLE", 30)
+
 COLORS = {
     "bg": "#0D1117",
     "card": "#161B22",
@@ -0,0 +1,158 @@
+"""Thread-safe Postgres connection pool for the synchronous DB layer (core/models.py).
+
+``get_db_connection`` is used from NiceGUI ``run.io_bound`` threads,
+``asyncio.to_thread`` workers, the bot and background services at once. The
+pool is a ``ThreadedConnectionPool`` with a semaphore in front of it:
+
+- when every connection is checked out, callers wait up to DB_POOL_TIMEOUT
+  seconds for one to come back instead of failing immediately; only then is
+  ``DBPoolTimeout`` raised, which names the pool state in its message;
+- a connection is health-checked on checkout when it is closed or has sat
+  idle longer than DB_HEALTHCHECK_IDLE seconds (``SELECT 1``); dead ones are
+  discarded and replaced;
+- a connection whose last use raised a connection-level error is closed
+  rather than handed to the next caller;
+- the pool is created on first use and re-created if that failed, so a
+  database that is down at import time does not disable pooling for good.
+
+``stats()`` (size, in use, waits, wait time, timeouts, discarded connections)
+is reported under ``db_pool`` in /api/admin/metrics.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import pool
+
+
+class DBPoolTimeout(Exception):
+    """No pooled connection became free within the wait timeout."""
+
+
+class PooledDB:
+    """Bounded-wait, health-checked wrapper around ``ThreadedConnectionPool``."""
+
+    def __init__(self, dsn: str | None, min_size: int, max_size: int, timeout: float, healthcheck_idle: float):
+        self.dsn = dsn
+        self.min_size = max(int(min_size), 0)
+        self.max_size = max(int(max_size), 1, self.min_size)
+        self.timeout = float(timeout)
+        self.healthcheck_idle = float(healthcheck_idle)
+        self._pool: pool.ThreadedConnectionPool | None = None
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._lock = threading.Lock()
+        self._last_used: dict[int, float] = {}
+        self._in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+        self._discarded = 0
+        self._healthcheck_failures = 0
+
+    def _get_pool(self) -> pool.ThreadedConnectionPool:
+        with self._lock:
+            if self._pool is None:
+                self._pool = pool.ThreadedConnectionPool(self.min_size, self.max_size, self.dsn)
+            return self._pool
+
+    def _healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        idle = time.monotonic() - self._last_used.get(id(conn), 0.0)
+        if idle < self.healthcheck_idle:
+            return True
+        try:
+            with conn.cursor() as c:
+                c.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            with self._lock:
+                self._healthcheck_failures += 1
+            return False
+
+    def _checkout(self, db_pool: pool.ThreadedConnectionPool):
+        # Every slot is held by a checkout, so getconn cannot run out here;
+        # each unhealthy connection is dropped and a fresh one tried instead.
+        for _ in range(self.max_size + 1):
+            conn = db_pool.getconn()
+            if self._healthy(conn):
+                return conn
+            self._discard(db_pool, conn)
+        raise psycopg2.OperationalError("no healthy database connection")
+
+    def _discard(self, db_pool: pool.ThreadedConnectionPool, conn) -> None:
+        with self._lock:
+            self._last_used.pop(id(conn), None)
+            self._discarded += 1
+        try:
+            db_pool.putconn(conn, close=True)
+        except Exception:
+            pass
+
+    @contextmanager
+    def connection(self):
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._timeouts += 1
+                in_use = self._in_use
+            raise DBPoolTimeout(
+                f"no DB connection free after {self.timeout:g}s ({in_use}/{self.max_size} in use)"
+            )
+        waited = time.monotonic() - started
+        conn = None
+        db_pool = None
+        try:
+            db_pool = self._get_pool()
+            conn = self._checkout(db_pool)
+            with self._lock:
+                self._in_use += 1
+                self._checkouts += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+                if waited > 0.001:
+                    self._waits += 1
+            broken = False
+            try:
+                yield conn
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                broken = True
+                raise
+            finally:
+                with self._lock:
+                    self._in_use -= 1
+                if broken or conn.closed:
+                    self._discard(db_pool, conn)
+                else:
+                    self._last_used[id(conn)] = time.monotonic()
+                    # ThreadedConnectionPool rolls back an open transaction on putconn
+                    db_pool.putconn(conn)
+        finally:
+            self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._pool._pool) + len(self._pool._used) if self._pool is not None else 0
+            return {
+                "created": self._pool is not None,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": size,
+                "in_use": self._in_use,
+                "idle": max(size - self._in_use, 0),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_avg_ms": round(self._wait_total / self._checkouts * 1000, 2) if self._checkouts else 0.0,
+                "wait_max_ms": round(self._wait_max * 1000, 2),
+                "timeouts": self._timeouts,
+                "timeout_s": self.timeout,
+                "discarded": self._discarded,
+                "healthcheck_failures": self._healthcheck_failures,
+            }
@@ -0,0 +1,160 @@
+"""Versioned schema migrations for the Postgres database (core/models.py).
+
+Every process runs ``run_migrations()`` once at startup (API lifespan,
+NiceGUI ``run_web``, ``run_bot``); request paths never issue DDL. Applied
+versions are recorded in ``schema_migrations``, so after the first run a
+start costs one SELECT. Each pending migration runs in its own transaction
+under a Postgres advisory lock, so processes starting together apply it once
+and the others skip it.
+
+Add a migration by appending ``(version, name, [statements])`` to
+``MIGRATIONS`` with the next version number. Never edit one that has shipped.
+
+    python -m core.migrations          # apply pending migrations
+"""
+
+from __future__ import annotations
+
+import threading
+
+from core.models import get_db_connection
+
+# pg_advisory_xact_lock key shared by every process migrating this database
+_LOCK_KEY = 0x41504558  # "APEX"
+
+MIGRATIONS: list[tuple[int, str, list[str]]] = [
+    (1, "baseline tables previously created on first use", [
+        """
+        CREATE TABLE IF NOT EXISTS user_watchlist (
+            id SERIAL PRIMARY KEY,
+            user_id VARCHAR(64) NOT NULL,
+            ticker VARCHAR(20) NOT NULL,
+            created_at TIMESTAMP DEFAULT NOW(),
+            UNIQUE(user_id, ticker)
+        )
+        """,
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS last_seen TIMESTAMP",
+        """
+        CREATE TABLE IF NOT EXISTS social_posts (
+            id SERIAL PRIMARY KEY,
+            user_id VARCHAR(64) NOT NULL,
+            username VARCHAR(100) NOT NULL,
+            role VARCHAR(20) DEFAULT 'free',
+            content TEXT NOT NULL,
+            ticker VARCHAR(20),
+            created_at TIMESTAMP DEFAULT NOW(),
+            like_count INTEGER DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS social_comments (
+            id SERIAL PRIMARY KEY,
+            post_id INTEGER NOT NULL REFERENCES social_posts(id) ON DELETE CASCADE,
+            user_id VARCHAR(64) NOT NULL,
+            username VARCHAR(100) NOT NULL,
+            role VARCHAR(20) DEFAULT 'free',
+            content TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT NOW()
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS social_likes (
+            post_id INTEGER NOT NULL,
+            user_id VARCHAR(64) NOT NULL,
+            created_at TIMESTAMP DEFAULT NOW(),
+            PRIMARY KEY(post_id, user_id)
+        )
+        """,
+    ]),
+    (2, "indexes for per-user lookups, likes and presence", [
+        "CREATE INDEX IF NOT EXISTS idx_portfolios_user_id ON portfolios (user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_user_price_alerts_user_active ON user_price_alerts (user_id, is_active)",
+        "CREATE INDEX IF NOT EXISTS idx_users_last_seen ON users (last_seen)",
+        # social_likes created by migration 1 already has PRIMARY KEY (post_id, user_id);
+        # only tables created before that constraint existed need the index.
+        """
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_indexes
+                WHERE tablename = 'social_likes' AND indexdef LIKE '%(post_id, user_id)%'
+            ) THEN
+                CREATE INDEX idx_social_likes_post_user ON social_likes (post_id, user_id);
+            END IF;
+        END $$
+        """,
+    ]),
+    (3, "feed: comment_count counter and keyset index", [
+        "ALTER TABLE social_posts ADD COLUMN IF NOT EXISTS comment_count INTEGER NOT NULL DEFAULT 0",
+        """
+        UPDATE social_posts p SET comment_count = c.n
+        FROM (SELECT post_id, COUNT(*) AS n FROM social_comments GROUP BY post_id) c
+        WHERE p.id = c.post_id
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_social_posts_created_id ON social_posts (created_at DESC, id DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_social_comments_post ON social_comments (post_id, created_at)",
+    ]),
+]
+
+_done = False
+_done_lock = threading.Lock()
+
+
+def _applied_versions(c) -> set[int]:
+    # Locked too: concurrent CREATE TABLE IF NOT EXISTS can still collide
+    c.execute("SELECT pg_advisory_xact_lock(%s)", (_LOCK_KEY,))
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+        )
+    """)
+    c.execute("SELECT version FROM schema_migrations")
+    return {r[0] for r in c.fetchall()}
+
+
+def run_migrations() -> list[int]:
+    """Apply pending migrations (once per process). Returns the versions this call applied."""
+    global _done
+    with _done_lock:
+        if _done:
+            return []
+        applied_now = []
+        with get_db_connection() as conn:
+            c = conn.cursor()
+            applied = _applied_versions(c)
+            conn.commit()
+            for version, name, statements in MIGRATIONS:
+                if version in applied:
+                    continue
+                try:
+                    c.execute("SELECT pg_advisory_xact_lock(%s)", (_LOCK_KEY,))
+                    # Another process may have applied it while we waited for the lock
+                    c.execute("SELECT 1 FROM schema_migrations WHERE version = %s", (version,))
+                    if c.fetchone() is None:
+                        for sql in statements:
+                            c.execute(sql)
+                        c.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+                        applied_now.append(version)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+            c.close()
+        _done = True
+        if applied_now:
+            print(f"✅ Schema migrations applied: {applied_now}")
+        return applied_now
+
+
+def migrate_on_startup() -> None:
+    """``run_migrations`` for process startup hooks — logs instead of raising."""
+    try:
+        run_migrations()
+    except Exception as e:
+        print(f"❌ DB Error (run_migrations): {e}")
+
+
+if __name__ == "__main__":
+    run_migrations()
@@ -1,42 +1,62 @@
 import os
 import psycopg2
-from psycopg2 import pool
 from dotenv import load_dotenv
 from datetime import datetime
 from contextlib import contextmanager
 
+from core.config import DB_HEALTHCHECK_IDLE, DB_POOL_MAX, DB_POOL_MIN, DB_POOL_TIMEOUT
+from core.db_pool import PooledDB
+
 # โหลดตัวแปรจากไฟล์ .env
 load_dotenv()
 DB_URL = os.getenv("DATABASE_URL")
 ADMIN_ID = os.getenv("ADMIN_ID", "")
 
-# 🌟 1. สร้าง Connection Pool (บ่อพัก) รองรับคนเข้าพร้อมกัน 1-20 ท่อ
-try:
-    if DB_URL:
-        db_pool = psycopg2.pool.SimpleConnectionPool(1, 20, DB_URL)
-    else:
-        db_pool = None
-        print("❌ Error: ไม่พบ DATABASE_URL ในไฟล์ .env")
-except Exception as e:
+# 🌟 1. Connection Pool (บ่อพัก) แบบ thread-safe — ถ้าท่อเต็มจะรอคิวได้ไม่เกิน DB_POOL_TIMEOUT วินาที (core/db_pool.py)
+if DB_URL:
+    db_pool = PooledDB(DB_URL, DB_POOL_MIN, DB_POOL_MAX, timeout=DB_POOL_TIMEOUT, healthcheck_idle=DB_HEALTHCHECK_IDLE)
+else:
     db_pool = None
-    print(f"❌ Error creating Connection Pool: {e}")
+    print("❌ Error: ไม่พบ DATABASE_URL ในไฟล์ .env")
 
 @contextmanager
 def get_db_connection():
     """Context Manager: ระบบเบิก-คืน Database Connection อัตโนมัติ"""
-    conn = None
+    if db_pool:
+        with db_pool.connection() as conn:
+            yield conn
+        return
+    conn = psycopg2.connect(DB_URL)
     try:
-        if db_pool:
-            conn = db_pool.getconn()
-        else:
-            conn = psycopg2.connect(DB_URL)
         yield conn
     finally:
-        if conn:
-            if db_pool:
-                db_pool.putconn(conn)
-            else:
-                conn.close()
+        conn.close()
+
+def _user_from_row(row, fallback_username: str):
+    """users row (user_id, status, role, expiry_date, username) → dict ที่หน้าเว็บ/บอทใช้"""
+    expiry = row[3]
+    expiry_str = expiry.strftime('%d/%m/%Y') if isinstance(expiry, datetime) else str(expiry) if expiry else None
+    role = row[2] if row[2] else 'free'
+    user_id_str = str(row[0]) if row[0] else ""
+
+    # Auto-promote ADMIN_ID user to admin role
+    if ADMIN_ID and user_id_str == str(ADMIN_ID):
+        role = 'admin'
+    # 🌟 เช็ควันหมดอายุแบบ Real-time ให้หน้าเว็บ
+    elif role in ['vip', 'pro'] and expiry:
+        try:
+            exp_dt = datetime.strptime(expiry, '%Y-%m-%d %H:%M:%S') if isinstance(expiry, str) else expiry
+            if datetime.now() > exp_dt:
+                role = 'free' # หมดอายุให้กลายเป็นฟรีทันที
+        except: pass
+
+    db_username = row[4] if len(row) > 4 and row[4] else fallback_username
+
+    return {
+        'user_id': row[0], 'username': db_username,
+        'status': row[1] if row[1] else 'active',
+        'role': role, 'vip_expiry': expiry_str
+    }
 
 def get_user_by_telegram(telegram_id: int):
     try:
@@ -47,28 +67,7 @@ def get_user_by_telegram(telegram_id: int):
             c.close()
             
         if row:
-            expiry = row[3]
-            expiry_str = expiry.strftime('%d/%m/%Y') if isinstance(expiry, datetime) else str(expiry) if expiry else None
-            role = row[2] if row[2] else 'free'
-
-            # Auto-promote ADMIN_ID user to admin role
-            if ADMIN_ID and str(telegram_id) == str(ADMIN_ID):
-                role = 'admin'
-            # 🌟 เช็ควันหมดอายุแบบ Real-time ให้หน้าเว็บ
-            elif role in ['vip', 'pro'] and expiry:
-                try:
-                    exp_dt = datetime.strptime(expiry, '%Y-%m-%d %H:%M:%S') if isinstance(expiry, str) else expiry
-                    if datetime.now() > exp_dt:
-                        role = 'free' # หมดอายุให้กลายเป็นฟรีทันที
-                except: pass
-
-            db_username = row[4] if len(row) > 4 and row[4] else f"User_{str(telegram_id)[-4:]}"
-            
-            return {
-                'user_id': row[0], 'username': db_username, 
-                'status': row[1] if row[1] else 'active',
-                'role': role, 'vip_expiry': expiry_str 
-            }
+            return _user_from_row(row, f"User_{str(telegram_id)[-4:]}")
         return None
     except Exception as e:
         print(f"❌ DB Error (get_user_by_telegram): {e}")
@@ -85,28 +84,7 @@ def get_user_by_username(username: str):
             c.close()
 
         if row:
-            expiry = row[3]
-            expiry_str = expiry.strftime('%d/%m/%Y') if isinstance(expiry, datetime) else str(expiry) if expiry else None
-            role = row[2] if row[2] else 'free'
-            user_id_str = str(row[0]) if row[0] else ""
-
-            # Auto-promote ADMIN_ID user to admin role
-            if ADMIN_ID and user_id_str == str(ADMIN_ID):
-                role = 'admin'
-            elif role in ['vip', 'pro'] and expiry:
-                try:
-                    exp_dt = datetime.strptime(expiry, '%Y-%m-%d %H:%M:%S') if isinstance(expiry, str) else expiry
-                    if datetime.now() > exp_dt:
-                        role = 'free'
-                except: pass
-
-            db_username = row[4] if len(row) > 4 and row[4] else username
-
-            return {
-                'user_id': row[0], 'username': db_username,
-                'status': row[1] if row[1] else 'active',
-                'role': role, 'vip_expiry': expiry_str
-            }
+            return _user_from_row(row, username)
         return None
     except Exception as e:
         print(f"❌ DB Error (get_user_by_username): {e}")
@@ -148,6 +126,23 @@ def get_all_unique_tickers():
         print(f"❌ DB Error (get_all_unique_tickers): {e}")
         return []
 
+def get_active_alert_symbols():
+    """Symbols with at least one active alert (portfolio alert_price or user_price_alerts)."""
+    try:
+        with get_db_connection() as conn:
+            c = conn.cursor()
+            c.execute("""
+                SELECT ticker FROM portfolios WHERE alert_price > 0
+                UNION
+                SELECT symbol FROM user_price_alerts WHERE is_active = 1
+            """)
+            rows = c.fetchall()
+            c.close()
+        return [row[0] for row in rows if row[0]]
+    except Exception as e:
+        print(f"❌ DB Error (get_active_alert_symbols): {e}")
+        return []
+
 def add_portfolio_stock(user_id: str, ticker: str, shares: float, avg_cost: float, asset_group: str = 'ALL'):
     try:
         with get_db_connection() as conn:
@@ -223,6 +218,65 @@ def clear_stock_alert(user_id: str, ticker: str):
             c.close()
     except Exception as e:
         pass
+def get_all_price_alerts():
+    """Every active row of user_price_alerts (for the alert engine's index)."""
+    try:
+        with get_db_connection() as conn:
+            c = conn.cursor()
+            c.execute("SELECT id, user_id, symbol, target_price, condition FROM user_price_alerts WHERE is_active = 1")
+            rows = c.fetchall()
+            c.close()
+        return [{"id": r[0], "user_id": r[1], "symbol": r[2], "target_price": float(r[3]), "condition": r[4]} for r in rows]
+    except Exception as e:
+        print(f"❌ DB Error (get_all_price_alerts): {e}")
+        return []
+
+def deactivate_price_alerts(alerts: list):
+    """Deactivate fired alerts in one UPDATE. ``alerts`` = [(id, target_price)].
+
+    Only rows still active at that target are touched; returns their ids, so an
+    alert edited or already fired elsewhere is never notified twice.
+    """
+    if not alerts:
+        return []
+    try:
+        with get_db_connection() as conn:
+            c = conn.cursor()
+            c.execute("""
+                UPDATE user_price_alerts AS a SET is_active = 0
+                FROM unnest(%s::bigint[], %s::float8[]) AS v(id, target_price)
+                WHERE a.id = v.id AND a.target_price = v.target_price AND a.is_active = 1
+                RETURNING a.id
+            """, ([int(a[0]) for a in alerts], [float(a[1]) for a in alerts]))
+            rows = c.fetchall()
+            conn.commit()
+            c.close()
+        return [r[0] for r in rows]
+    except Exception as e:
+        print(f"❌ DB Error (deactivate_price_alerts): {e}")
+        return []
+
+def clear_stock_alerts(alerts: list):
+    """Bulk ``clear_stock_alert``. ``alerts`` = [(user_id, ticker, alert_price)]; returns the cleared (user_id, ticker)."""
+    if not alerts:
+        return []
+    try:
+        with get_db_connection() as conn:
+            c = conn.cursor()
+            c.execute("""
+                UPDATE portfolios AS p SET alert_price = 0
+                FROM unnest(%s::text[], %s::text[], %s::float8[]) AS v(user_id, ticker, alert_price)
+                WHERE p.user_id = v.user_id AND p.ticker = v.ticker AND p.alert_price = v.alert_price
+                RETURNING p.user_id, p.ticker
+            """, ([str(a[0]) for a in alerts], [str(a[1]).upper() for a in alerts], [float(a[2]) for a in alerts]))
+            rows = c.fetchall()
+            conn.commit()
+            c.close()
+        return [(r[0], r[1]) for r in rows]
+    except Exception as e:
+        print(f"❌ DB Error (clear_stock_alerts): {e}")
+        return []
+
 def get_user_price_alerts(user_id: str):
     """ดึงข้อมูลการตั้งเตือนราคาจากตาราง user_price_alerts"""
     try:
@@ -275,42 +329,33 @@ def set_user_price_alert(user_id: str, symbol: str, target_price: float, conditi
 
 # ─── Watchlist ───
 
-def _ensure_watchlist_table():
-    """Create watchlist table if it doesn't exist."""
+def get_user_watchlist(user_id: str) -> list[str]:
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
-            c.execute("""
-                CREATE TABLE IF NOT EXISTS user_watchlist (
-                    id SERIAL PRIMARY KEY,
-                    user_id VARCHAR(64) NOT NULL,
-                    ticker VARCHAR(20) NOT NULL,
-                    created_at TIMESTAMP DEFAULT NOW(),
-                    UNIQUE(user_id, ticker)
-                )
-            """)
-            conn.commit()
+            c.execute("SELECT ticker FROM user_watchlist WHERE user_id = %s ORDER BY created_at", (str(user_id),))
+            rows = c.fetchall()
             c.close()
+        return [r[0] for r in rows]
     except Exception as e:
-        print(f"❌ DB Error (ensure_watchlist_table): {e}")
+        print(f"❌ DB Error (get_user_watchlist): {e}")
+        return []
 
 
-def get_user_watchlist(user_id: str) -> list[str]:
-    _ensure_watchlist_table()
+def get_all_watchlist_tickers() -> list[str]:
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
-            c.execute("SELECT ticker FROM user_watchlist WHERE user_id = %s ORDER BY created_at", (str(user_id),))
+            c.execute("SELECT DISTINCT ticker FROM user_watchlist")
             rows = c.fetchall()
             c.close()
         return [r[0] for r in rows]
     except Exception as e:
-        print(f"❌ DB Error (get_user_watchlist): {e}")
+        print(f"❌ DB Error (get_all_watchlist_tickers): {e}")
         return []
 
 
 def add_watchlist_item(user_id: str, ticker: str):
-    _ensure_watchlist_table()
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
@@ -324,7 +369,6 @@ def add_watchlist_item(user_id: str, ticker: str):
 
 
 def remove_watchlist_item(user_id: str, ticker: str):
-    _ensure_watchlist_table()
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
@@ -339,35 +383,7 @@ def remove_watchlist_item(user_id: str, ticker: str):
 
 # ─── Online Presence ───
 
-_LAST_SEEN_COL_READY = False
-
-
-def _ensure_last_seen_column():
-    """Add last_seen column to users table if it doesn't exist. Runs once."""
-    global _LAST_SEEN_COL_READY
-    if _LAST_SEEN_COL_READY:
-        return
-    try:
-        with get_db_connection() as conn:
-            c = conn.cursor()
-            # Fast check first — SELECT is non-blocking unlike ALTER TABLE
-            c.execute("SELECT 1 FROM information_schema.columns WHERE table_name='users' AND column_name='last_seen'")
-            if c.fetchone():
-                _LAST_SEEN_COL_READY = True
-                c.close()
-                return
-            c.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS last_seen TIMESTAMP")
-            conn.commit()
-            c.close()
-        _LAST_SEEN_COL_READY = True
-    except Exception as e:
-        # Column likely already exists from a previous deploy — mark as ready anyway
-        _LAST_SEEN_COL_READY = True
-        print(f"⚠️ ensure_last_seen: {e} (marking as ready)")
-
-
 def update_user_last_seen(user_id: str):
-    _ensure_last_seen_column()
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
@@ -380,7 +396,6 @@ def update_user_last_seen(user_id: str):
 
 
 def get_online_users():
-    _ensure_last_seen_column()
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
@@ -409,88 +424,69 @@ def get_online_users():
 
 # ── Social Feed ──────────────────────────────────────────────
 
-_SOCIAL_TABLES_READY = False
+def encode_feed_cursor(post: dict) -> str:
+    """Keyset cursor of a feed row: ``<created_at>~<id>`` (the last post of a page)."""
+    return f"{post['created_at'] or ''}~{post['id']}"
 
 
-def _ensure_social_tables():
-    global _SOCIAL_TABLES_READY
-    if _SOCIAL_TABLES_READY:
-        return
-    try:
-        with get_db_connection() as conn:
-            c = conn.cursor()
-            c.execute("""
-                CREATE TABLE IF NOT EXISTS social_posts (
-                    id SERIAL PRIMARY KEY,
-                    user_id VARCHAR(64) NOT NULL,
-                    username VARCHAR(100) NOT NULL,
-                    role VARCHAR(20) DEFAULT 'free',
-                    content TEXT NOT NULL,
-                    ticker VARCHAR(20),
-                    created_at TIMESTAMP DEFAULT NOW(),
-                    like_count INTEGER DEFAULT 0
-                )
-            """)
-            c.execute("""
-                CREATE TABLE IF NOT EXISTS social_comments (
-                    id SERIAL PRIMARY KEY,
-                    post_id INTEGER NOT NULL REFERENCES social_posts(id) ON DELETE CASCADE,
-                    user_id VARCHAR(64) NOT NULL,
-                    username VARCHAR(100) NOT NULL,
-                    role VARCHAR(20) DEFAULT 'free',
-                    content TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT NOW()
-                )
-            """)
-            c.execute("""
-                CREATE TABLE IF NOT EXISTS social_likes (
-                    post_id INTEGER NOT NULL,
-                    user_id VARCHAR(64) NOT NULL,
-                    created_at TIMESTAMP DEFAULT NOW(),
-                    PRIMARY KEY(post_id, user_id)
-                )
-            """)
-            conn.commit()
-            c.close()
-        _SOCIAL_TABLES_READY = True
-    except Exception as e:
-        _SOCIAL_TABLES_READY = True  # tables likely exist from previous deploy
-        print(f"⚠️ ensure_social_tables: {e} (marking as ready)")
+def decode_feed_cursor(cursor: str) -> tuple[datetime, int]:
+    """``(created_at, id)`` from ``encode_feed_cursor``. Raises ValueError when malformed."""
+    ts, _, post_id = cursor.rpartition("~")
+    return datetime.fromisoformat(ts.removesuffix("Z")), int(post_id)
 
 
-def get_feed_posts(offset: int = 0, limit: int = 20, viewer_id: str = "") -> list:
-    _ensure_social_tables()
+FEED_QUERY = """
+    SELECT id, user_id, username, role, content, ticker, created_at, like_count, comment_count
+    FROM social_posts
+    {where}
+    ORDER BY created_at DESC, id DESC
+    LIMIT %s
+"""
+
+
+def feed_page(rows: list, liked_ids: set, limit: int) -> dict:
+    """Feed rows (``limit`` + 1 fetched) → ``{"posts", "next_cursor"}``."""
+    posts = [
+        {
+            "id": r[0], "user_id": r[1], "username": r[2], "role": r[3],
+            "content": r[4], "ticker": r[5],
+            "created_at": (r[6].isoformat() + "Z") if r[6] else None,
+            "like_count": r[7] or 0, "liked": r[0] in liked_ids,
+            "comment_count": r[8] or 0,
+        }
+        for r in rows[:limit]
+    ]
+    return {"posts": posts, "next_cursor": encode_feed_cursor(posts[-1]) if len(rows) > limit else None}
+
+
+def get_feed_posts(limit: int = 20, viewer_id: str = "", before: tuple | None = None) -> dict:
+    """One feed page, newest first, after the keyset ``before`` = (created_at, id).
+
+    Counters come from the denormalized like_count/comment_count columns and the
+    viewer's likes from one lookup for the whole page, so every page costs the
+    same however deep it is.
+    """
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
-            c.execute("""
-                SELECT p.id, p.user_id, p.username, p.role, p.content, p.ticker,
-                       p.created_at, p.like_count,
-                       EXISTS(SELECT 1 FROM social_likes l WHERE l.post_id = p.id AND l.user_id = %s) AS liked,
-                       (SELECT COUNT(*) FROM social_comments sc WHERE sc.post_id = p.id) AS comment_count
-                FROM social_posts p
-                ORDER BY p.created_at DESC
-                OFFSET %s LIMIT %s
-            """, (str(viewer_id), offset, limit))
+            if before:
+                c.execute(FEED_QUERY.format(where="WHERE (created_at, id) < (%s, %s)"), (before[0], before[1], limit + 1))
+            else:
+                c.execute(FEED_QUERY.format(where=""), (limit + 1,))
             rows = c.fetchall()
+            liked_ids = set()
+            if rows and viewer_id:
+                c.execute("SELECT post_id FROM social_likes WHERE user_id = %s AND post_id = ANY(%s)",
+                          (str(viewer_id), [r[0] for r in rows[:limit]]))
+                liked_ids = {r[0] for r in c.fetchall()}
             c.close()
-        return [
-            {
-                "id": r[0], "user_id": r[1], "username": r[2], "role": r[3],
-                "content": r[4], "ticker": r[5],
-                "created_at": (r[6].isoformat() + "Z") if r[6] else None,
-                "like_count": r[7] or 0, "liked": bool(r[8]),
-                "comment_count": r[9] or 0,
-            }
-            for r in rows
-        ]
+        return feed_page(rows, liked_ids, limit)
     except Exception as e:
         print(f"❌ DB Error (get_feed_posts): {e}")
-        return []
+        return {"posts": [], "next_cursor": None}
 
 
 def create_feed_post(user_id: str, username: str, role: str, content: str, ticker: str | None = None) -> int | None:
-    _ensure_social_tables()
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
@@ -508,7 +504,6 @@ def create_feed_post(user_id: str, username: str, role: str, content: str, ticke
 
 
 def delete_feed_post(post_id: int, user_id: str, is_admin: bool = False) -> bool:
-    _ensure_social_tables()
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
@@ -526,7 +521,6 @@ def delete_feed_post(post_id: int, user_id: str, is_admin: bool = False) -> bool
 
 
 def toggle_feed_like(post_id: int, user_id: str) -> dict:
-    _ensure_social_tables()
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
@@ -552,7 +546,6 @@ def toggle_feed_like(post_id: int, user_id: str) -> dict:
 
 
 def get_post_comments(post_id: int) -> list:
-    _ensure_social_tables()
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
@@ -575,15 +568,28 @@ def get_post_comments(post_id: int) -> list:
         return []
 
 
+# Comment insert/delete keep social_posts.comment_count in step, in the same statement
+ADD_COMMENT_SQL = """
+    WITH c AS (
+        INSERT INTO social_comments (post_id, user_id, username, role, content)
+        VALUES (%s, %s, %s, %s, %s) RETURNING id, post_id
+    ), counted AS (
+        UPDATE social_posts SET comment_count = comment_count + 1 WHERE id = (SELECT post_id FROM c)
+    )
+    SELECT id FROM c
+"""
+DELETE_COMMENT_SQL = """
+    WITH d AS (DELETE FROM social_comments WHERE id = %s {owner} RETURNING post_id)
+    UPDATE social_posts p SET comment_count = GREATEST(0, p.comment_count - 1)
+    FROM d WHERE p.id = d.post_id
+"""
+
+
 def add_post_comment(post_id: int, user_id: str, username: str, role: str, content: str) -> int | None:
-    _ensure_social_tables()
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
-            c.execute("""
-                INSERT INTO social_comments (post_id, user_id, username, role, content)
-                VALUES (%s, %s, %s, %s, %s) RETURNING id
-            """, (post_id, str(user_id), username, role, content))
+            c.execute(ADD_COMMENT_SQL, (post_id, str(user_id), username, role, content))
             cid = c.fetchone()[0]
             conn.commit()
             c.close()
@@ -594,14 +600,13 @@ def add_post_comment(post_id: int, user_id: str, username: str, role: str, conte
 
 
 def delete_post_comment(comment_id: int, user_id: str, is_admin: bool = False) -> bool:
-    _ensure_social_tables()
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
             if is_admin:
-                c.execute("DELETE FROM social_comments WHERE id = %s", (comment_id,))
+                c.execute(DELETE_COMMENT_SQL.format(owner=""), (comment_id,))
             else:
-                c.execute("DELETE FROM social_comments WHERE id = %s AND user_id = %s", (comment_id, str(user_id)))
+                c.execute(DELETE_COMMENT_SQL.format(owner="AND user_id = %s"), (comment_id, str(user_id)))
             deleted = c.rowcount > 0
             conn.commit()
             c.close()
@@ -612,7 +617,6 @@ def delete_post_comment(comment_id: int, user_id: str, is_admin: bool = False) -
 
 
 def count_user_posts_today(user_id: str) -> int:
-    _ensure_social_tables()
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
@@ -281,6 +281,7 @@ export default function FeedPage() {
   const [loading, setLoading] = useState(true);
   const [loadingMore, setLoadingMore] = useState(false);
   const [hasMore, setHasMore] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
 
   // Compose state
   const [content, setContent] = useState("");
@@ -291,18 +292,21 @@ export default function FeedPage() {
   const canPost = PRO_ROLES.includes(role);
 
   const fetchPosts = useCallback(
-    async (offset = 0, append = false) => {
+    async (cursor: string | null = null, append = false) => {
       if (!append) setLoading(true);
       else setLoadingMore(true);
       try {
-        const { data } = await api.get<{ posts: Post[] }>(`/api/feed?offset=${offset}&limit=20`);
+        const { data } = await api.get<{ posts: Post[]; next_cursor: string | null }>(
+          `/api/feed?limit=20${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ""}`
+        );
         const newPosts = data.posts || [];
         if (append) {
           setPosts((prev) => [...prev, ...newPosts]);
         } else {
           setPosts(newPosts);
         }
-        setHasMore(newPosts.length >= 20);
+        setNextCursor(data.next_cursor);
+        setHasMore(!!data.next_cursor);
       } catch {
         /* ignore */
       } finally {
@@ -542,7 +546,7 @@ export default function FeedPage() {
           {/* Load more */}
           {hasMore && (
             <button
-              onClick={() => fetchPosts(posts.length, true)}
+              onClick={() => fetchPosts(nextCursor, true)}
               disabled={loadingMore}
               className="w-full py-3 rounded-2xl text-sm font-bold transition-all border"
               style={{
@@ -1,10 +1,12 @@
 "use client";
 
-import { useState, useEffect, useCallback } from "react";
+import { useState, useEffect, useCallback, useRef } from "react";
 import { useAuth } from "@/lib/auth-store";
 import { useLang, tr } from "@/lib/i18n";
 import { logoUrl } from "@/lib/dashboard-helpers";
 import api from "@/lib/api";
+import { useLiveQuotes } from "@/lib/live-quotes";
+import { mergeVersioned } from "@/lib/versioned";
 import Sparkline from "@/components/sparkline";
 import ChartModal from "@/components/chart-modal";
 import AnimatedNumber from "@/components/animated-number";
@@ -69,10 +71,15 @@ export default function WatchlistPage() {
   const [sortKey, setSortKey] = useState<SortKey>("ticker");
   const [sortAsc, setSortAsc] = useState(true);
 
-  const refresh = useCallback(async () => {
+  const versionRef = useRef<string | undefined>(undefined);
+
+  // full=false asks only for rows changed since the last version
+  const refresh = useCallback(async (full = true) => {
     try {
-      const { data } = await api.get("/api/watchlist");
-      setItems(data.items || []);
+      const since = !full && versionRef.current ? `?since=${versionRef.current}` : "";
+      const { data } = await api.get(`/api/watchlist${since}`);
+      setItems((prev) => mergeVersioned(prev, data));
+      versionRef.current = data.version;
     } catch {
       /* ignore */
     } finally {
@@ -82,10 +89,19 @@ export default function WatchlistPage() {
 
   useEffect(() => {
     refresh();
-    const iv = setInterval(refresh, 10000);
+    // Prices stream live; the full rebuild (sparklines, day range, volume) only needs an occasional refresh
+    const iv = setInterval(() => refresh(false), 120000);
     return () => clearInterval(iv);
   }, [refresh]);
 
+  const live = useLiveQuotes(items.map((i) => i.ticker));
+  const liveItems = items.map((item) => {
+    const price = live[item.ticker];
+    if (price === undefined) return item;
+    const change_pct = item.prev_close > 0 ? ((price - item.prev_close) / item.prev_close) * 100 : item.change_pct;
+    return { ...item, price, change_pct };
+  });
+
   const handleAdd = async () => {
     const t = newTicker.trim().toUpperCase();
     if (!t) return;
@@ -128,7 +144,7 @@ export default function WatchlistPage() {
     }
   };
 
-  const sorted = [...items].sort((a, b) => {
+  const sorted = [...liveItems].sort((a, b) => {
     const dir = sortAsc ? 1 : -1;
     if (sortKey === "ticker") return a.ticker.localeCompare(b.ticker) * dir;
     return ((a[sortKey] || 0) - (b[sortKey] || 0)) * dir;
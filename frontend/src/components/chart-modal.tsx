@@ -12,6 +12,7 @@ import {
 import { X, Loader2, BarChart3, Activity, TrendingUp, Waves, Info } from "lucide-react";
 import { logoUrl } from "@/lib/dashboard-helpers";
 import api from "@/lib/api";
+import { CHART_POINTS, toCandleChart, type Candle, type CandleChart } from "@/lib/chart-payload";
 
 interface Props {
   ticker: string;
@@ -31,28 +32,6 @@ const PERIODS = [
   { label: "MAX", value: "max" },
 ];
 
-interface CandleData {
-  date: string;
-  open: number;
-  high: number;
-  low: number;
-  close: number;
-  volume: number;
-}
-
-interface ChartData {
-  candles: CandleData[];
-  indicators: {
-    rsi?: (number | string)[];
-    macd?: {
-      macd: (number | string)[];
-      signal: (number | string)[];
-      histogram: (number | string)[];
-    };
-    bollinger?: [(number | string)[], (number | string)[], (number | string)[]];
-  };
-}
-
 const CHART_OPTS = {
   layout: {
     background: { type: ColorType.Solid as const, color: "transparent" },
@@ -137,7 +116,7 @@ export default function ChartModal({ ticker, open, onClose }: Props) {
   const [showMA, setShowMA] = useState(false);
   const [showEMA, setShowEMA] = useState(false);
   const [showVWAP, setShowVWAP] = useState(false);
-  const [chartData, setChartData] = useState<ChartData | null>(null);
+  const [chartData, setChartData] = useState<CandleChart | null>(null);
   const [currentPrice, setCurrentPrice] = useState<number | null>(null);
   const [priceChange, setPriceChange] = useState(0);
   const [showInfo, setShowInfo] = useState(true);
@@ -165,11 +144,12 @@ export default function ChartModal({ ticker, open, onClose }: Props) {
     if (!open) return;
     setLoading(true);
     try {
-      const { data } = await api.get(
-        `/api/market/chart/${ticker}?period=${period}&indicators=rsi,macd,bollinger`,
+      const { data: payload } = await api.get(
+        `/api/market/chart/${ticker}?period=${period}&indicators=rsi,macd,bollinger&format=columnar&points=${CHART_POINTS}`,
       );
+      const data = toCandleChart(payload);
       setChartData(data);
-      const candles: CandleData[] = data.candles || [];
+      const candles: Candle[] = data.candles || [];
       if (candles.length > 0) {
         const last = candles[candles.length - 1];
         const first = candles[0];
@@ -3,6 +3,7 @@
 import { useEffect, useState } from "react";
 import { useLang, tr } from "@/lib/i18n";
 import api from "@/lib/api";
+import { useLiveQuotes } from "@/lib/live-quotes";
 
 interface TickerItem {
   symbol: string;
@@ -23,6 +24,7 @@ const DISPLAY_NAMES: Record<string, string> = {
 export default function TickerTape() {
   const [items, setItems] = useState<TickerItem[]>([]);
   const { lang } = useLang();
+  const live = useLiveQuotes(items.map((i) => i.symbol));
 
   useEffect(() => {
     let cancelled = false;
@@ -73,18 +75,18 @@ export default function TickerTape() {
       }
     };
 
+    // Load names once; prices then arrive as pushed deltas from /api/stream
     fetchPrices();
-    const interval = setInterval(fetchPrices, 10000); // refresh every 10s for real-time feel
     return () => {
       cancelled = true;
-      clearInterval(interval);
     };
   }, []);
 
   if (items.length === 0) return null;
 
   // Duplicate items 3x for seamless infinite scroll
-  const allItems = [...items, ...items, ...items];
+  const current = items.map((item) => ({ ...item, price: live[item.symbol] ?? item.price }));
+  const allItems = [...current, ...current, ...current];
 
   return (
     <div
@@ -0,0 +1,60 @@
+// Columnar chart payload from /api/market/chart?format=columnar
+// Parallel arrays (t = epoch seconds) instead of one object per candle.
+
+export interface ColumnarChart {
+  ticker: string;
+  interval: string;
+  n: number;
+  source_n: number;
+  downsampled: string | null;
+  t: number[];
+  o: (number | null)[];
+  h: (number | null)[];
+  l: (number | null)[];
+  c: (number | null)[];
+  v: number[];
+  indicators: Record<string, (number | null)[]>;
+}
+
+export interface Candle {
+  date: string;
+  open: number;
+  high: number;
+  low: number;
+  close: number;
+  volume: number;
+}
+
+export type Line = (number | string | null)[];
+
+export interface CandleChart {
+  candles: Candle[];
+  indicators: {
+    rsi?: Line;
+    macd?: { macd: Line; signal: Line; histogram: Line };
+    bollinger?: [Line, Line, Line];
+  };
+}
+
+// Max bars requested for long periods — the server merges buckets of bars into OHLC bars.
+export const CHART_POINTS = 1500;
+
+export function toCandleChart(p: ColumnarChart): CandleChart {
+  const candles: Candle[] = p.t.map((t, i) => ({
+    date: new Date(t * 1000).toISOString().slice(0, 10),
+    open: p.o[i] ?? NaN,
+    high: p.h[i] ?? NaN,
+    low: p.l[i] ?? NaN,
+    close: p.c[i] ?? NaN,
+    volume: p.v[i] ?? 0,
+  }));
+  const ind = p.indicators || {};
+  return {
+    candles,
+    indicators: {
+      rsi: ind.rsi,
+      macd: ind.macd ? { macd: ind.macd, signal: ind.macd_signal, histogram: ind.macd_hist } : undefined,
+      bollinger: ind.bb_upper ? [ind.bb_upper, ind.bb_mid, ind.bb_lower] : undefined,
+    },
+  };
+}
@@ -1,5 +1,6 @@
 import { useEffect, useState, useCallback, useRef } from "react";
 import api from "./api";
+import { mergeVersioned } from "./versioned";
 
 // ─── Portfolio ───
 export interface PortfolioItem {
@@ -32,6 +33,7 @@ export function usePortfolio(currency: string = "USD", autoRefreshMs: number = 1
   const [error, setError] = useState("");
   const intervalRef = useRef<ReturnType<typeof setInterval> | null>(null);
   const hasLoaded = useRef(false);
+  const versionRef = useRef<string | undefined>(undefined);
 
   const refresh = useCallback(async () => {
     // Only show loading spinner on first load, not on currency switch
@@ -41,6 +43,7 @@ export function usePortfolio(currency: string = "USD", autoRefreshMs: number = 1
       const { data } = await api.get(`/api/portfolio?currency=${currency}`);
       setItems(data.items);
       setSummary(data.summary);
+      versionRef.current = data.version;
       hasLoaded.current = true;
     } catch {
       setError("Failed to load portfolio");
@@ -49,12 +52,14 @@ export function usePortfolio(currency: string = "USD", autoRefreshMs: number = 1
     }
   }, [currency]);
 
-  // Silent refresh (no loading spinner)
+  // Silent refresh (no loading spinner) — only rows changed since the last version are sent
   const silentRefresh = useCallback(async () => {
     try {
-      const { data } = await api.get(`/api/portfolio?currency=${currency}`);
-      setItems(data.items);
+      const since = versionRef.current ? `&since=${versionRef.current}` : "";
+      const { data } = await api.get(`/api/portfolio?currency=${currency}${since}`);
+      setItems((prev) => mergeVersioned(prev, data));
       setSummary(data.summary);
+      versionRef.current = data.version;
     } catch {
       /* silent fail on auto-refresh */
     }
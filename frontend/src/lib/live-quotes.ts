@@ -0,0 +1,71 @@
+import { useEffect, useState } from "react";
+
+// Live prices from GET /api/stream (Server-Sent Events).
+// Frames carry only changed prices; they are merged into one { ticker: price } map.
+// fetch() is used instead of EventSource so the Bearer token can be sent.
+
+export type Quotes = Record<string, number>;
+
+const RETRY_MS = 3000;
+const MAX_RETRY_MS = 30000;
+
+function parseFrame(frame: string): { event: string; data: string } {
+  let event = "message";
+  const data: string[] = [];
+  for (const line of frame.split("\n")) {
+    if (line.startsWith("event:")) event = line.slice(6).trim();
+    else if (line.startsWith("data:")) data.push(line.slice(5).trim());
+  }
+  return { event, data: data.join("\n") };
+}
+
+export function useLiveQuotes(tickers: string[]): Quotes {
+  const [quotes, setQuotes] = useState<Quotes>({});
+  const key = Array.from(new Set(tickers.map((t) => t.toUpperCase()))).sort().join(",");
+
+  useEffect(() => {
+    if (!key || typeof window === "undefined") return;
+    const controller = new AbortController();
+    let retry = RETRY_MS;
+    let timer: ReturnType<typeof setTimeout> | null = null;
+
+    const connect = async () => {
+      try {
+        const res = await fetch(`/api/stream?tickers=${encodeURIComponent(key)}`, {
+          headers: { Authorization: `Bearer ${localStorage.getItem("access_token") || ""}` },
+          signal: controller.signal,
+        });
+        if (!res.ok || !res.body) throw new Error(`stream ${res.status}`);
+        retry = RETRY_MS;
+        const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buf = "";
+        for (;;) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buf += value;
+          let end;
+          while ((end = buf.indexOf("\n\n")) >= 0) {
+            const { event, data } = parseFrame(buf.slice(0, end));
+            buf = buf.slice(end + 2);
+            if (event === "quotes" && data) {
+              const changes: Quotes = JSON.parse(data);
+              setQuotes((prev) => ({ ...prev, ...changes }));
+            }
+          }
+        }
+      } catch {
+        if (controller.signal.aborted) return;
+        retry = Math.min(retry * 2, MAX_RETRY_MS);
+      }
+      if (!controller.signal.aborted) timer = setTimeout(connect, retry);
+    };
+
+    connect();
+    return () => {
+      controller.abort();
+      if (timer) clearTimeout(timer);
+    };
+  }, [key]);
+
+  return quotes;
+}
@@ -0,0 +1,20 @@
+// Delta responses from list endpoints that accept ?since=<version> (/api/portfolio, /api/watchlist).
+// With delta=true, items holds only changed/new rows and removed lists keys that are gone.
+
+export interface Versioned<T> {
+  items: T[];
+  version?: string;
+  delta?: boolean;
+  removed?: string[];
+}
+
+export function mergeVersioned<T extends { ticker: string }>(prev: T[], data: Versioned<T>): T[] {
+  if (!data.delta) return data.items || [];
+  const changed = new Map(data.items.map((row) => [row.ticker, row]));
+  const removed = new Set(data.removed || []);
+  const merged = prev
+    .filter((row) => !removed.has(row.ticker))
+    .map((row) => changed.get(row.ticker) ?? row);
+  const known = new Set(prev.map((row) => row.ticker));
+  return merged.concat(data.items.filter((row) => !known.has(row.ticker)));
+}
@@ -6,6 +6,10 @@ import uvicorn
 if __name__ == "__main__":
     port = int(os.getenv("API_PORT", "8005"))
     reload = os.getenv("APP_ENV", "development") != "production"
+    if not reload:
+        # Multiple workers → share caches through one private SQLite file (services/shared_cache.py;
+        # $XDG_RUNTIME_DIR/apexify or .cache/shared). The env var is inherited by worker processes.
+        os.environ.setdefault("SHARED_CACHE_BACKEND", "sqlite")
 
     uvicorn.run(
         "api.main:app",
@@ -0,0 +1,129 @@
+"""Benchmark: services/indicators.py vs the old pure-Python RSI/MACD loops.
+
+Runs on synthetic 20-year daily closes (~5040 bars), so no network is needed:
+
+    python scripts/bench_indicators.py
+    python scripts/bench_indicators.py --bars 5040 --tickers 50 --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import indicators  # noqa: E402
+
+
+# ── the loops the chart paths used before the vectorized engine ──
+
+def legacy_rsi_series(closes: list, period: int = 14) -> list:
+    n = len(closes)
+    if n < period + 1:
+        return ['-'] * n
+    result = ['-'] * period
+    gains, losses = [], []
+    for i in range(1, n):
+        d = closes[i] - closes[i - 1]
+        gains.append(max(d, 0.0))
+        losses.append(abs(min(d, 0.0)))
+    avg_gain = sum(gains[:period]) / period
+    avg_loss = sum(losses[:period]) / period
+    result.append(100.0 if avg_loss == 0 else round(100 - 100 / (1 + avg_gain / avg_loss), 2))
+    for i in range(period, n - 1):
+        avg_gain = (avg_gain * (period - 1) + gains[i]) / period
+        avg_loss = (avg_loss * (period - 1) + losses[i]) / period
+        result.append(100.0 if avg_loss == 0 else round(100 - 100 / (1 + avg_gain / avg_loss), 2))
+    return result
+
+
+def legacy_macd_series(closes: list, fast: int = 12, slow: int = 26, signal: int = 9):
+    def _ema(data, period):
+        k = 2 / (period + 1)
+        ema_vals = [data[0]]
+        for v in data[1:]:
+            ema_vals.append(v * k + ema_vals[-1] * (1 - k))
+        return ema_vals
+
+    fast_ema = _ema(closes, fast)
+    slow_ema = _ema(closes, slow)
+    macd_line = [round(f - s, 4) for f, s in zip(fast_ema, slow_ema)]
+    signal_raw = _ema(macd_line[slow - 1:], signal)
+    signal_line = ['-'] * (slow - 1) + [round(v, 4) for v in signal_raw]
+    histogram = ['-'] * (slow + signal - 2) + [
+        round(macd_line[slow - 1 + i] - signal_raw[i], 4) for i in range(len(signal_raw))
+    ]
+    return ['-'] * (slow - 1) + macd_line[slow - 1:], signal_line, histogram
+
+
+def legacy_clean(lst: list) -> list:
+    return [None if v == '-' else v for v in lst]
+
+
+def random_walk(bars: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 100.0 * np.cumprod(1.0 + rng.normal(0.0, 0.02, bars))
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bars", type=int, default=5040, help="bars per ticker (20y daily ≈ 5040)")
+    parser.add_argument("--tickers", type=int, default=20, help="tickers in the batch comparison")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    closes = random_walk(args.bars, 0)
+    closes_list = closes.tolist()
+    specs = ["rsi", "macd", "bollinger"]
+
+    def legacy_one():
+        legacy_clean(legacy_rsi_series(closes_list))
+        for line in legacy_macd_series(closes_list):
+            legacy_clean(line)
+
+    def vector_one():
+        values = indicators.compute({"close": closes}, specs)
+        indicators.to_list(values["rsi"], 2)
+        for line in values["macd"]:
+            indicators.to_list(line, 4)
+
+    universe = {f"T{i}": {"close": random_walk(args.bars, i)} for i in range(args.tickers)}
+    universe_lists = {t: bars["close"].tolist() for t, bars in universe.items()}
+
+    def legacy_batch():
+        for c in universe_lists.values():
+            legacy_rsi_series(c)
+            legacy_macd_series(c)
+
+    def vector_batch():
+        indicators.compute_many(universe, specs)
+
+    rows = [
+        (f"1 ticker × {args.bars} bars (RSI+MACD, JSON-ready)", best_of(legacy_one, args.repeat), best_of(vector_one, args.repeat)),
+        (f"{args.tickers} tickers × {args.bars} bars (RSI+MACD[+BB])", best_of(legacy_batch, args.repeat), best_of(vector_batch, args.repeat)),
+    ]
+    print(f"{'case':<48} {'legacy ms':>10} {'numpy ms':>10} {'speedup':>8}")
+    for name, old, new in rows:
+        print(f"{name:<48} {old:>10.2f} {new:>10.2f} {old / new:>7.1f}x")
+
+    legacy_rsi = np.array(legacy_clean(legacy_rsi_series(closes_list)), dtype=float)
+    diff = np.nanmax(np.abs(legacy_rsi - indicators.rsi(closes)))
+    print(f"max |RSI legacy - RSI numpy| = {diff:.4f} (legacy rounds to 2 dp)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark: PortfolioValuator vs the per-position Python loop it replaced.
+
+Synthetic holdings and prices, no network or database:
+
+    python scripts/bench_portfolio_valuation.py
+    python scripts/bench_portfolio_valuation.py --positions 1000 5000 20000 --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.portfolio_valuator import portfolio_valuator  # noqa: E402
+
+
+def legacy_value(portfolio: list, prices: dict, thb_rate: float) -> dict:
+    """The loop _build_portfolio_response used before the valuator (sparklines omitted)."""
+    items = []
+    total_value = 0.0
+    total_cost = 0.0
+    for stock in portfolio:
+        price = prices.get(stock["ticker"], 0.0)
+        value = price * stock["shares"]
+        cost = stock["avg_cost"] * stock["shares"]
+        pnl = value - cost
+        pnl_pct = (pnl / cost * 100) if cost > 0 else 0.0
+        items.append({
+            "ticker": stock["ticker"],
+            "avg_cost": round(stock["avg_cost"] * thb_rate, 2),
+            "price": round(price * thb_rate, 2),
+            "value": round(value * thb_rate, 2),
+            "cost": round(cost * thb_rate, 2),
+            "pnl": round(pnl * thb_rate, 2),
+            "pnl_pct": round(pnl_pct, 2),
+        })
+        total_value += value
+        total_cost += cost
+    return {"items": items, "total_value": round(total_value * thb_rate, 2), "total_cost": round(total_cost * thb_rate, 2)}
+
+
+def vector_value(portfolio: list, prices: dict, thb_rate: float) -> dict:
+    val = portfolio_valuator.value(portfolio, prices, fx_rate=thb_rate)
+    columns = [val.rounded(c) for c in ("avg_cost", "price", "value", "cost", "pnl", "pnl_pct")]
+    items = [
+        dict(zip(("ticker", "avg_cost", "price", "value", "cost", "pnl", "pnl_pct"), row))
+        for row in zip(val.tickers, *columns)
+    ]
+    return {"items": items, "total_value": round(val.totals["total_value"], 2), "total_cost": round(val.totals["total_cost"], 2)}
+
+
+def synthetic(n: int, seed: int = 0) -> tuple[list, dict]:
+    rng = np.random.default_rng(seed)
+    tickers = [f"T{i:05d}" for i in range(n)]
+    shares = rng.uniform(1, 500, n).round(4).tolist()
+    cost = rng.uniform(5, 800, n).round(2).tolist()
+    portfolio = [{"ticker": t, "shares": s, "avg_cost": c} for t, s, c in zip(tickers, shares, cost)]
+    prices = dict(zip(tickers, (np.array(cost) * rng.uniform(0.5, 1.8, n)).tolist()))
+    return portfolio, prices
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--positions", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--thb", type=float, default=36.5, help="FX rate applied to money columns")
+    args = parser.parse_args()
+
+    print("numpy ms includes building the response rows; valuation ms is the array math alone.")
+    print(f"{'positions':>10} {'loop ms':>10} {'numpy ms':>10} {'speedup':>8} {'valuation ms':>13}  totals match")
+    for n in args.positions:
+        portfolio, prices = synthetic(n)
+        old = best_of(lambda: legacy_value(portfolio, prices, args.thb), args.repeat)
+        new = best_of(lambda: vector_value(portfolio, prices, args.thb), args.repeat)
+        core = best_of(lambda: portfolio_valuator.value(portfolio, prices, fx_rate=args.thb), args.repeat)
+        a, b = legacy_value(portfolio, prices, args.thb), vector_value(portfolio, prices, args.thb)
+        match = abs(a["total_value"] - b["total_value"]) < 0.05 and abs(a["total_cost"] - b["total_cost"]) < 0.05
+        print(f"{n:>10} {old:>10.2f} {new:>10.2f} {old / new:>7.1f}x {core:>13.2f}  {match}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""Background price-alert engine.
+
+Alerts come from two places: ``user_price_alerts`` rows (explicit above/below
+targets) and ``portfolios.alert_price`` (a single level per holding, treated
+as "below" when it sits under the current price — the UI defaults it to 95%
+of price, a stop — and "above" otherwise).
+
+All active alerts are loaded into an ``AlertIndex``: per ticker, a min-heap of
+"above" targets and a max-heap of "below" targets. A price tick pops exactly
+the crossed alerts from the top of each heap — O(k log n) for k fired alerts,
+nothing for the rest — so 100k alerts cost nothing between crossings.
+
+The engine listens to the central price hub for every ticker with an alert.
+Crossed alerts are handed to the engine thread, which deactivates them in one
+bulk UPDATE per table and enqueues a Telegram message for each row the UPDATE
+actually changed (``RETURNING``), so an alert edited meanwhile — or already
+fired by another process running its own engine — is never notified twice.
+The index is rebuilt from the database every ALERT_RESYNC_INTERVAL seconds to
+pick up new, edited and deleted alerts.
+"""
+
+from __future__ import annotations
+
+import heapq
+import queue
+import threading
+import time
+from typing import NamedTuple
+
+from core.config import ALERT_ENGINE_ENABLED, ALERT_RESYNC_INTERVAL
+from core.models import clear_stock_alerts, deactivate_price_alerts, get_all_active_alerts, get_all_price_alerts
+from services.notifier import notifier
+from services.price_hub import price_hub
+from services.yahoo_finance import peek_cached_price
+
+
+class Alert(NamedTuple):
+    source: str        # "price" (user_price_alerts) or "portfolio" (portfolios.alert_price)
+    alert_id: int | None
+    user_id: str
+    ticker: str
+    target: float
+    condition: str     # "above" or "below"
+
+
+class AlertIndex:
+    """Per-ticker heaps of thresholds: fire "above" when price >= target, "below" when price <= target."""
+
+    def __init__(self, alerts: list[Alert]):
+        above: dict[str, list] = {}
+        below: dict[str, list] = {}
+        for seq, alert in enumerate(alerts):
+            if alert.condition == "above":
+                above.setdefault(alert.ticker, []).append((alert.target, seq, alert))
+            else:
+                below.setdefault(alert.ticker, []).append((-alert.target, seq, alert))
+        for heaps in (above, below):
+            for heap in heaps.values():
+                heapq.heapify(heap)
+        self._above = above
+        self._below = below
+        self._size = len(alerts)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def tickers(self) -> set[str]:
+        return set(self._above) | set(self._below)
+
+    def crossed(self, ticker: str, price: float) -> list[Alert]:
+        """Pop and return every alert on ``ticker`` that ``price`` crosses."""
+        fired = []
+        heap = self._above.get(ticker)
+        while heap and heap[0][0] <= price:
+            fired.append(heapq.heappop(heap)[2])
+        heap = self._below.get(ticker)
+        while heap and -heap[0][0] >= price:
+            fired.append(heapq.heappop(heap)[2])
+        self._size -= len(fired)
+        return fired
+
+
+def _direction(condition) -> str:
+    """``user_price_alerts.condition`` → "above"/"below". The API and bot store words, NiceGUI stores '>'/'<'."""
+    cond = str(condition).strip().lower()
+    return "below" if cond in ("below", "<", "<=") else "above"
+
+
+def load_alerts(directions: dict | None = None) -> list[Alert]:
+    """Every active alert from both tables (two queries, no per-alert lookups).
+
+    ``directions`` remembers the condition picked for each portfolio level, so a
+    reload after the price has moved through it does not flip the direction;
+    it is pruned to the levels that still exist.
+    """
+    directions = {} if directions is None else directions
+    alerts = [
+        Alert("price", row["id"], str(row["user_id"]), str(row["symbol"]).upper(), row["target_price"],
+              _direction(row["condition"]))
+        for row in get_all_price_alerts()
+    ]
+    seen = set()
+    for row in get_all_active_alerts():
+        ticker = str(row["ticker"]).upper()
+        key = (str(row["user_id"]), ticker, row["alert_price"])
+        condition = directions.get(key)
+        if condition is None:
+            price = peek_cached_price(ticker)
+            condition = "below" if price <= 0 or row["alert_price"] < price else "above"
+        seen.add(key)
+        directions[key] = condition
+        alerts.append(Alert("portfolio", None, key[0], ticker, row["alert_price"], condition))
+    for key in [k for k in directions if k not in seen]:
+        del directions[key]
+    return alerts
+
+
+def _message(alert: Alert, price: float) -> str:
+    arrow, verb = ("🚀", "ทะลุขึ้นเหนือ") if alert.condition == "above" else ("🔻", "หลุดลงต่ำกว่า")
+    return (
+        f"{arrow} <b>แจ้งเตือนราคา {alert.ticker}</b>\n"
+        f"ราคาล่าสุด <b>${price:,.2f}</b> {verb}เป้า ${alert.target:,.2f}\n"
+        f"<i>การแจ้งเตือนนี้ถูกปิดแล้ว ตั้งใหม่ได้ที่ Dashboard</i>"
+    )
+
+
+class AlertEngine:
+    """Keeps the alert index in sync with the database and fires alerts on hub price ticks."""
+
+    def __init__(self, resync_interval: float, enabled: bool = True):
+        self.resync_interval = max(float(resync_interval), 10.0)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._index = AlertIndex([])
+        self._prices: dict[str, float] = {}
+        self._directions: dict = {}
+        self._fired: queue.Queue = queue.Queue()
+        self._resync_now = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._listener = None
+        self._resyncs = 0
+        self._last_resync_at = 0.0
+        self._last_resync_duration = 0.0
+        self._evaluated = 0
+        self._crossed = 0
+        self._deactivated = 0
+        self._errors = 0
+
+    # ── hub thread ────────────────────────────────────────────────────
+
+    def _on_prices(self, changes: dict[str, float]) -> None:
+        fired = []
+        with self._lock:
+            self._prices.update(changes)
+            for ticker, price in changes.items():
+                fired.extend((alert, price) for alert in self._index.crossed(ticker, price))
+            self._evaluated += len(changes)
+            self._crossed += len(fired)
+        if fired:
+            self._fired.put(fired)
+
+    # ── engine thread ─────────────────────────────────────────────────
+
+    def resync(self) -> int:
+        """Rebuild the index from the database. Returns the number of active alerts."""
+        started = time.time()
+        index = AlertIndex(load_alerts(self._directions))
+        tickers = index.tickers()
+        with self._lock:
+            self._index = index
+            # Alerts already crossed at the last known price fire without waiting for a change.
+            known = {t: p for t, p in self._prices.items() if t in tickers}
+            self._prices = known
+            self._resyncs += 1
+            self._last_resync_at = started
+            self._last_resync_duration = time.time() - started
+        if known:
+            self._on_prices(known)
+        if self._listener is None:
+            self._listener = price_hub.listen(tickers, self._on_prices)
+        else:
+            self._listener.update(tickers)
+        return len(index)
+
+    def request_resync(self) -> None:
+        """Pick up alert changes now instead of at the next interval (e.g. after one was created)."""
+        self._resync_now.set()
+
+    def _fire(self, fired: list[tuple[Alert, float]]) -> None:
+        price_rows = [(a, p) for a, p in fired if a.source == "price"]
+        stock_rows = [(a, p) for a, p in fired if a.source == "portfolio"]
+        done_ids = set(deactivate_price_alerts([(a.alert_id, a.target) for a, _ in price_rows]))
+        done_stock = set(clear_stock_alerts([(a.user_id, a.ticker, a.target) for a, _ in stock_rows]))
+        confirmed = [(a, p) for a, p in price_rows if a.alert_id in done_ids]
+        confirmed += [(a, p) for a, p in stock_rows if (a.user_id, a.ticker) in done_stock]
+        notifier.enqueue_many([(a.user_id, _message(a, p)) for a, p in confirmed], kind="alert")
+        with self._lock:
+            self._deactivated += len(confirmed)
+
+    def _loop(self) -> None:
+        next_resync = 0.0
+        while not self._stop.is_set():
+            try:
+                if self._resync_now.is_set() or time.monotonic() >= next_resync:
+                    self._resync_now.clear()
+                    self.resync()
+                    next_resync = time.monotonic() + self.resync_interval
+                try:
+                    fired = self._fired.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+                # Drain everything that piled up so one UPDATE covers it.
+                while True:
+                    try:
+                        fired.extend(self._fired.get_nowait())
+                    except queue.Empty:
+                        break
+                self._fire(fired)
+            except Exception as e:
+                with self._lock:
+                    self._errors += 1
+                print(f"[AlertEngine] error: {e}")
+                self._stop.wait(5.0)
+
+    def start(self) -> None:
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="alert-engine", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "running": bool(self._thread and self._thread.is_alive()),
+                "active_alerts": len(self._index),
+                "tickers": len(self._index.tickers()),
+                "resyncs": self._resyncs,
+                "last_resync_at": self._last_resync_at,
+                "last_resync_duration": round(self._last_resync_duration, 3),
+                "prices_evaluated": self._evaluated,
+                "crossed": self._crossed,
+                "deactivated": self._deactivated,
+                "errors": self._errors,
+            }
+
+
+alert_engine = AlertEngine(ALERT_RESYNC_INTERVAL, enabled=ALERT_ENGINE_ENABLED)
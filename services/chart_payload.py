@@ -0,0 +1,204 @@
+"""Columnar chart payloads built straight from the OHLCV store's NumPy buffers.
+
+A chart is a handful of parallel columns — ``t`` (epoch seconds), ``o/h/l/c/v``
+and one column per indicator line — instead of one dict per bar. Three
+encodings share the same columns:
+
+- ``rows``     — the original ``{"candles": [{date, open, ...}], "indicators"}`` shape.
+- ``columnar`` — ``{"t": [...], "o": [...], ..., "indicators": {name: [...]}}``.
+- ``binary``   — the columns as raw little-endian typed arrays (see ``encode_binary``).
+
+With a point budget the columns are downsampled before encoding:
+``minmax`` merges each bucket of bars into one OHLC bar (first open, max high,
+min low, last close, summed volume — nothing spiky is lost), ``lttb`` keeps the
+bars that best preserve the close line's shape (Largest-Triangle-Three-Buckets).
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+from typing import Any
+
+import numpy as np
+
+BINARY_MEDIA_TYPE = "application/vnd.apexify.chart"
+BINARY_MAGIC = b"APXC"
+BINARY_VERSION = 1
+
+# Indicator results that are several lines → one column per line.
+_MULTI_LINE = {
+    "macd": ("macd", "macd_signal", "macd_hist"),
+    "bollinger": ("bb_upper", "bb_mid", "bb_lower"),
+}
+# Decimal places used in JSON encodings.
+_DECIMALS = {"o": 4, "h": 4, "l": 4, "c": 4, "rsi": 2, "bb_upper": 2, "bb_mid": 2, "bb_lower": 2}
+
+
+def _indicator_columns(values: dict[str, Any]) -> dict[str, np.ndarray]:
+    out: dict[str, np.ndarray] = {}
+    for spec, value in values.items():
+        if isinstance(value, tuple):
+            names = _MULTI_LINE.get(spec) or tuple(f"{spec}_{i}" for i in range(len(value)))
+            out.update(zip(names, value))
+        else:
+            out[spec] = value
+    return out
+
+
+def lttb_indices(t: np.ndarray, y: np.ndarray, budget: int) -> np.ndarray:
+    """Indices of the ``budget`` points Largest-Triangle-Three-Buckets keeps (first and last included)."""
+    n = len(y)
+    if budget >= n or budget < 3:
+        return np.arange(n)
+    x = t.astype(np.float64)
+    y = np.nan_to_num(y.astype(np.float64), nan=0.0)
+    edges = np.linspace(1, n - 1, budget - 1).astype(np.int64)
+    keep = np.empty(budget, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(budget - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (the last bucket's "next" is the final point).
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        if nhi <= nlo:
+            nlo, nhi = n - 1, n
+        ax, ay = x[a], y[a]
+        bx, by = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        area = np.abs((ax - bx) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (by - ay))
+        a = lo + int(np.argmax(area)) if hi > lo else lo
+        keep[i + 1] = a
+    return keep
+
+
+def _bucket_starts(n: int, budget: int) -> np.ndarray:
+    return np.unique(np.linspace(0, n, budget + 1).astype(np.int64)[:-1])
+
+
+def build_columns(bars: Any, values: dict[str, Any] | None = None, points: int | None = None, method: str = "minmax") -> tuple[dict, dict[str, np.ndarray]]:
+    """``(meta, columns)`` for a chart, downsampled to ``points`` bars when given."""
+    n = len(bars)
+    columns: dict[str, np.ndarray] = {
+        "t": bars.t, "o": bars.open, "h": bars.high, "l": bars.low, "c": bars.close, "v": bars.volume,
+    }
+    lines = _indicator_columns(values or {})
+    meta: dict[str, Any] = {
+        "ticker": bars.ticker,
+        "interval": bars.interval,
+        "n": n,
+        "source_n": n,
+        "downsampled": None,
+        "indicators": list(lines),
+    }
+    columns.update(lines)
+
+    if points and n > points:
+        if method == "lttb":
+            idx = lttb_indices(bars.t, bars.close, points)
+            columns = {name: col[idx] for name, col in columns.items()}
+        else:
+            starts = _bucket_starts(n, points)
+            ends = np.append(starts[1:], n) - 1
+            merged = {
+                "t": bars.t[starts],
+                "o": bars.open[starts],
+                "h": np.maximum.reduceat(bars.high, starts),
+                "l": np.minimum.reduceat(bars.low, starts),
+                "c": bars.close[ends],
+                "v": np.add.reduceat(bars.volume, starts),
+            }
+            # Indicators are read at each bucket's closing bar, like the close.
+            merged.update({name: col[ends] for name, col in lines.items()})
+            columns = merged
+        meta["n"] = len(columns["t"])
+        meta["downsampled"] = method
+    return meta, columns
+
+
+def date_labels(t: np.ndarray, unit: str = "D") -> list[str]:
+    """Epoch seconds → ISO labels ('D' → YYYY-MM-DD, 'm' → YYYY-MM-DDTHH:MM)."""
+    return np.datetime_as_string(np.asarray(t).astype("datetime64[s]"), unit=unit).tolist()
+
+
+def _json_list(col: np.ndarray, decimals: int | None) -> list:
+    values = np.asarray(col, dtype=np.float64)
+    rounded = np.round(values, decimals) if decimals is not None else values
+    out = rounded.tolist()
+    for i in np.flatnonzero(~np.isfinite(values)).tolist():
+        out[i] = None
+    return out
+
+
+def to_columnar(meta: dict, columns: dict[str, np.ndarray]) -> dict:
+    payload: dict[str, Any] = {k: meta[k] for k in ("ticker", "interval", "n", "source_n", "downsampled")}
+    payload["t"] = columns["t"].tolist()
+    for name in ("o", "h", "l", "c"):
+        payload[name] = _json_list(columns[name], _DECIMALS[name])
+    payload["v"] = np.nan_to_num(columns["v"]).astype(np.int64).tolist()
+    payload["indicators"] = {
+        name: _json_list(columns[name], _DECIMALS.get(name, 4)) for name in meta["indicators"]
+    }
+    return payload
+
+
+def to_rows(meta: dict, columns: dict[str, np.ndarray], date_unit: str = "D") -> dict:
+    """The original per-candle response shape, for clients that still expect it."""
+    payload = to_columnar(meta, columns)
+    dates = date_labels(columns["t"], date_unit)
+    candles = [
+        {"date": d, "open": o, "high": h, "low": l, "close": c, "volume": v}
+        for d, o, h, l, c, v in zip(dates, payload["o"], payload["h"], payload["l"], payload["c"], payload["v"])
+    ]
+    lines = payload["indicators"]
+    indicators: dict[str, Any] = {}
+    for spec, names in _MULTI_LINE.items():
+        if names[0] in lines:
+            if spec == "macd":
+                indicators[spec] = dict(zip(("macd", "signal", "histogram"), (lines[n] for n in names)))
+            else:
+                indicators[spec] = [lines[n] for n in names]
+    multi = {n for names in _MULTI_LINE.values() for n in names}
+    indicators.update({name: line for name, line in lines.items() if name not in multi})
+    return {"candles": candles, "indicators": indicators}
+
+
+def encode_binary(meta: dict, columns: dict[str, np.ndarray]) -> bytes:
+    """Compact encoding: ``APXC`` · u8 version · 3 pad · u32 header length · JSON header · columns.
+
+    Columns follow the header in order, each 8-byte aligned, as little-endian
+    typed arrays: ``t`` and ``v`` float64, prices and indicators float32 (NaN =
+    no value). The header lists ``{name, dtype, offset, length}`` per column,
+    offsets relative to the start of the column area, so a browser can view
+    each one with ``new Float32Array(buf, base + offset, length)``.
+    """
+    order = ["t", "o", "h", "l", "c", "v", *meta["indicators"]]
+    specs, chunks, offset = [], [], 0
+    for name in order:
+        dtype = "<f8" if name in ("t", "v") else "<f4"
+        data = np.ascontiguousarray(columns[name], dtype=dtype).tobytes()
+        specs.append({"name": name, "dtype": dtype, "offset": offset, "length": int(len(columns[name]))})
+        pad = -len(data) % 8
+        chunks.append(data + b"\0" * pad)
+        offset += len(data) + pad
+
+    header_meta = {k: meta[k] for k in ("ticker", "interval", "n", "source_n", "downsampled")}
+    header = json.dumps({**header_meta, "columns": specs}, separators=(",", ":")).encode()
+    header += b" " * (-(len(BINARY_MAGIC) + 8 + len(header)) % 8)
+    prefix = BINARY_MAGIC + struct.pack("<B3xI", BINARY_VERSION, len(header))
+    return b"".join([prefix, header, *chunks])
+
+
+def decode_binary(blob: bytes) -> tuple[dict, dict[str, np.ndarray]]:
+    """Inverse of ``encode_binary`` (tests, scripts and Python clients)."""
+    if blob[:4] != BINARY_MAGIC:
+        raise ValueError("Not an Apexify chart payload")
+    version, length = struct.unpack_from("<B3xI", blob, 4)
+    if version != BINARY_VERSION:
+        raise ValueError(f"Unsupported chart payload version {version}")
+    header = json.loads(blob[12:12 + length])
+    base = 12 + length
+    columns = {
+        col["name"]: np.frombuffer(blob, dtype=col["dtype"], count=col["length"], offset=base + col["offset"])
+        for col in header.pop("columns")
+    }
+    return header, columns
@@ -0,0 +1,37 @@
+"""Market inputs for the NiceGUI dashboard, fetched in batches and shared per user.
+
+``load_dashboard_data`` used to await ``get_live_price`` and then
+``get_sparkline_data`` for every holding, and every open tab of the same user
+repeated all of it on its own 8-second timer. ``get_dashboard_market_data``
+does one ``batch_get_prices`` call (holdings + VIX) and one
+``batch_get_sparklines`` call in a single worker thread, and caches the result
+per (user, holdings) for a few seconds so all of a user's tabs refreshing in
+the same tick share one fetch. Changing holdings changes the key, so an added
+or removed stock shows up on the very next refresh.
+"""
+
+from __future__ import annotations
+
+from services.market_cache import DASHBOARD_NS, MACRO_NS, market_cache
+from services.yahoo_finance import batch_get_prices, batch_get_sparklines, get_real_fear_and_greed
+
+VIX_TICKER = "^VIX"
+
+
+def _fetch(tickers: list[str]) -> dict:
+    prices = batch_get_prices(tickers + [VIX_TICKER])
+    sparklines = batch_get_sparklines(tickers) if tickers else {}
+    fg_value, fg_label = market_cache.get_or_compute(MACRO_NS, "fear_greed", get_real_fear_and_greed)
+    return {
+        "prices": {t: prices.get(t, 0.0) for t in tickers},
+        "sparklines": sparklines,
+        "vix": prices.get(VIX_TICKER, 0.0),
+        "fear_greed": (fg_value, fg_label),
+    }
+
+
+def get_dashboard_market_data(user_id: str, tickers: list[str]) -> dict:
+    """``{"prices", "sparklines", "vix", "fear_greed"}`` for a user's holdings (blocking)."""
+    tickers = list(dict.fromkeys(tickers))
+    key = f"{user_id}:{','.join(sorted(tickers))}"
+    return market_cache.get_or_compute(DASHBOARD_NS, key, lambda: _fetch(tickers))
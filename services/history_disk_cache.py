@@ -0,0 +1,106 @@
+"""On-disk OHLCV history cache so downloaded history survives restarts.
+
+Each (ticker, interval, adjusted) series from services/ohlcv_store.py is kept
+as one uncompressed Arrow IPC (Feather v2) file. Reads memory-map the file and
+hand the column buffers to NumPy without copying. Writes go to a temp file and
+are renamed into place, so concurrent uvicorn workers never see a half-written
+file and readers holding an old mapping are unaffected.
+
+The store still decides freshness: a series loaded from disk is topped up with
+only the bars since its last stored bar, then written back.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional — the in-memory store works without it
+    pa = None
+
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9._=^-]")
+
+
+class HistoryDiskCache:
+    """Arrow/Feather files under ``root``: ``<interval>[_raw]/<TICKER>.arrow``."""
+
+    def __init__(self, root: Path | str, enabled: bool = True):
+        self.root = Path(root)
+        self.enabled = bool(enabled) and pa is not None
+        if enabled and pa is None:
+            print("⚠️ pyarrow not installed — on-disk history cache disabled")
+        self._lock = threading.Lock()
+        self._reads = 0
+        self._read_misses = 0
+        self._writes = 0
+        self._errors = 0
+
+    def path(self, ticker: str, interval: str, adjusted: bool) -> Path:
+        folder = interval if adjusted else f"{interval}_raw"
+        return self.root / folder / f"{_SAFE_NAME.sub('_', ticker)}.arrow"
+
+    def load(self, ticker: str, interval: str, adjusted: bool, fields: tuple[str, ...]):
+        """Return ``(t, cols, meta)`` memory-mapped from disk, or None."""
+        if not self.enabled:
+            return None
+        path = self.path(ticker, interval, adjusted)
+        if not path.exists():
+            self._count("_read_misses")
+            return None
+        try:
+            source = pa.memory_map(str(path), "r")
+            table = pa.ipc.open_file(source).read_all()
+            t = table.column("t").chunk(0).to_numpy(zero_copy_only=True)
+            cols = {f: table.column(f).chunk(0).to_numpy(zero_copy_only=True) for f in fields}
+            raw_meta = table.schema.metadata or {}
+            meta = {k.decode(): v.decode() for k, v in raw_meta.items()}
+            self._count("_reads")
+            return t, cols, meta
+        except Exception as e:
+            self._count("_errors")
+            print(f"⚠️ History cache read failed ({path.name}): {e}")
+            return None
+
+    def save(self, ticker: str, interval: str, adjusted: bool, t: np.ndarray, cols: dict[str, np.ndarray], meta: dict[str, str]) -> None:
+        if not self.enabled or len(t) == 0:
+            return
+        path = self.path(ticker, interval, adjusted)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            arrays = {"t": pa.array(t, type=pa.int64())}
+            arrays.update({f: pa.array(a, type=pa.float64()) for f, a in cols.items()})
+            table = pa.table(arrays).replace_schema_metadata({k: str(v) for k, v in meta.items()})
+            with pa.OSFile(str(tmp), "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp, path)
+            self._count("_writes")
+        except Exception as e:
+            self._count("_errors")
+            print(f"⚠️ History cache write failed ({path.name}): {e}")
+            try:
+                tmp.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+    def _count(self, attr: str) -> None:
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "root": str(self.root),
+                "reads": self._reads,
+                "read_misses": self._read_misses,
+                "writes": self._writes,
+                "errors": self._errors,
+            }
@@ -0,0 +1,202 @@
+"""Shared outbound HTTP — keep-alive pools, per-host limits, per-host latency histograms.
+
+Every outbound call (CNN Fear & Greed, Google News RSS, TradingView logos)
+goes through ``http_client`` instead of opening its own connection:
+
+- one ``httpx.Client`` for worker threads and one ``httpx.AsyncClient`` per
+  event loop (an async client cannot be shared across loops), each keeping
+  up to HTTP_MAX_KEEPALIVE idle connections, so repeat calls to a host skip
+  the TCP and TLS handshakes;
+- at most HTTP_MAX_PER_HOST requests in flight per host, so one slow upstream
+  cannot take every connection (HTTP_MAX_CONNECTIONS in total);
+- HTTP_TIMEOUT seconds by default (connect capped at 5s), overridable per call;
+- per host: request count, status counts, errors (exceptions and 5xx) and a
+  latency histogram, reported under ``http_client`` in /api/admin/metrics.
+
+yfinance is not routed here: it keeps its own process-wide curl_cffi session,
+which already reuses connections to Yahoo.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+import weakref
+from urllib.parse import urlsplit
+
+import httpx
+
+from core.config import HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE, HTTP_MAX_PER_HOST, HTTP_TIMEOUT
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended
+_LATENCY_BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class _HostStats:
+    __slots__ = ("requests", "errors", "statuses", "buckets", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.statuses: dict[str, int] = {}
+        self.buckets = [0] * (len(_LATENCY_BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, elapsed_ms: float, status: int | None, error: str | None) -> None:
+        self.requests += 1
+        label = error or str(status)
+        self.statuses[label] = self.statuses.get(label, 0) + 1
+        if error or (status or 0) >= 500:
+            self.errors += 1
+        idx = next((i for i, b in enumerate(_LATENCY_BUCKETS_MS) if elapsed_ms <= b), len(_LATENCY_BUCKETS_MS))
+        self.buckets[idx] += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def snapshot(self) -> dict:
+        labels = [f"le_{b}ms" for b in _LATENCY_BUCKETS_MS] + ["gt_10000ms"]
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.requests, 4) if self.requests else 0.0,
+            "statuses": dict(self.statuses),
+            "latency_ms": {
+                "avg": round(self.total_ms / self.requests, 1) if self.requests else 0.0,
+                "max": round(self.max_ms, 1),
+                "histogram": dict(zip(labels, self.buckets)),
+            },
+        }
+
+
+class HttpClient:
+    """Process-wide outbound HTTP layer; ``get``/``request`` from threads, ``aget``/``arequest`` from coroutines."""
+
+    def __init__(self, timeout: float, max_connections: int, max_keepalive: int, max_per_host: int):
+        self.timeout = httpx.Timeout(float(timeout), connect=min(float(timeout), 5.0))
+        self.limits = httpx.Limits(
+            max_connections=max(int(max_connections), 1),
+            max_keepalive_connections=max(int(max_keepalive), 0),
+            keepalive_expiry=30.0,
+        )
+        self.max_per_host = max(int(max_per_host), 1)
+        self._lock = threading.Lock()
+        self._client: httpx.Client | None = None
+        self._async_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._host_sems: dict[str, threading.BoundedSemaphore] = {}
+        self._async_host_sems: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._hosts: dict[str, _HostStats] = {}
+
+    # ── clients ───────────────────────────────────────────────────────
+
+    def _sync_client(self) -> httpx.Client:
+        with self._lock:
+            if self._client is None:
+                self._client = httpx.Client(timeout=self.timeout, limits=self.limits, follow_redirects=True)
+            return self._client
+
+    def _async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, follow_redirects=True)
+                self._async_clients[loop] = client
+            return client
+
+    def _host_sem(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            sem = self._host_sems.get(host)
+            if sem is None:
+                sem = self._host_sems[host] = threading.BoundedSemaphore(self.max_per_host)
+            return sem
+
+    def _async_host_sem(self, host: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            sems = self._async_host_sems.setdefault(loop, {})
+            sem = sems.get(host)
+            if sem is None:
+                sem = sems[host] = asyncio.Semaphore(self.max_per_host)
+            return sem
+
+    def _record(self, host: str, started: float, status: int | None, error: BaseException | None) -> None:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            stats = self._hosts.get(host)
+            if stats is None:
+                stats = self._hosts[host] = _HostStats()
+            stats.record(elapsed_ms, status, type(error).__name__ if error else None)
+
+    # ── requests ──────────────────────────────────────────────────────
+
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        host = urlsplit(url).hostname or ""
+        client = self._sync_client()
+        with self._host_sem(host):
+            started = time.perf_counter()
+            try:
+                resp = client.request(method, url, **kwargs)
+            except Exception as e:
+                self._record(host, started, None, e)
+                raise
+        self._record(host, started, resp.status_code, None)
+        return resp
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    async def arequest(self, method: str, url: str, **kwargs) -> httpx.Response:
+        host = urlsplit(url).hostname or ""
+        client = self._async_client()
+        async with self._async_host_sem(host):
+            started = time.perf_counter()
+            try:
+                resp = await client.request(method, url, **kwargs)
+            except Exception as e:
+                self._record(host, started, None, e)
+                raise
+        self._record(host, started, resp.status_code, None)
+        return resp
+
+    async def aget(self, url: str, **kwargs) -> httpx.Response:
+        return await self.arequest("GET", url, **kwargs)
+
+    # ── lifecycle / metrics ───────────────────────────────────────────
+
+    def close(self) -> None:
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            client.close()
+
+    async def aclose(self) -> None:
+        """Close the current loop's async client and the thread client."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.pop(loop, None)
+            self._async_host_sems.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+        self.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hosts = {host: s.snapshot() for host, s in sorted(self._hosts.items())}
+            return {
+                "timeout": self.timeout.read,
+                "max_connections": self.limits.max_connections,
+                "max_keepalive": self.limits.max_keepalive_connections,
+                "max_per_host": self.max_per_host,
+                "async_clients": len(self._async_clients),
+                "hosts": hosts,
+            }
+
+
+http_client = HttpClient(
+    HTTP_TIMEOUT,
+    max_connections=HTTP_MAX_CONNECTIONS,
+    max_keepalive=HTTP_MAX_KEEPALIVE,
+    max_per_host=HTTP_MAX_PER_HOST,
+)
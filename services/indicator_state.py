@@ -0,0 +1,335 @@
+"""Incremental indicator state so chart refreshes only compute the newest bars.
+
+``IndicatorTracker`` keeps, per (ticker, interval, period), the running state of
+each indicator — EMA values, Wilder averages, the trailing rolling window —
+as of the last *closed* bar, plus the output computed so far. A refresh then:
+
+1. checks the bars still line up with what was computed — same first bar and
+   same last committed bar, time and close of each. A re-adjustment (e.g. for
+   a split) rescales both ends, and a moved period window changes the first
+   bar; either way the entry is rebuilt with the vectorized engine. The check
+   is O(1): it never re-reads the whole series;
+2. steps the state over bars closed since the last call — O(new bars);
+3. evaluates the still-forming last bar from the state without committing it,
+   so intraday updates to that bar never corrupt the running averages.
+
+Only steps 1–3 run under the tracker lock. Committed output is written once
+and never modified, so copying it into the result happens after the lock is
+released; a refresh holds the lock for O(new bars), not O(series).
+
+Output arrays have the same shape and NaN padding as ``indicators.compute``.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable
+
+import numpy as np
+
+from services import indicators
+
+_NAN = float("nan")
+
+
+class _Calc:
+    """One indicator: vectorized ``build`` over closed bars, scalar ``step`` per new bar."""
+
+    width = 1
+
+    def build(self, bars: Any, m: int) -> tuple[list[np.ndarray], Any]:
+        """Outputs for bars[:m] and the state after bar m-1 (None while warming up)."""
+        raise NotImplementedError
+
+    def step(self, state: Any, bars: Any, i: int) -> tuple[tuple[float, ...], Any]:
+        raise NotImplementedError
+
+
+class _EMA(_Calc):
+    def __init__(self, period: int = 20):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+
+    def build(self, bars, m):
+        out = indicators.ema(bars.close[:m], self.period)
+        return [out], float(out[-1]) if m else None
+
+    def step(self, state, bars, i):
+        value = state + self.k * (float(bars.close[i]) - state)
+        return (value,), value
+
+
+class _Window(_Calc):
+    """SMA / Bollinger: the state is the trailing ``period - 1`` closes."""
+
+    def __init__(self, period: int = 20, std_dev: float | None = None):
+        self.period = period
+        self.std_dev = std_dev
+        self.width = 1 if std_dev is None else 3
+
+    def build(self, bars, m):
+        close = bars.close[:m]
+        if self.std_dev is None:
+            outs = [indicators.sma(close, self.period)]
+        else:
+            outs = list(indicators.bollinger(close, self.period, self.std_dev))
+        if m < self.period - 1:
+            return outs, None
+        return outs, np.array(close[m - self.period + 1:m], dtype=np.float64)
+
+    def step(self, state, bars, i):
+        window = np.append(state, float(bars.close[i]))
+        mid = float(window.mean())
+        if self.std_dev is None:
+            return (mid,), window[1:]
+        width = float(window.std(ddof=1)) * self.std_dev if self.period > 1 else _NAN
+        return (mid + width, mid, mid - width), window[1:]
+
+
+class _RSI(_Calc):
+    def __init__(self, period: int = 14):
+        self.period = period
+
+    def build(self, bars, m):
+        close = bars.close[:m]
+        out = indicators.rsi(close, self.period)
+        if m < self.period + 1:
+            return [out], None
+        delta = np.diff(close)
+        gain = indicators.wilder(np.clip(delta, 0.0, None), self.period)
+        loss = indicators.wilder(np.clip(-delta, 0.0, None), self.period)
+        return [out], (float(close[-1]), float(gain[-1]), float(loss[-1]))
+
+    def step(self, state, bars, i):
+        prev, gain, loss = state
+        x = float(bars.close[i])
+        d = x - prev
+        p = self.period
+        gain = (gain * (p - 1) + max(d, 0.0)) / p
+        loss = (loss * (p - 1) + max(-d, 0.0)) / p
+        value = 100.0 if loss == 0 else 100.0 - 100.0 / (1.0 + gain / loss)
+        return (value,), (x, gain, loss)
+
+
+class _MACD(_Calc):
+    width = 3
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast, self.slow, self.signal = fast, slow, signal
+        self.kf, self.ks, self.kg = 2.0 / (fast + 1), 2.0 / (slow + 1), 2.0 / (signal + 1)
+
+    def build(self, bars, m):
+        close = bars.close[:m]
+        outs = list(indicators.macd(close, self.fast, self.slow, self.signal))
+        if m < self.slow + self.signal:
+            return outs, None
+        fast = indicators.ema(close, self.fast)[-1]
+        slow = indicators.ema(close, self.slow)[-1]
+        return outs, (float(fast), float(slow), float(outs[1][-1]))
+
+    def step(self, state, bars, i):
+        fast, slow, sig = state
+        x = float(bars.close[i])
+        fast += self.kf * (x - fast)
+        slow += self.ks * (x - slow)
+        line = fast - slow
+        sig += self.kg * (line - sig)
+        return (line, sig, line - sig), (fast, slow, sig)
+
+
+class _ATR(_Calc):
+    def __init__(self, period: int = 14):
+        self.period = period
+
+    def build(self, bars, m):
+        out = indicators.atr(bars.high[:m], bars.low[:m], bars.close[:m], self.period)
+        if m < self.period:
+            return [out], None
+        return [out], (float(bars.close[m - 1]), float(out[-1]))
+
+    def step(self, state, bars, i):
+        prev, value = state
+        h, l, c = float(bars.high[i]), float(bars.low[i]), float(bars.close[i])
+        tr = max(h - l, abs(h - prev), abs(l - prev))
+        value = (value * (self.period - 1) + tr) / self.period
+        return (value,), (c, value)
+
+
+class _VWAP(_Calc):
+    """Cumulative VWAP keeps running sums; rolling VWAP keeps the trailing window."""
+
+    def __init__(self, window: int | None = None):
+        self.window = window
+
+    def build(self, bars, m):
+        h, l, c, v = bars.high[:m], bars.low[:m], bars.close[:m], bars.volume[:m]
+        out = indicators.vwap(h, l, c, v, self.window)
+        pv = (np.asarray(h, dtype=np.float64) + l + c) / 3.0 * v
+        if self.window is None:
+            return [out], (float(pv.sum()), float(np.sum(v)))
+        if m < self.window - 1:
+            return [out], None
+        keep = slice(m - self.window + 1, m)
+        return [out], (np.array(pv[keep], dtype=np.float64), np.array(v[keep], dtype=np.float64))
+
+    def step(self, state, bars, i):
+        v = float(bars.volume[i])
+        pv = (float(bars.high[i]) + float(bars.low[i]) + float(bars.close[i])) / 3.0 * v
+        if self.window is None:
+            num, den = state[0] + pv, state[1] + v
+            new_state = (num, den)
+        else:
+            pvs, vs = np.append(state[0], pv), np.append(state[1], v)
+            num, den = float(pvs.sum()), float(vs.sum())
+            new_state = (pvs[1:], vs[1:])
+        return (num / den if den > 0 else _NAN,), new_state
+
+
+def _make(spec: str) -> _Calc:
+    """Same spec syntax and defaults as ``indicators.compute``."""
+    name, args = indicators.parse_spec(spec)
+    ints = [int(a) for a in args]
+    if name == "rsi":
+        return _RSI(*ints[:1])
+    if name == "macd":
+        return _MACD(*ints[:3])
+    if name == "bollinger":
+        return _Window(ints[0] if args else 20, args[1] if len(args) > 1 else 2.0)
+    if name == "sma":
+        return _Window(*ints[:1])
+    if name == "ema":
+        return _EMA(*ints[:1])
+    if name == "atr":
+        return _ATR(*ints[:1])
+    if name == "vwap":
+        return _VWAP(*ints[:1])
+    raise ValueError(f"Unknown indicator: {spec}")
+
+
+class _Track:
+    """One indicator's state plus a growable (width × capacity) output buffer."""
+
+    __slots__ = ("calc", "state", "out")
+
+    def __init__(self, calc: _Calc, outs: list[np.ndarray], state: Any, m: int):
+        self.calc = calc
+        self.state = state
+        self.out = np.empty((calc.width, max(m * 2, 64)))
+        for row, values in enumerate(outs):
+            self.out[row, :m] = values
+
+    def _reserve(self, size: int) -> None:
+        if size > self.out.shape[1]:
+            grown = np.empty((self.out.shape[0], max(size, self.out.shape[1] * 2)))
+            grown[:, :self.out.shape[1]] = self.out
+            self.out = grown
+
+    def advance(self, bars: Any, start: int, stop: int) -> None:
+        self._reserve(stop + 1)
+        for i in range(start, stop):
+            values, self.state = self.calc.step(self.state, bars, i)
+            self.out[:, i] = values
+
+    def forming(self, bars: Any, m: int) -> tuple[np.ndarray, tuple[float, ...]]:
+        """The output buffer (columns < m are final) and the forming bar ``m``, not committed."""
+        values, _ = self.calc.step(self.state, bars, m)
+        return self.out, values
+
+
+def _assemble(buf: np.ndarray, m: int, forming: tuple[float, ...]) -> Any:
+    """Committed columns ``buf[:, :m]`` plus the forming bar — runs outside the tracker lock."""
+    rows = np.empty((buf.shape[0], m + 1))
+    rows[:, :m] = buf[:, :m]
+    rows[:, m] = forming
+    return rows[0] if buf.shape[0] == 1 else tuple(rows)
+
+
+class _Entry:
+    __slots__ = ("t0", "c0", "m", "t_last", "c_last", "tracks")
+
+    def __init__(self, t0: int, c0: float):
+        self.t0 = t0
+        self.c0 = c0
+        self.m = 0
+        self.t_last = 0
+        self.c_last = _NAN
+        self.tracks: dict[str, _Track] = {}
+
+    def matches(self, bars: Any) -> bool:
+        n = len(bars)
+        if n == 0 or int(bars.t[0]) != self.t0 or float(bars.close[0]) != self.c0 or n - 1 < self.m:
+            return False
+        if self.m == 0:
+            return True
+        last = self.m - 1
+        return int(bars.t[last]) == self.t_last and float(bars.close[last]) == self.c_last
+
+
+class IndicatorTracker:
+    """Running indicator state per key, LRU-bounded to ``max_entries``."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max(int(max_entries), 1)
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, _Entry] = OrderedDict()
+        self._incremental = 0
+        self._rebuilds = 0
+        self._bars_stepped = 0
+        self._evictions = 0
+
+    def compute(self, key: Hashable, bars: Any, specs: list[str]) -> dict[str, Any]:
+        """Like ``indicators.compute(bars, specs)``, reusing state kept under ``key``."""
+        n = len(bars)
+        if n < 2:
+            return indicators.compute(bars, specs)
+        m = n - 1
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.matches(bars):
+                self._entries.move_to_end(key)
+                self._incremental += 1
+                self._bars_stepped += (m - entry.m) * len(entry.tracks)
+                for track in entry.tracks.values():
+                    track.advance(bars, entry.m, m)
+            else:
+                entry = _Entry(int(bars.t[0]), float(bars.close[0]))
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                self._rebuilds += 1
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._evictions += 1
+            entry.m = m
+            entry.t_last = int(bars.t[m - 1])
+            entry.c_last = float(bars.close[m - 1])
+
+            results: dict[str, Any] = {}
+            pending: dict[str, tuple[np.ndarray, tuple[float, ...]]] = {}
+            for spec in specs:
+                track = entry.tracks.get(spec)
+                if track is None:
+                    calc = _make(spec)
+                    outs, state = calc.build(bars, m)
+                    if state is None:
+                        # Still warming up — short series are cheap to compute in full.
+                        results[spec] = indicators.compute(bars, [spec])[spec]
+                        continue
+                    track = entry.tracks[spec] = _Track(calc, outs, state, m)
+                pending[spec] = track.forming(bars, m)
+
+        for spec, (buf, values) in pending.items():
+            results[spec] = _assemble(buf, m, values)
+        return {spec: results[spec] for spec in specs}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "incremental": self._incremental,
+                "rebuilds": self._rebuilds,
+                "bars_stepped": self._bars_stepped,
+                "evictions": self._evictions,
+            }
@@ -0,0 +1,259 @@
+"""Vectorized technical indicators over NumPy float arrays.
+
+Every function takes float arrays (1-D for one ticker, or 2-D ``tickers × bars``
+for a batch) and returns arrays of the same shape, with NaN wherever the
+indicator is not yet defined — no '-' sentinels, no per-element rounding.
+Conversion to chart/JSON lists happens once, at the edge, via ``to_list``.
+
+Recursive averages (EMA, Wilder) are evaluated block-wise in closed form:
+inside a block ``y_t = (1-a)^t * (y_0 + Σ a·x_i / (1-a)^i)`` is a single
+cumulative sum, and blocks are sized so ``(1-a)^-t`` never overflows.
+
+Conventions match the charts the app has always drawn:
+- EMA is seeded with the first value (MACD fast/slow/signal lines).
+- RSI and ATR use Wilder smoothing seeded with the simple mean of the first
+  ``period`` values, so the first RSI is at index ``period`` and the first
+  ATR at index ``period - 1``.
+- Bollinger uses the sample standard deviation (ddof=1), as pandas does.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Mapping
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Largest exponent of (1-a)^-t allowed inside one closed-form block.
+_MAX_BLOCK_LOG = 200 * math.log(10)
+
+
+def _as_float(x: Any) -> np.ndarray:
+    return np.asarray(x, dtype=np.float64)
+
+
+def _nan_like(x: np.ndarray) -> np.ndarray:
+    return np.full(x.shape, np.nan)
+
+
+def ewm(x: Any, alpha: float, init: Any = None) -> np.ndarray:
+    """``y_t = (1-alpha)·y_{t-1} + alpha·x_t`` along the last axis.
+
+    ``init`` seeds ``y_{-1}``; by default the recursion starts at ``y_0 = x_0``.
+    """
+    x = _as_float(x)
+    n = x.shape[-1]
+    out = np.empty_like(x)
+    if n == 0:
+        return out
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        out[...] = x
+        return out
+    if init is None:
+        prev = x[..., 0].copy()
+    else:
+        prev = np.broadcast_to(_as_float(init), x.shape[:-1]).astype(np.float64)
+        prev = decay * prev + alpha * x[..., 0]
+    out[..., 0] = prev
+
+    block = max(int(_MAX_BLOCK_LOG / -math.log(decay)), 1)
+    start = 1
+    while start < n:
+        stop = min(start + block, n)
+        steps = np.arange(1, stop - start + 1, dtype=np.float64)
+        pw = decay ** steps                      # (1-a)^k, k = 1..len
+        acc = np.cumsum(alpha * x[..., start:stop] / pw, axis=-1)
+        out[..., start:stop] = pw * (prev[..., None] + acc)
+        prev = out[..., stop - 1]
+        start = stop
+    return out
+
+
+def sma(x: Any, period: int) -> np.ndarray:
+    x = _as_float(x)
+    out = _nan_like(x)
+    if x.shape[-1] >= period:
+        out[..., period - 1:] = sliding_window_view(x, period, axis=-1).mean(axis=-1)
+    return out
+
+
+def ema(x: Any, period: int) -> np.ndarray:
+    """EMA seeded with the first value (defined from index 0)."""
+    return ewm(x, 2.0 / (period + 1))
+
+
+def wilder(x: Any, period: int) -> np.ndarray:
+    """Wilder's smoothing seeded with the mean of the first ``period`` values."""
+    x = _as_float(x)
+    out = _nan_like(x)
+    if x.shape[-1] < period:
+        return out
+    seed = x[..., :period].mean(axis=-1)
+    out[..., period - 1] = seed
+    if x.shape[-1] > period:
+        out[..., period:] = ewm(x[..., period:], 1.0 / period, init=seed)
+    return out
+
+
+def rsi(close: Any, period: int = 14) -> np.ndarray:
+    close = _as_float(close)
+    out = _nan_like(close)
+    if close.shape[-1] < period + 1:
+        return out
+    delta = np.diff(close, axis=-1)
+    avg_gain = wilder(np.clip(delta, 0.0, None), period)
+    avg_loss = wilder(np.clip(-delta, 0.0, None), period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    value = np.where(avg_loss == 0.0, 100.0, value)
+    value[np.isnan(avg_gain)] = np.nan
+    out[..., 1:] = value
+    return out
+
+
+def macd(close: Any, fast: int = 12, slow: int = 26, signal: int = 9) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """MACD line, signal line and histogram.
+
+    The line is defined from bar ``slow - 1``; the signal EMA is seeded there.
+    """
+    close = _as_float(close)
+    line = _nan_like(close)
+    sig = _nan_like(close)
+    if close.shape[-1] < slow + signal:
+        return line, sig, _nan_like(close)
+    full = ema(close, fast) - ema(close, slow)
+    line[..., slow - 1:] = full[..., slow - 1:]
+    sig[..., slow - 1:] = ema(full[..., slow - 1:], signal)
+    return line, sig, line - sig
+
+
+def bollinger(close: Any, period: int = 20, std_dev: float = 2.0) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Upper band, middle (SMA) and lower band."""
+    close = _as_float(close)
+    mid = _nan_like(close)
+    width = _nan_like(close)
+    if close.shape[-1] >= period:
+        windows = sliding_window_view(close, period, axis=-1)
+        mid[..., period - 1:] = windows.mean(axis=-1)
+        width[..., period - 1:] = windows.std(axis=-1, ddof=1) * std_dev
+    return mid + width, mid, mid - width
+
+
+def true_range(high: Any, low: Any, close: Any) -> np.ndarray:
+    high, low, close = _as_float(high), _as_float(low), _as_float(close)
+    tr = high - low
+    if close.shape[-1] > 1:
+        prev = close[..., :-1]
+        tr[..., 1:] = np.maximum.reduce([tr[..., 1:], np.abs(high[..., 1:] - prev), np.abs(low[..., 1:] - prev)])
+    return tr
+
+
+def atr(high: Any, low: Any, close: Any, period: int = 14) -> np.ndarray:
+    return wilder(true_range(high, low, close), period)
+
+
+def vwap(high: Any, low: Any, close: Any, volume: Any, window: int | None = None) -> np.ndarray:
+    """Volume-weighted average of the typical price — cumulative, or rolling over ``window`` bars."""
+    typical = (_as_float(high) + _as_float(low) + _as_float(close)) / 3.0
+    volume = _as_float(volume)
+    pv = typical * volume
+    if window is None:
+        num, den = np.cumsum(pv, axis=-1), np.cumsum(volume, axis=-1)
+    else:
+        num, den = sma(pv, window), sma(volume, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(den > 0, num / den, np.nan)
+
+
+# ── batch API ──
+
+def parse_spec(spec: str) -> tuple[str, list[float]]:
+    name, _, args = spec.strip().lower().partition(":")
+    return name, [float(a) for a in args.split(",") if a]
+
+
+def _field(bars: Any, name: str) -> np.ndarray:
+    if isinstance(bars, Mapping):
+        return _as_float(bars[name])
+    return _as_float(getattr(bars, name))
+
+
+def compute(bars: Any, specs: list[str]) -> dict[str, Any]:
+    """Compute several indicators for one series (or a 2-D stack of equal-length series).
+
+    ``bars`` is an OHLCVSeries or a mapping with ``close`` (and ``high``/``low``/
+    ``volume`` for ATR and VWAP). Specs are names with optional parameters:
+    ``rsi``, ``rsi:7``, ``macd``, ``macd:12,26,9``, ``bollinger:20,2``,
+    ``sma:50``, ``ema:20``, ``atr:14``, ``vwap``, ``vwap:20``.
+    Results are keyed by the spec as given.
+    """
+    close = _field(bars, "close")
+    out: dict[str, Any] = {}
+    for spec in specs:
+        name, args = parse_spec(spec)
+        if name == "rsi":
+            out[spec] = rsi(close, int(args[0]) if args else 14)
+        elif name == "macd":
+            out[spec] = macd(close, *[int(a) for a in args[:3]])
+        elif name == "bollinger":
+            out[spec] = bollinger(close, int(args[0]) if args else 20, args[1] if len(args) > 1 else 2.0)
+        elif name == "sma":
+            out[spec] = sma(close, int(args[0]) if args else 20)
+        elif name == "ema":
+            out[spec] = ema(close, int(args[0]) if args else 20)
+        elif name == "atr":
+            out[spec] = atr(_field(bars, "high"), _field(bars, "low"), close, int(args[0]) if args else 14)
+        elif name == "vwap":
+            out[spec] = vwap(
+                _field(bars, "high"), _field(bars, "low"), close, _field(bars, "volume"),
+                int(args[0]) if args else None,
+            )
+        else:
+            raise ValueError(f"Unknown indicator: {spec}")
+    return out
+
+
+def _row(value: Any, i: int) -> Any:
+    if isinstance(value, tuple):
+        return tuple(v[i] for v in value)
+    return value[i]
+
+
+def compute_many(series: Mapping[str, Any], specs: list[str]) -> dict[str, dict[str, Any]]:
+    """Compute ``specs`` for many tickers at once: ``{ticker: {spec: result}}``.
+
+    Series of equal length are stacked into one 2-D array so each indicator
+    runs once per length group rather than once per ticker.
+    """
+    groups: dict[int, list[str]] = {}
+    for ticker, bars in series.items():
+        groups.setdefault(len(_field(bars, "close")), []).append(ticker)
+
+    out: dict[str, dict[str, Any]] = {}
+    for tickers in groups.values():
+        stacked = {
+            f: np.vstack([_field(series[t], f) for t in tickers])
+            for f in ("high", "low", "close", "volume")
+            if all(_has_field(series[t], f) for t in tickers)
+        }
+        results = compute(stacked, specs)
+        for i, ticker in enumerate(tickers):
+            out[ticker] = {spec: _row(value, i) for spec, value in results.items()}
+    return out
+
+
+def _has_field(bars: Any, name: str) -> bool:
+    return name in bars if isinstance(bars, Mapping) else hasattr(bars, name)
+
+
+def to_list(values: np.ndarray, decimals: int | None = None, missing: Any = None) -> list:
+    """1-D array → plain list for JSON/ECharts: rounded, with NaN/inf replaced by ``missing``."""
+    values = _as_float(values)
+    rounded = np.round(values, decimals) if decimals is not None else values
+    out = rounded.tolist()
+    bad = np.flatnonzero(~np.isfinite(values))
+    for i in bad.tolist():
+        out[i] = missing
+    return out
@@ -0,0 +1,381 @@
+"""Unified market-data cache — per-namespace TTL, LRU bound, thread-safe.
+
+Every getter in services/yahoo_finance.py and api/routers/market.py stores its
+results here instead of keeping a private module-level dict. Each namespace has
+its own TTL and entry limit; the least recently used entry is evicted once a
+namespace is full, so memory no longer grows with every ticker ever requested.
+
+Expired entries are kept (until evicted) so callers can still fall back to the
+last known value when Yahoo is unavailable — see ``peek``.
+
+When a host-wide backend from services/shared_cache.py is attached, every write
+is also published there and any local miss or expired entry first checks it,
+so sibling worker processes reuse each other's fetches. ``get_or_compute``
+makes exactly one process compute a missing key.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+from core.config import MARKET_CACHE_MAX_ENTRIES
+from services.shared_cache import SharedCacheBackend, shared_cache
+from services.single_flight import SingleFlight
+
+# Namespaces used across the app
+PRICE_NS = "price"
+SPARKLINE_NS = "sparkline"
+TICKER_INFO_NS = "ticker_info"
+DIVIDEND_NS = "dividend"
+FX_NS = "fx"
+TOP_MOVERS_NS = "top_movers"
+SECTOR_ROTATION_NS = "sector_rotation"
+SIMPLE_SECTOR_NS = "simple_sector"
+MACRO_NS = "macro"
+SP500_NS = "sp500"
+EARNINGS_NS = "earnings"
+BENCHMARK_NS = "benchmark"
+LOGO_SLUG_NS = "logo_slug"
+DASHBOARD_NS = "dashboard"
+RESPONSE_VERSION_NS = "response_version"
+NEWS_HEADLINES_NS = "news_headlines"
+NEWS_SUMMARY_NS = "news_summary"
+
+
+class _Namespace:
+    __slots__ = ("ttl", "max_entries", "entries", "hits", "stale_hits", "shared_hits", "misses", "expired", "evictions", "sets")
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = float(ttl)
+        self.max_entries = max(int(max_entries), 1)
+        self.entries: OrderedDict[str, tuple[Any, float]] = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.sets = 0
+
+
+class MarketCache:
+    """Namespaced TTL + LRU cache shared by all market-data getters."""
+
+    def __init__(self, default_ttl: float = 300, default_max_entries: int = 2048):
+        self._default_ttl = float(default_ttl)
+        self._default_max_entries = int(default_max_entries)
+        self._namespaces: dict[str, _Namespace] = {}
+        self._lock = threading.Lock()
+        self._shared: SharedCacheBackend | None = None
+        self._compute_flight = SingleFlight("market_cache.compute")
+
+    def attach_shared(self, backend: SharedCacheBackend) -> None:
+        """Mirror all namespaces into a host-wide backend shared with other workers."""
+        self._shared = backend
+
+    @staticmethod
+    def _shared_key(namespace: str, key: str) -> str:
+        return f"mc:{namespace}:{key}"
+
+    def _pull_shared(self, namespace: str, keys: list[str]) -> None:
+        """Adopt newer entries from the shared backend for keys that are missing or expired locally."""
+        if self._shared is None:
+            return
+        now = time.time()
+        with self._lock:
+            ns = self._ns(namespace)
+            wanted = [k for k in keys if (e := ns.entries.get(k)) is None or now - e[1] >= ns.ttl]
+        if not wanted:
+            return
+        found = self._shared.get_many([self._shared_key(namespace, k) for k in wanted])
+        if not found:
+            return
+        with self._lock:
+            ns = self._ns(namespace)
+            for k in wanted:
+                hit = found.get(self._shared_key(namespace, k))
+                if hit is None:
+                    continue
+                current = ns.entries.get(k)
+                if current is None or hit[1] > current[1]:
+                    ns.entries[k] = hit
+                    ns.entries.move_to_end(k)
+                    ns.shared_hits += 1
+            self._evict_overflow(ns)
+
+    # ── configuration ──
+    def configure(self, namespace: str, ttl: float, max_entries: int | None = None) -> None:
+        """Create or re-tune a namespace. Shrinking ``max_entries`` evicts immediately."""
+        with self._lock:
+            ns = self._namespaces.get(namespace)
+            limit = max_entries if max_entries is not None else self._default_max_entries
+            if ns is None:
+                self._namespaces[namespace] = _Namespace(ttl, limit)
+                return
+            ns.ttl = float(ttl)
+            ns.max_entries = max(int(limit), 1)
+            self._evict_overflow(ns)
+
+    def ttl(self, namespace: str) -> float:
+        with self._lock:
+            return self._ns(namespace).ttl
+
+    def _ns(self, namespace: str) -> _Namespace:
+        ns = self._namespaces.get(namespace)
+        if ns is None:
+            ns = _Namespace(self._default_ttl, self._default_max_entries)
+            self._namespaces[namespace] = ns
+        return ns
+
+    @staticmethod
+    def _evict_overflow(ns: _Namespace) -> None:
+        while len(ns.entries) > ns.max_entries:
+            ns.entries.popitem(last=False)
+            ns.evictions += 1
+
+    # ── reads ──
+    def get(self, namespace: str, key: str, default: Any = None, max_age: float | None = None) -> Any:
+        """Return the cached value if it is younger than the namespace TTL (or ``max_age``)."""
+        self._pull_shared(namespace, [key])
+        now = time.time()
+        with self._lock:
+            ns = self._ns(namespace)
+            entry = ns.entries.get(key)
+            if entry is None:
+                ns.misses += 1
+                return default
+            value, ts = entry
+            limit = ns.ttl if max_age is None else max_age
+            if now - ts >= limit:
+                ns.expired += 1
+                ns.misses += 1
+                return default
+            ns.entries.move_to_end(key)
+            ns.hits += 1
+            return value
+
+    def get_many(self, namespace: str, keys: list[str], max_age: float | None = None) -> tuple[dict[str, Any], list[str]]:
+        """Split ``keys`` into (fresh hits, keys that need fetching)."""
+        self._pull_shared(namespace, keys)
+        now = time.time()
+        found: dict[str, Any] = {}
+        missing: list[str] = []
+        with self._lock:
+            ns = self._ns(namespace)
+            limit = ns.ttl if max_age is None else max_age
+            for key in keys:
+                entry = ns.entries.get(key)
+                if entry is not None and now - entry[1] < limit:
+                    ns.entries.move_to_end(key)
+                    ns.hits += 1
+                    found[key] = entry[0]
+                else:
+                    if entry is not None:
+                        ns.expired += 1
+                    ns.misses += 1
+                    missing.append(key)
+        return found, missing
+
+    def get_with_age(self, namespace: str, key: str, max_stale: float) -> tuple[Any, float, bool] | None:
+        """Stale-while-revalidate lookup.
+
+        Returns ``(value, stored_at, is_stale)`` when the entry is fresh or expired
+        by less than ``max_stale`` seconds; None when absent or too old to serve.
+        """
+        self._pull_shared(namespace, [key])
+        now = time.time()
+        with self._lock:
+            ns = self._ns(namespace)
+            entry = ns.entries.get(key)
+            if entry is None:
+                ns.misses += 1
+                return None
+            value, ts = entry
+            age = now - ts
+            if age >= max_stale:
+                ns.expired += 1
+                ns.misses += 1
+                return None
+            ns.entries.move_to_end(key)
+            if age >= ns.ttl:
+                ns.stale_hits += 1
+                return value, ts, True
+            ns.hits += 1
+            return value, ts, False
+
+    def get_many_with_age(self, namespace: str, keys: list[str], max_stale: float) -> tuple[dict[str, Any], dict[str, Any], list[str]]:
+        """Split ``keys`` into (fresh values, stale-but-servable values, keys that must block)."""
+        self._pull_shared(namespace, keys)
+        now = time.time()
+        fresh: dict[str, Any] = {}
+        stale: dict[str, Any] = {}
+        missing: list[str] = []
+        with self._lock:
+            ns = self._ns(namespace)
+            for key in keys:
+                entry = ns.entries.get(key)
+                age = now - entry[1] if entry is not None else None
+                if age is None or age >= max_stale:
+                    if entry is not None:
+                        ns.expired += 1
+                    ns.misses += 1
+                    missing.append(key)
+                    continue
+                ns.entries.move_to_end(key)
+                if age >= ns.ttl:
+                    ns.stale_hits += 1
+                    stale[key] = entry[0]
+                else:
+                    ns.hits += 1
+                    fresh[key] = entry[0]
+        return fresh, stale, missing
+
+    def peek(self, namespace: str, key: str, default: Any = None) -> Any:
+        """Return the last stored value regardless of age. Does not touch counters or LRU order."""
+        with self._lock:
+            entry = self._ns(namespace).entries.get(key)
+        return entry[0] if entry is not None else default
+
+    def entry(self, namespace: str, key: str) -> tuple[Any, float] | None:
+        """Return ``(value, stored_at)`` regardless of age, or None."""
+        with self._lock:
+            return self._ns(namespace).entries.get(key)
+
+    def stamps(self, namespace: str, keys: list[str]) -> list[float | None]:
+        """``stored_at`` of each key (None when absent) — identifies the cached data without reading it.
+
+        Newer entries published by other workers are adopted first, so the
+        stamps match what ``get`` would serve.
+        """
+        self._pull_shared(namespace, keys)
+        with self._lock:
+            entries = self._ns(namespace).entries
+            return [entries[k][1] if k in entries else None for k in keys]
+
+    def all_fresh(self, namespace: str, keys: list[str]) -> bool:
+        """True when every key is cached and younger than the namespace TTL. Does not touch counters."""
+        now = time.time()
+        with self._lock:
+            ns = self._ns(namespace)
+            return all((e := ns.entries.get(k)) is not None and now - e[1] < ns.ttl for k in keys)
+
+    # ── writes ──
+    def set(self, namespace: str, key: str, value: Any, ts: float | None = None) -> None:
+        self.set_many(namespace, {key: value}, ts)
+
+    def set_many(self, namespace: str, values: dict[str, Any], ts: float | None = None) -> None:
+        stamp = time.time() if ts is None else ts
+        with self._lock:
+            ns = self._ns(namespace)
+            for key, value in values.items():
+                ns.entries[key] = (value, stamp)
+                ns.entries.move_to_end(key)
+                ns.sets += 1
+            self._evict_overflow(ns)
+        if self._shared is not None and values:
+            self._shared.set_many({self._shared_key(namespace, k): v for k, v in values.items()}, stamp)
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._ns(namespace).entries.pop(key, None)
+        if self._shared is not None:
+            self._shared.delete(self._shared_key(namespace, key))
+
+    def get_or_compute(self, namespace: str, key: str, fn: Callable[[], Any], wait_timeout: float = 30.0) -> Any:
+        """Fresh cached value, or ``fn()`` computed once — per process, and per host when shared.
+
+        A None result is returned but not cached. Other processes wait up to
+        ``wait_timeout`` seconds for the computing one before computing themselves.
+        """
+        cached = self.get(namespace, key)
+        if cached is not None:
+            return cached
+        if self._shared is None:
+            def _compute():
+                value = fn()
+                if value is not None:
+                    self.set(namespace, key, value)
+                return value
+            return self._compute_flight.do((namespace, key), _compute)
+
+        value, ts = self._compute_flight.do(
+            (namespace, key),
+            self._shared.get_or_compute,
+            self._shared_key(namespace, key),
+            self.ttl(namespace),
+            fn,
+            lease_ttl=wait_timeout + 30,
+            wait_timeout=wait_timeout,
+        )
+        if value is not None:
+            with self._lock:
+                ns = self._ns(namespace)
+                current = ns.entries.get(key)
+                if current is None or ts >= current[1]:
+                    ns.entries[key] = (value, ts)
+                    ns.entries.move_to_end(key)
+                    self._evict_overflow(ns)
+        return value
+
+    def clear(self, namespace: str | None = None) -> None:
+        with self._lock:
+            targets = [self._ns(namespace)] if namespace else list(self._namespaces.values())
+            for ns in targets:
+                ns.entries.clear()
+
+    def keys(self, namespace: str) -> list[str]:
+        with self._lock:
+            return list(self._ns(namespace).entries.keys())
+
+    # ── instrumentation ──
+    def stats(self) -> dict:
+        with self._lock:
+            out = {}
+            for name, ns in self._namespaces.items():
+                lookups = ns.hits + ns.stale_hits + ns.misses
+                out[name] = {
+                    "size": len(ns.entries),
+                    "max_entries": ns.max_entries,
+                    "ttl": ns.ttl,
+                    "hits": ns.hits,
+                    "stale_hits": ns.stale_hits,
+                    "shared_hits": ns.shared_hits,
+                    "misses": ns.misses,
+                    "expired": ns.expired,
+                    "evictions": ns.evictions,
+                    "sets": ns.sets,
+                    "hit_rate": round((ns.hits + ns.stale_hits) / lookups, 4) if lookups else 0.0,
+                }
+            return out
+
+
+market_cache = MarketCache(default_max_entries=MARKET_CACHE_MAX_ENTRIES)
+if shared_cache.is_shared:
+    market_cache.attach_shared(shared_cache)
+
+# TTLs mirror the values each getter used before the cache was unified.
+market_cache.configure(PRICE_NS, ttl=300)
+market_cache.configure(SPARKLINE_NS, ttl=600)
+market_cache.configure(TICKER_INFO_NS, ttl=600)
+market_cache.configure(DIVIDEND_NS, ttl=600)
+market_cache.configure(FX_NS, ttl=300, max_entries=16)
+market_cache.configure(TOP_MOVERS_NS, ttl=300, max_entries=16)
+market_cache.configure(SECTOR_ROTATION_NS, ttl=300, max_entries=32)
+market_cache.configure(SIMPLE_SECTOR_NS, ttl=300, max_entries=4)
+market_cache.configure(MACRO_NS, ttl=300, max_entries=4)
+market_cache.configure(SP500_NS, ttl=300, max_entries=4)
+market_cache.configure(EARNINGS_NS, ttl=3600, max_entries=1024)
+market_cache.configure(BENCHMARK_NS, ttl=600, max_entries=1024)
+market_cache.configure(LOGO_SLUG_NS, ttl=86400 * 7)
+# Per-user dashboard snapshot: shorter than the 8s price hub tick so every push is fresh,
+# long enough that all tabs of one user refreshing in the same tick share one fetch.
+market_cache.configure(DASHBOARD_NS, ttl=5, max_entries=1024)
+# Row digests behind each portfolio/watchlist version (api/versioning.py), for since=<version> deltas
+market_cache.configure(RESPONSE_VERSION_NS, ttl=900, max_entries=4096)
+# News (services/news_fetcher.py): RSS headlines per ticker stay short-lived; AI summaries are
+# keyed by the headline fingerprint, so they live as long as that headline set keeps coming back.
+market_cache.configure(NEWS_HEADLINES_NS, ttl=600, max_entries=1024)
+market_cache.configure(NEWS_SUMMARY_NS, ttl=86400, max_entries=2048)
@@ -1,44 +1,90 @@
+"""ข่าวหุ้นรายตัว + สรุปด้วย AI
+
+พาดหัวข่าวจาก Google News RSS ถูก cache ต่อหุ้น (NEWS_HEADLINES_NS, 10 นาที)
+และบทสรุปจาก Gemini ถูก cache ตาม fingerprint ของชุดพาดหัว (NEWS_SUMMARY_NS)
+ถ้าข่าวชุดเดิมยังไม่เปลี่ยน ก็ใช้บทสรุปเดิม — ผู้ใช้สิบคนเปิด /news ของหุ้นชุดเดียวกัน
+เรียก Gemini แค่ครั้งเดียว ทั้งในโปรเซสเดียวกันและข้ามโปรเซส (get_or_compute)
+"""
+
+import hashlib
+import threading
 import xml.etree.ElementTree as ET
-from curl_cffi import requests as cffi_requests
+
 from google import genai
+
 from core.config import GEMINI_API_KEY
+from services.http_client import http_client
+from services.market_cache import NEWS_HEADLINES_NS, NEWS_SUMMARY_NS, market_cache
+
+_RSS_HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"}
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _gemini():
+    """genai.Client ตัวเดียวใช้ร่วมกันทั้งโปรเซส (ไม่สร้างใหม่ทุกครั้งที่เรียก)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = genai.Client(api_key=GEMINI_API_KEY)
+        return _client
+
+
+def _fetch_headlines(ticker: str) -> list:
+    # ตัด .BK ออกเวลาค้นหาข่าวเพื่อความแม่นยำ
+    search_term = ticker.replace('.BK', '')
+
+    # ดึงข่าวจาก Google News ย้อนหลัง 7 วัน
+    url = f"https://news.google.com/rss/search?q={search_term}+stock+OR+หุ้น+when:7d&hl=th&gl=TH&ceid=TH:th"
+    res = http_client.get(url, headers=_RSS_HEADERS)
+    res.raise_for_status()
+    root = ET.fromstring(res.content)
+
+    titles = []
+    for item in root.findall('.//item')[:5]: # ดึงมาแค่ 5 ข่าวล่าสุดพอ
+        title = item.find('title')
+        if title is not None and title.text:
+            titles.append(title.text.strip())
+    return titles
+
+
+def headline_fingerprint(titles: list) -> str:
+    """hash ของชุดพาดหัว (ไม่สนลำดับ/ช่องว่าง/ตัวพิมพ์) — ข่าวชุดเดิมได้ค่าเดิม"""
+    normalized = sorted({" ".join(t.split()).lower() for t in titles})
+    return hashlib.blake2b("\n".join(normalized).encode(), digest_size=12).hexdigest()
+
+
+def _summarize(ticker: str, titles: list) -> str:
+    titles_str = "\n".join([f"- {t}" for t in titles])
+
+    # ส่งให้ Gemini สรุป
+    prompt = f"""
+    คุณคือนักวิเคราะห์หุ้นมืออาชีพ
+    นี่คือพาดหัวข่าวล่าสุดของหุ้น {ticker}:
+    {titles_str}
+
+    ช่วยเขียนสรุปข่าวที่น่าสนใจที่สุด และผลกระทบที่อาจเกิดขึ้นกับหุ้นตัวนี้
+    ความยาว 3-4 บรรทัด ด้วยภาษาเป็นกันเอง อ่านง่าย คุยเหมือนเพื่อนเทรดเดอร์ด้วยกัน
+    (ถ้าข่าวไหนไม่เกี่ยวเลยให้ข้ามไป)
+    """
+
+    ai_response = _gemini().models.generate_content(model='gemini-2.5-flash', contents=prompt)
+    return ai_response.text.strip()
+
 
 def fetch_stock_news_summary(ticker: str) -> str:
     """ดึงข่าวด่วนของหุ้นรายตัว และให้ AI สรุป"""
     try:
-        # ตัด .BK ออกเวลาค้นหาข่าวเพื่อความแม่นยำ
-        search_term = ticker.replace('.BK', '')
-        
-        # ดึงข่าวจาก Google News ย้อนหลัง 7 วัน
-        url = f"https://news.google.com/rss/search?q={search_term}+stock+OR+หุ้น+when:7d&hl=th&gl=TH&ceid=TH:th"
-        res = cffi_requests.get(url, impersonate="chrome110", timeout=10)
-        root = ET.fromstring(res.content)
-        
-        titles = []
-        for item in root.findall('.//item')[:5]: # ดึงมาแค่ 5 ข่าวล่าสุดพอ
-            title = item.find('title')
-            if title is not None:
-                titles.append(title.text.strip())
-        
+        ticker = ticker.upper()
+        titles = market_cache.get_or_compute(NEWS_HEADLINES_NS, ticker, lambda: _fetch_headlines(ticker))
+
         if not titles:
             return f"🔍 **ไม่พบข่าวสารล่าสุด** สำหรับหุ้น {ticker} ในรอบ 7 วันที่ผ่านมาครับ"
-            
-        titles_str = "\n".join([f"- {t}" for t in titles])
-        
-        # ส่งให้ Gemini สรุป
-        client = genai.Client(api_key=GEMINI_API_KEY)
-        prompt = f"""
-        คุณคือนักวิเคราะห์หุ้นมืออาชีพ 
-        นี่คือพาดหัวข่าวล่าสุดของหุ้น {ticker}:
-        {titles_str}
-        
-        ช่วยเขียนสรุปข่าวที่น่าสนใจที่สุด และผลกระทบที่อาจเกิดขึ้นกับหุ้นตัวนี้
-        ความยาว 3-4 บรรทัด ด้วยภาษาเป็นกันเอง อ่านง่าย คุยเหมือนเพื่อนเทรดเดอร์ด้วยกัน
-        (ถ้าข่าวไหนไม่เกี่ยวเลยให้ข้ามไป)
-        """
-        
-        ai_response = client.models.generate_content(model='gemini-2.5-flash', contents=prompt)
-        return ai_response.text.strip()
-        
+
+        # ข้อผิดพลาดจะไม่ถูก cache — ครั้งถัดไปลองใหม่
+        key = f"{ticker}:{headline_fingerprint(titles)}"
+        return market_cache.get_or_compute(NEWS_SUMMARY_NS, key, lambda: _summarize(ticker, titles))
+
     except Exception as e:
         return f"❌ **ขออภัยครับ:** ระบบดึงข่าวมีปัญหาขัดข้องชั่วคราว\n(Error Detail: {e})"
@@ -0,0 +1,364 @@
+"""Outbound Telegram notification queue — persistent, rate limited, retried.
+
+Callers (the alert engine, the morning briefing) ``enqueue`` a message and
+return immediately. Messages are stored in a local SQLite outbox
+(TELEGRAM_QUEUE_PATH), so nothing is lost when a process restarts, and every
+process on the host (API workers, NiceGUI, bot) can enqueue into the same file.
+
+Exactly one process sends at a time — whichever holds the outbox's sender
+lease; the others keep trying to take it over, so sending resumes if that
+process dies. In the sender:
+
+- a dispatcher claims due messages in id order and hands them to a pool of
+  TELEGRAM_SEND_WORKERS threads;
+- a global token bucket keeps the bot under TELEGRAM_GLOBAL_RATE messages/s
+  and each chat gets at most one message per TELEGRAM_CHAT_INTERVAL seconds
+  (a message for a chat that is not ready yet is rescheduled, not held);
+- a 429 reschedules the message after Telegram's ``retry_after`` and pauses
+  all sending for that long; other transient errors back off exponentially
+  up to TELEGRAM_MAX_ATTEMPTS; 400/403 (blocked bot, unknown chat) fail at once.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from core.config import (
+    TELEGRAM_CHAT_INTERVAL,
+    TELEGRAM_GLOBAL_RATE,
+    TELEGRAM_MAX_ATTEMPTS,
+    TELEGRAM_QUEUE_PATH,
+    TELEGRAM_SEND_WORKERS,
+)
+
+_SENDER_LEASE = "sender"
+_LEASE_TTL = 15.0
+# Sent/failed rows are kept this long for metrics, then pruned
+_KEEP_SECONDS = 7 * 86400
+
+
+class _TokenBucket:
+    """Global send rate: ``rate`` tokens/s with a burst of ``rate``; ``pause`` blocks everyone (429)."""
+
+    def __init__(self, rate: float):
+        self.rate = max(float(rate), 0.1)
+        self._tokens = self.rate
+        self._stamp = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def take(self) -> float:
+        """Wait for a token. Returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                delay = max(self._paused_until - now, 0.0)
+                if not delay and self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                delay = delay or (1.0 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+def _retry_after(error: Exception) -> float | None:
+    """Seconds Telegram asked us to wait, if ``error`` is a 429."""
+    if getattr(error, "error_code", None) != 429:
+        return None
+    params = (getattr(error, "result_json", None) or {}).get("parameters") or {}
+    return float(params.get("retry_after") or 5)
+
+
+def _is_permanent(error: Exception) -> bool:
+    return getattr(error, "error_code", None) in (400, 403)
+
+
+class Notifier:
+    """SQLite outbox plus the sender (dispatcher + worker pool) of the process holding the lease."""
+
+    def __init__(self, path: str, workers: int, global_rate: float, chat_interval: float, max_attempts: int):
+        self.path = path
+        self.workers = max(int(workers), 1)
+        self.chat_interval = max(float(chat_interval), 0.0)
+        self.max_attempts = max(int(max_attempts), 1)
+        self._bucket = _TokenBucket(global_rate)
+        self._owner = f"{os.getpid()}:{id(self)}"
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._work: queue.Queue = queue.Queue()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._chat_next: dict[str, float] = {}
+        self._leader = False
+        self._counters = {
+            "enqueued": 0, "sent": 0, "failed": 0, "retried_429": 0, "retried_error": 0,
+            "chat_deferred": 0, "throttle_wait_s": 0.0, "latency_s": 0.0,
+        }
+        self._ready = False
+
+    # ── storage ───────────────────────────────────────────────────────
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            if not self._ready:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS outbox (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        chat_id TEXT NOT NULL,
+                        text TEXT NOT NULL,
+                        parse_mode TEXT,
+                        kind TEXT NOT NULL DEFAULT 'message',
+                        status TEXT NOT NULL DEFAULT 'pending',
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        created REAL NOT NULL,
+                        not_before REAL NOT NULL,
+                        owner TEXT,
+                        done_at REAL,
+                        last_error TEXT
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, not_before)")
+                conn.execute("CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)")
+                self._ready = True
+        return conn
+
+    def _count(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            self._counters[name] += n
+
+    def enqueue(self, chat_id: str | int, text: str, parse_mode: str | None = "HTML", kind: str = "message") -> None:
+        now = time.time()
+        self._conn().execute(
+            "INSERT INTO outbox (chat_id, text, parse_mode, kind, created, not_before) VALUES (?, ?, ?, ?, ?, ?)",
+            (str(chat_id), text, parse_mode, kind, now, now),
+        )
+        self._count("enqueued")
+        self._wake.set()
+        self.start()
+
+    def enqueue_many(self, messages: list[tuple[str | int, str]], parse_mode: str | None = "HTML", kind: str = "message") -> None:
+        """Enqueue ``[(chat_id, text)]`` in one transaction."""
+        if not messages:
+            return
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO outbox (chat_id, text, parse_mode, kind, created, not_before) VALUES (?, ?, ?, ?, ?, ?)",
+                [(str(chat_id), text, parse_mode, kind, now, now) for chat_id, text in messages],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._count("enqueued", len(messages))
+        self._wake.set()
+        self.start()
+
+    def _hold_lease(self) -> bool:
+        now = time.time()
+        cur = self._conn().execute(
+            "INSERT INTO leases (name, owner, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+            "WHERE leases.owner = excluded.owner OR leases.expires <= ?",
+            (_SENDER_LEASE, self._owner, now + _LEASE_TTL, now),
+        )
+        return cur.rowcount == 1
+
+    def _claim(self, limit: int) -> list[tuple]:
+        """Mark up to ``limit`` due messages as sending by this process.
+
+        Messages left in ``sending`` by a previous sender (crashed, or lost the
+        lease) are claimed again once its lease has had time to expire.
+        """
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, chat_id, text, parse_mode, attempts, created FROM outbox "
+                "WHERE (status = 'pending' AND not_before <= ?) "
+                "OR (status = 'sending' AND owner != ? AND not_before <= ?) "
+                "ORDER BY id LIMIT ?",
+                (now, self._owner, now - _LEASE_TTL * 2, limit),
+            ).fetchall()
+            if rows:
+                conn.executemany(
+                    "UPDATE outbox SET status = 'sending', owner = ?, not_before = ? WHERE id = ?",
+                    [(self._owner, now, r[0]) for r in rows],
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return rows
+
+    def _finish(self, msg_id: int, status: str, attempts: int, error: str | None = None, retry_at: float | None = None) -> None:
+        now = time.time()
+        if status == "pending":
+            self._conn().execute(
+                "UPDATE outbox SET status = 'pending', attempts = ?, not_before = ?, last_error = ? WHERE id = ?",
+                (attempts, retry_at or now, error, msg_id),
+            )
+        else:
+            self._conn().execute(
+                "UPDATE outbox SET status = ?, attempts = ?, done_at = ?, last_error = ? WHERE id = ?",
+                (status, attempts, now, error, msg_id),
+            )
+
+    # ── sender ────────────────────────────────────────────────────────
+
+    def _dispatch_loop(self) -> None:
+        last_prune = 0.0
+        while not self._stop.is_set():
+            try:
+                self._leader = self._hold_lease()
+                if not self._leader:
+                    self._stop.wait(_LEASE_TTL / 3)
+                    continue
+                if time.time() - last_prune > 3600:
+                    last_prune = time.time()
+                    self._conn().execute(
+                        "DELETE FROM outbox WHERE status IN ('sent', 'failed') AND done_at < ?",
+                        (time.time() - _KEEP_SECONDS,),
+                    )
+                if self._work.qsize() >= self.workers:
+                    # Workers are busy (or paused by a 429) — claim more once they catch up.
+                    self._stop.wait(0.2)
+                    continue
+                claimed = self._claim(self.workers * 2)
+                if not claimed:
+                    self._wake.wait(1.0)
+                    self._wake.clear()
+                    continue
+                now = time.monotonic()
+                for row in claimed:
+                    chat_id = row[1]
+                    with self._lock:
+                        ready_at = self._chat_next.get(chat_id, 0.0)
+                        if ready_at <= now:
+                            # In flight: the worker sets the real next slot once it has sent.
+                            self._chat_next[chat_id] = float("inf")
+                    if ready_at > now:
+                        # Per-chat limit: come back when the chat is free instead of blocking a worker.
+                        delay = min(ready_at - now, self.chat_interval or 0.2)
+                        self._finish(row[0], "pending", row[4], None, time.time() + delay)
+                        self._count("chat_deferred")
+                        continue
+                    self._work.put(row)
+                if len(self._chat_next) > 10000:
+                    with self._lock:
+                        self._chat_next = {c: t for c, t in self._chat_next.items() if t > now}
+            except Exception as e:
+                print(f"[Notifier] dispatch error: {e}")
+                self._stop.wait(2.0)
+
+    def _release_chat(self, chat_id: str) -> None:
+        with self._lock:
+            self._chat_next[chat_id] = time.monotonic() + self.chat_interval
+
+    def _worker_loop(self) -> None:
+        from telegram.handlers import bot
+
+        while not self._stop.is_set():
+            try:
+                msg_id, chat_id, text, parse_mode, attempts, created = self._work.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            attempts += 1
+            self._count("throttle_wait_s", self._bucket.take())
+            try:
+                bot.send_message(chat_id, text, parse_mode=parse_mode)
+            except Exception as e:
+                self._release_chat(chat_id)
+                retry_after = _retry_after(e)
+                if retry_after is not None:
+                    self._bucket.pause(retry_after)
+                    self._finish(msg_id, "pending", attempts - 1, str(e), time.time() + retry_after)
+                    self._count("retried_429")
+                elif _is_permanent(e) or attempts >= self.max_attempts:
+                    self._finish(msg_id, "failed", attempts, str(e))
+                    self._count("failed")
+                else:
+                    self._finish(msg_id, "pending", attempts, str(e), time.time() + min(2 ** attempts, 300))
+                    self._count("retried_error")
+                continue
+            self._release_chat(chat_id)
+            self._finish(msg_id, "sent", attempts)
+            self._count("sent")
+            self._count("latency_s", time.time() - created)
+
+    def start(self) -> None:
+        with self._lock:
+            if any(t.is_alive() for t in self._threads):
+                return
+            self._stop.clear()
+            self._threads = [threading.Thread(target=self._dispatch_loop, name="notifier-dispatch", daemon=True)]
+            self._threads += [
+                threading.Thread(target=self._worker_loop, name=f"notifier-send-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for t in self._threads:
+                t.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._leader:
+            try:
+                self._conn().execute("DELETE FROM leases WHERE name = ? AND owner = ?", (_SENDER_LEASE, self._owner))
+            except sqlite3.Error:
+                pass
+
+    def stats(self) -> dict:
+        try:
+            by_status = dict(self._conn().execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+        except sqlite3.Error:
+            by_status = {}
+        with self._lock:
+            c = dict(self._counters)
+        return {
+            "path": self.path,
+            "sender": self._leader,
+            "workers": self.workers,
+            "global_rate": self._bucket.rate,
+            "chat_interval": self.chat_interval,
+            "outbox": by_status,
+            "enqueued": c["enqueued"],
+            "sent": c["sent"],
+            "failed": c["failed"],
+            "retried_429": c["retried_429"],
+            "retried_error": c["retried_error"],
+            "chat_deferred": c["chat_deferred"],
+            "throttle_wait_s": round(c["throttle_wait_s"], 3),
+            "avg_latency_s": round(c["latency_s"] / c["sent"], 3) if c["sent"] else 0.0,
+        }
+
+
+notifier = Notifier(
+    TELEGRAM_QUEUE_PATH,
+    workers=TELEGRAM_SEND_WORKERS,
+    global_rate=TELEGRAM_GLOBAL_RATE,
+    chat_interval=TELEGRAM_CHAT_INTERVAL,
+    max_attempts=TELEGRAM_MAX_ATTEMPTS,
+)
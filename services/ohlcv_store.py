@@ -0,0 +1,379 @@
+"""Columnar in-memory OHLCV history, shared by chart, indicator and backtest paths.
+
+Each (ticker, interval, adjusted) series is held as one int64 timestamp array
+plus one float64 array per field (open/high/low/close/volume/dividends).
+Readers get ``OHLCVSeries`` views — slicing a date range is a binary search and
+returns array views, never copies. When a stored series is older than the
+interval's freshness window only the bars since the last stored bar are
+downloaded and appended in place; the in-progress last bar is overwritten.
+
+Timestamps are exchange wall-clock times (downloads use ``ignore_tz=True``)
+encoded as epoch seconds, so date labels match what Yahoo shows.
+
+With a ``HistoryDiskCache`` attached, series missing from memory are first
+memory-mapped from disk and every fetch is written back, so history survives
+restarts and is shared between uvicorn workers.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from services.history_disk_cache import HistoryDiskCache
+
+FIELDS = ("open", "high", "low", "close", "volume", "dividends")
+_COLUMN_MAP = {
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Close": "close",
+    "Volume": "volume",
+    "Dividends": "dividends",
+}
+
+# Seconds a stored series is served as is before newer bars are requested
+_FRESHNESS = {
+    "1m": 60, "2m": 60, "5m": 120, "15m": 300, "30m": 300, "60m": 600, "90m": 600, "1h": 600,
+    "1d": 300, "5d": 1800, "1wk": 1800, "1mo": 3600, "3mo": 3600,
+}
+# Adjusted prices and dividend columns are revised retroactively — reload fully once a day
+FULL_RELOAD_AFTER = 86400
+
+_PERIOD_RE = re.compile(r"^(\d+)(d|wk|mo|y)$")
+
+
+def _to_epoch(ts: pd.Timestamp) -> int:
+    return int(pd.Timestamp(ts).value // 10**9)
+
+
+def period_start(period: str) -> int | None:
+    """Epoch second where a yfinance ``period`` ('3mo', '10y', 'ytd', ...) begins; None for 'max'."""
+    p = str(period or "").strip().lower()
+    if p == "max":
+        return None
+    now = pd.Timestamp.now()
+    if p == "ytd":
+        return _to_epoch(pd.Timestamp(year=now.year, month=1, day=1))
+    m = _PERIOD_RE.match(p)
+    if not m:
+        raise ValueError(f"unsupported period: {period!r}")
+    n, unit = int(m.group(1)), m.group(2)
+    offset = {
+        "d": pd.DateOffset(days=n),
+        "wk": pd.DateOffset(weeks=n),
+        "mo": pd.DateOffset(months=n),
+        "y": pd.DateOffset(years=n),
+    }[unit]
+    return _to_epoch((now - offset).normalize())
+
+
+def frame_to_columns(data: pd.DataFrame, ticker: str) -> tuple[np.ndarray, dict[str, np.ndarray]] | None:
+    """Convert a yf.download frame (flat or MultiIndex columns) into (t, columns)."""
+    if data is None or data.empty:
+        return None
+    if isinstance(data.columns, pd.MultiIndex):
+        if ticker not in data.columns.get_level_values(1):
+            return None
+        data = data.xs(ticker, level=1, axis=1)
+    if "Close" not in data.columns:
+        return None
+    data = data.dropna(subset=["Close"])
+    if data.empty:
+        return None
+
+    idx = pd.DatetimeIndex(data.index)
+    if idx.tz is not None:
+        idx = idx.tz_localize(None)
+    t = idx.values.astype("datetime64[s]").astype(np.int64)
+    cols = {}
+    for src, dst in _COLUMN_MAP.items():
+        if src in data.columns:
+            cols[dst] = data[src].to_numpy(dtype=np.float64)
+        else:
+            cols[dst] = np.zeros(len(t), dtype=np.float64)
+    cols["volume"] = np.nan_to_num(cols["volume"])
+    cols["dividends"] = np.nan_to_num(cols["dividends"])
+
+    # Yahoo occasionally repeats the live bar's timestamp — keep the last row per timestamp.
+    if len(t) > 1 and not np.all(np.diff(t) > 0):
+        _, rev_idx = np.unique(t[::-1], return_index=True)
+        keep = len(t) - 1 - rev_idx
+        t = t[keep]
+        cols = {f: a[keep] for f, a in cols.items()}
+    return t, cols
+
+
+class OHLCVSeries:
+    """Read-only columnar view of one ticker's history. Arrays may share memory with the store."""
+
+    __slots__ = ("ticker", "interval", "t", "open", "high", "low", "close", "volume", "dividends")
+
+    def __init__(self, ticker: str, interval: str, t: np.ndarray, cols: dict[str, np.ndarray]):
+        self.ticker = ticker
+        self.interval = interval
+        self.t = t
+        for f in FIELDS:
+            setattr(self, f, cols[f])
+
+    @classmethod
+    def empty_series(cls, ticker: str, interval: str) -> "OHLCVSeries":
+        return cls(ticker, interval, np.empty(0, dtype=np.int64), {f: np.empty(0) for f in FIELDS})
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    @property
+    def empty(self) -> bool:
+        return len(self.t) == 0
+
+    def slice(self, start: int | None = None, end: int | None = None) -> "OHLCVSeries":
+        """Bars with ``start <= t < end`` (epoch seconds). Zero-copy."""
+        i = 0 if start is None else int(np.searchsorted(self.t, start, side="left"))
+        j = len(self.t) if end is None else int(np.searchsorted(self.t, end, side="left"))
+        return OHLCVSeries(self.ticker, self.interval, self.t[i:j], {f: getattr(self, f)[i:j] for f in FIELDS})
+
+    def tail(self, n: int) -> "OHLCVSeries":
+        i = max(len(self.t) - int(n), 0)
+        return OHLCVSeries(self.ticker, self.interval, self.t[i:], {f: getattr(self, f)[i:] for f in FIELDS})
+
+    def labels(self, unit: str = "D") -> list[str]:
+        """ISO date labels ('D' → YYYY-MM-DD, 'M' → YYYY-MM, 'm' → YYYY-MM-DDTHH:MM)."""
+        return np.datetime_as_string(self.t.astype("datetime64[s]"), unit=unit).tolist()
+
+    def index(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(self.t.astype("datetime64[s]").astype("datetime64[ns]"))
+
+    def series(self, field: str = "close") -> pd.Series:
+        return pd.Series(getattr(self, field), index=self.index(), name=field, copy=False)
+
+    def frame(self) -> pd.DataFrame:
+        """yfinance-shaped frame (Open/High/Low/Close/Volume/Dividends) for pandas-based callers."""
+        return pd.DataFrame({src: getattr(self, dst) for src, dst in _COLUMN_MAP.items()}, index=self.index())
+
+
+class _Buffer:
+    """Growable column buffers for one series. Only the store mutates it, under its lock."""
+
+    __slots__ = ("t", "cols", "size", "period", "loaded_from", "loaded_at", "fetched_at")
+
+    def __init__(self, t: np.ndarray, cols: dict[str, np.ndarray], period: str, loaded_from: int | None, now: float):
+        self.t = t
+        self.cols = cols
+        self.size = len(t)
+        self.period = period
+        self.loaded_from = loaded_from
+        self.loaded_at = now
+        self.fetched_at = now
+
+    def covers(self, start: int | None) -> bool:
+        if self.loaded_from is None:
+            return True
+        return start is not None and self.loaded_from <= start
+
+    def view(self, ticker: str, interval: str) -> OHLCVSeries:
+        n = self.size
+        return OHLCVSeries(ticker, interval, self.t[:n], {f: self.cols[f][:n] for f in FIELDS})
+
+    def meta(self) -> dict[str, str]:
+        return {
+            "period": self.period,
+            "loaded_from": "" if self.loaded_from is None else str(self.loaded_from),
+            "loaded_at": repr(self.loaded_at),
+            "fetched_at": repr(self.fetched_at),
+        }
+
+    @classmethod
+    def from_disk(cls, t: np.ndarray, cols: dict[str, np.ndarray], meta: dict[str, str]) -> "_Buffer":
+        loaded_from = meta.get("loaded_from", "")
+        buf = cls(t, cols, meta.get("period", "max"), int(loaded_from) if loaded_from else None, 0.0)
+        buf.loaded_at = float(meta.get("loaded_at", 0) or 0)
+        buf.fetched_at = float(meta.get("fetched_at", 0) or 0)
+        return buf
+
+    def append(self, t_new: np.ndarray, cols_new: dict[str, np.ndarray]) -> int:
+        """Merge bars starting at ``t_new[0]``; returns the number of bars added."""
+        n = self.size
+        cut = int(np.searchsorted(self.t[:n], t_new[0], side="left"))
+        new_size = cut + len(t_new)
+        # Writing in place is safe for readers' views except the in-progress last bar,
+        # which is meant to update. Anything older being rewritten gets fresh buffers,
+        # as do read-only memory-mapped arrays loaded from disk.
+        if new_size > len(self.t) or cut < n - 1 or not self.t.flags.writeable:
+            capacity = max(int(new_size * 1.25), new_size + 64)
+            t = np.empty(capacity, dtype=np.int64)
+            t[:cut] = self.t[:cut]
+            cols = {}
+            for f in FIELDS:
+                arr = np.empty(capacity, dtype=np.float64)
+                arr[:cut] = self.cols[f][:cut]
+                cols[f] = arr
+            self.t, self.cols = t, cols
+        self.t[cut:new_size] = t_new
+        for f in FIELDS:
+            self.cols[f][cut:new_size] = cols_new[f]
+        self.size = new_size
+        return new_size - n
+
+    @property
+    def nbytes(self) -> int:
+        return self.t.nbytes + sum(a.nbytes for a in self.cols.values())
+
+
+class OHLCVStore:
+    """Bounded LRU of columnar series keyed by (ticker, interval, adjusted)."""
+
+    def __init__(self, download: Callable[..., pd.DataFrame], max_series: int = 512, disk: "HistoryDiskCache | None" = None):
+        self._download = download
+        self.max_series = max(int(max_series), 1)
+        self._disk = disk
+        self._series: OrderedDict[tuple[str, str, bool], _Buffer] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._full_fetches = 0
+        self._incremental_fetches = 0
+        self._bars_appended = 0
+        self._errors = 0
+        self._evictions = 0
+        self._disk_loads = 0
+
+    def get(self, ticker: str, interval: str = "1d", period: str = "1y", adjusted: bool = True) -> OHLCVSeries:
+        return self.get_many([ticker], interval, period, adjusted)[ticker]
+
+    def get_many(self, tickers: list[str], interval: str = "1d", period: str = "1y", adjusted: bool = True) -> dict[str, OHLCVSeries]:
+        """History for ``period`` per ticker; missing or stale series are fetched in one download per kind."""
+        tickers = list(dict.fromkeys(str(t).strip().upper() for t in tickers if t))
+        start = period_start(period)
+        now = time.time()
+        freshness = _FRESHNESS.get(interval, 300)
+        full: dict[str, list[str]] = {}
+        incremental: list[str] = []
+        since: int | None = None
+
+        if self._disk is not None and self._disk.enabled:
+            self._load_from_disk(tickers, interval, adjusted)
+
+        with self._lock:
+            for t in tickers:
+                buf = self._series.get((t, interval, adjusted))
+                if buf is None or not buf.covers(start) or buf.size == 0:
+                    full.setdefault(period, []).append(t)
+                elif now - buf.loaded_at >= FULL_RELOAD_AFTER:
+                    # Keep the wider window the series was loaded with.
+                    full.setdefault(buf.period, []).append(t)
+                elif now - buf.fetched_at >= freshness:
+                    incremental.append(t)
+                    last = int(buf.t[buf.size - 1])
+                    since = last if since is None else min(since, last)
+                else:
+                    self._hits += 1
+
+        for fetch_period, group in full.items():
+            self._fetch(group, interval, adjusted, {"period": fetch_period}, fetch_period)
+        if incremental:
+            start_day = pd.Timestamp(since, unit="s").strftime("%Y-%m-%d")
+            self._fetch(incremental, interval, adjusted, {"start": start_day}, None)
+
+        out: dict[str, OHLCVSeries] = {}
+        with self._lock:
+            for t in tickers:
+                key = (t, interval, adjusted)
+                buf = self._series.get(key)
+                if buf is None:
+                    out[t] = OHLCVSeries.empty_series(t, interval)
+                    continue
+                self._series.move_to_end(key)
+                out[t] = buf.view(t, interval).slice(start)
+        return out
+
+    def _load_from_disk(self, tickers: list[str], interval: str, adjusted: bool) -> None:
+        with self._lock:
+            cold = [t for t in tickers if (t, interval, adjusted) not in self._series]
+        for t in cold:
+            loaded = self._disk.load(t, interval, adjusted, FIELDS)
+            if loaded is None:
+                continue
+            ts, cols, meta = loaded
+            with self._lock:
+                if (t, interval, adjusted) not in self._series:
+                    self._series[(t, interval, adjusted)] = _Buffer.from_disk(ts, cols, meta)
+                    self._disk_loads += 1
+
+    def _fetch(self, tickers: list[str], interval: str, adjusted: bool, window: dict, full_period: str | None) -> None:
+        """Download ``tickers`` and store them; ``full_period`` None means append to existing series."""
+        now = time.time()
+        try:
+            data = self._download(
+                tickers[0] if len(tickers) == 1 else tickers,
+                interval=interval,
+                auto_adjust=adjusted,
+                actions=True,
+                progress=False,
+                ignore_tz=True,
+                **window,
+            )
+        except Exception as e:
+            with self._lock:
+                self._errors += 1
+            print(f"⚠️ OHLCV fetch failed ({interval}, {len(tickers)} tickers): {e}")
+            return
+
+        to_save = []
+        with self._lock:
+            if full_period is not None:
+                self._full_fetches += 1
+            else:
+                self._incremental_fetches += 1
+            for t in tickers:
+                key = (t, interval, adjusted)
+                parsed = frame_to_columns(data, t)
+                buf = self._series.get(key)
+                if full_period is not None:
+                    if parsed is None:
+                        continue
+                    ts, cols = parsed
+                    buf = self._series[key] = _Buffer(ts, cols, full_period, period_start(full_period), now)
+                elif buf is not None:
+                    if parsed is not None:
+                        self._bars_appended += buf.append(*parsed)
+                    buf.fetched_at = now
+                else:
+                    continue
+                self._series.move_to_end(key)
+                n = buf.size
+                to_save.append((t, buf.t[:n], {f: buf.cols[f][:n] for f in FIELDS}, buf.meta()))
+            while len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+                self._evictions += 1
+
+        if self._disk is not None:
+            for t, ts, cols, meta in to_save:
+                self._disk.save(t, interval, adjusted, ts, cols, meta)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "series": len(self._series),
+                "max_series": self.max_series,
+                "bars": sum(b.size for b in self._series.values()),
+                "bytes": sum(b.nbytes for b in self._series.values()),
+                "hits": self._hits,
+                "full_fetches": self._full_fetches,
+                "incremental_fetches": self._incremental_fetches,
+                "bars_appended": self._bars_appended,
+                "errors": self._errors,
+                "evictions": self._evictions,
+                "disk_loads": self._disk_loads,
+                "disk": self._disk.stats() if self._disk is not None else None,
+            }
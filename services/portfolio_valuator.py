@@ -0,0 +1,122 @@
+"""Portfolio valuation as NumPy array math — one engine for every portfolio view.
+
+The REST portfolio and dividend endpoints, the NiceGUI dashboard and the
+Telegram /portfolio command all value holdings through ``PortfolioValuator``:
+holdings become ``shares`` / ``avg_cost`` vectors, prices are aligned into one
+price vector, and value, cost, PnL, PnL % and dividend income are computed
+for every position at once. Currency conversion is a single multiply over the
+stacked money columns, so USD and THB views can never disagree.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Mapping
+
+import numpy as np
+
+# Money columns — converted to the display currency together.
+MONEY_COLUMNS = ("avg_cost", "price", "value", "cost", "pnl", "annual_div", "monthly_div")
+
+
+class Valuation:
+    """Per-position columns (NumPy arrays, holdings order) plus portfolio totals."""
+
+    __slots__ = ("holdings", "tickers", "shares", "fx_rate", "price_fallback", "pnl_pct", "div_yield", "columns", "totals")
+
+    def __init__(self, holdings: list[dict], tickers: list[str], shares: np.ndarray, fx_rate: float,
+                 price_fallback: np.ndarray, pnl_pct: np.ndarray, div_yield: np.ndarray,
+                 columns: dict[str, np.ndarray], totals: dict[str, float]):
+        self.holdings = holdings
+        self.tickers = tickers
+        self.shares = shares
+        self.fx_rate = fx_rate
+        self.price_fallback = price_fallback
+        self.pnl_pct = pnl_pct
+        self.div_yield = div_yield
+        self.columns = columns
+        self.totals = totals
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        try:
+            return self.columns[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def rounded(self, name: str, decimals: int = 2) -> list[float]:
+        """One column as a plain list rounded for JSON/display."""
+        return np.round(getattr(self, name), decimals).tolist()
+
+
+def _finish(holdings, tickers, shares, avg_cost, price, fallback, div_yield, fx_rate) -> Valuation:
+    """Derive every column from USD vectors, then convert money columns with one multiply."""
+    value = shares * price
+    cost = shares * avg_cost
+    pnl = value - cost
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pnl_pct = np.where(cost > 0, pnl / cost * 100, 0.0)
+    annual_div = np.where(div_yield > 0, value * div_yield / 100, 0.0)
+
+    money = np.vstack([avg_cost, price, value, cost, pnl, annual_div, annual_div / 12]) * fx_rate
+    columns = dict(zip(MONEY_COLUMNS, money))
+
+    total_value, total_cost, total_pnl, total_annual = (float(x) for x in money[[2, 3, 4, 5]].sum(axis=1))
+    totals = {
+        "total_value": total_value,
+        "total_cost": total_cost,
+        "total_pnl": total_pnl,
+        "total_pnl_pct": (total_pnl / total_cost * 100) if total_cost > 0 else 0.0,
+        "total_annual_div": total_annual,
+        "total_monthly_div": total_annual / 12,
+        "avg_yield": float(div_yield.mean()) if len(div_yield) else 0.0,
+    }
+    return Valuation(holdings, tickers, shares, fx_rate, fallback, pnl_pct, div_yield, columns, totals)
+
+
+class PortfolioValuator:
+    """Turns holdings + prices into a ``Valuation``.
+
+    ``fallback_to_cost`` values positions with no positive price at their
+    average cost (flagged in ``price_fallback``) instead of at zero — the
+    dashboard uses it so a missing quote does not look like a total loss.
+    """
+
+    def value(
+        self,
+        holdings: list[dict],
+        prices: Mapping[str, float] | np.ndarray,
+        fx_rate: float = 1.0,
+        fallback_to_cost: bool = False,
+        dividend_yields: Mapping[str, float] | np.ndarray | None = None,
+    ) -> Valuation:
+        tickers = [str(h["ticker"]) for h in holdings]
+        n = len(tickers)
+        shares = np.fromiter((_num(h.get("shares")) for h in holdings), dtype=np.float64, count=n)
+        avg_cost = np.fromiter((_num(h.get("avg_cost")) for h in holdings), dtype=np.float64, count=n)
+        price = _align(prices, tickers)
+        div_yield = np.nan_to_num(_align(dividend_yields, tickers)) if dividend_yields is not None else np.zeros(n)
+
+        missing = ~(price > 0)
+        fallback = missing if fallback_to_cost else np.zeros(n, dtype=bool)
+        price = np.where(missing, np.maximum(avg_cost, 0.0) if fallback_to_cost else 0.0, price)
+        return _finish(holdings, tickers, shares, avg_cost, price, fallback, div_yield, float(fx_rate or 1.0))
+
+
+def _num(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _align(values: Mapping[str, float] | np.ndarray | None, tickers: list[str]) -> np.ndarray:
+    """Price/yield vector in holdings order (a mapping is looked up by ticker; missing → NaN)."""
+    if isinstance(values, np.ndarray):
+        return values.astype(np.float64, copy=False)
+    values = values or {}
+    return np.fromiter((_num(values.get(t, np.nan)) for t in tickers), dtype=np.float64, count=len(tickers))
+
+
+portfolio_valuator = PortfolioValuator()
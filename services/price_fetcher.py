@@ -0,0 +1,142 @@
+"""Tiered price-fetch engine — the single code path behind every price getter.
+
+Tickers are resolved tier by tier: ``intraday`` (1d/1m, freshest), then
+``daily`` (5d/1d, covers off-market hours and thin intraday data), then
+``last_known`` (whatever the cache last held). Each network tier downloads
+only the tickers the previous tier could not serve, in multi-ticker chunks of
+``chunk_size``. The engine records which tier served each ticker and the
+latency of every tier so slow or failing tiers show up in /api/admin/metrics.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable
+
+import pandas as pd
+
+INTRADAY_TIER = "intraday"
+DAILY_TIER = "daily"
+LAST_KNOWN_TIER = "last_known"
+
+PRICE_TIERS: tuple[tuple[str, dict[str, Any]], ...] = (
+    (INTRADAY_TIER, {"period": "1d", "interval": "1m"}),
+    (DAILY_TIER, {"period": "5d", "interval": "1d"}),
+)
+
+
+def last_closes(data: pd.DataFrame, tickers: list[str]) -> dict[str, float]:
+    """Last positive close per ticker from a yf.download frame (flat or MultiIndex columns)."""
+    out: dict[str, float] = {}
+    if data is None or data.empty or "Close" not in data:
+        return out
+    close = data["Close"]
+    if isinstance(close, pd.Series):
+        if len(tickers) != 1:
+            return out
+        close = close.to_frame(name=tickers[0])
+    for t in tickers:
+        if t not in close.columns:
+            continue
+        series = close[t].dropna()
+        if series.empty:
+            continue
+        price = float(series.iloc[-1])
+        if price > 0:
+            out[t] = price
+    return out
+
+
+class _TierStats:
+    __slots__ = ("requests", "served", "errors", "total_ms", "max_ms", "last_ms")
+
+    def __init__(self):
+        self.requests = 0
+        self.served = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+
+
+class TieredPriceFetcher:
+    """Resolve prices through intraday → daily → last-known tiers."""
+
+    def __init__(
+        self,
+        download: Callable[..., pd.DataFrame],
+        last_known: Callable[[str], float | None],
+        chunk_size: int = 100,
+        tiers: tuple[tuple[str, dict[str, Any]], ...] = PRICE_TIERS,
+    ):
+        self._download = download
+        self._last_known = last_known
+        self.chunk_size = max(int(chunk_size), 1)
+        self.tiers = tiers
+        self._lock = threading.Lock()
+        self._stats = {name: _TierStats() for name, _ in tiers}
+        self._stats[LAST_KNOWN_TIER] = _TierStats()
+        self._unresolved = 0
+
+    def fetch(self, tickers: list[str]) -> dict[str, tuple[float, str]]:
+        """Return ``{ticker: (price, tier)}``. Tickers no tier could price are omitted."""
+        remaining = list(dict.fromkeys(tickers))
+        served: dict[str, tuple[float, str]] = {}
+
+        for name, kwargs in self.tiers:
+            if not remaining:
+                break
+            started = time.perf_counter()
+            got: dict[str, float] = {}
+            requests = errors = 0
+            for i in range(0, len(remaining), self.chunk_size):
+                chunk = remaining[i:i + self.chunk_size]
+                requests += 1
+                try:
+                    data = self._download(chunk, progress=False, ignore_tz=True, **kwargs)
+                    got.update(last_closes(data, chunk))
+                except Exception:
+                    errors += 1
+            self._record(name, (time.perf_counter() - started) * 1000, requests, len(got), errors)
+            for t, price in got.items():
+                served[t] = (price, name)
+            remaining = [t for t in remaining if t not in got]
+
+        if remaining:
+            started = time.perf_counter()
+            found = 0
+            for t in remaining:
+                price = self._last_known(t)
+                if price:
+                    served[t] = (price, LAST_KNOWN_TIER)
+                    found += 1
+            self._record(LAST_KNOWN_TIER, (time.perf_counter() - started) * 1000, 1, found, 0)
+            with self._lock:
+                self._unresolved += len(remaining) - found
+        return served
+
+    def _record(self, tier: str, elapsed_ms: float, requests: int, served: int, errors: int) -> None:
+        with self._lock:
+            st = self._stats[tier]
+            st.requests += requests
+            st.served += served
+            st.errors += errors
+            st.total_ms += elapsed_ms
+            st.last_ms = elapsed_ms
+            st.max_ms = max(st.max_ms, elapsed_ms)
+
+    def stats(self) -> dict:
+        with self._lock:
+            tiers = {}
+            for name, st in self._stats.items():
+                calls = st.requests or 1
+                tiers[name] = {
+                    "requests": st.requests,
+                    "served": st.served,
+                    "errors": st.errors,
+                    "avg_ms": round(st.total_ms / calls, 1),
+                    "max_ms": round(st.max_ms, 1),
+                    "last_ms": round(st.last_ms, 1),
+                }
+            return {"chunk_size": self.chunk_size, "unresolved": self._unresolved, "tiers": tiers}
@@ -0,0 +1,302 @@
+"""Central price hub: one fetch per ticker per tick, changed prices pushed to subscribers.
+
+Every dashboard tab used to run its own 8-second timer that rebuilt the whole
+dashboard, and every page's ticker tape polled its six symbols every minute.
+The hub replaces those timers with push: subscribers (NiceGUI clients via
+``web/components/price_stream.py``, Next.js clients via ``/api/stream``)
+register the tickers they display (background services such as the alert
+engine use ``listen``), a single daemon thread reads the union of
+all subscribed tickers with one ``batch_get_prices`` call every
+PRICE_HUB_INTERVAL seconds, and each subscriber is sent only the prices that
+changed among its own tickers. Work per tick is proportional to distinct
+tickers, not to connected tabs × holdings.
+
+Deliveries are coalesced per subscription: if a consumer has not collected
+the previous batch yet, the new prices are merged into it (latest wins), so a
+slow consumer never builds up a queue.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Iterable
+
+from core.config import PRICE_HUB_INTERVAL
+from services.yahoo_finance import batch_get_prices
+
+
+def _normalize(tickers: Iterable[str]) -> frozenset[str]:
+    return frozenset(t for t in (str(x or "").strip().upper() for x in tickers) if t)
+
+
+class Subscription:
+    """One consumer's ticker set and its pending (not yet collected) price changes.
+
+    Created by ``PriceHub.subscribe`` inside a running event loop; the hub
+    thread hands deliveries to that loop, so ``get`` is awaited there.
+    """
+
+    def __init__(self, hub: "PriceHub", tickers: frozenset[str], loop: asyncio.AbstractEventLoop):
+        self.tickers = tickers
+        self.closed = False
+        self._hub = hub
+        self._loop = loop
+        self._pending: dict[str, float] = {}
+        self._ready = asyncio.Event()
+
+    def _offer(self, changes: dict[str, float]) -> bool:
+        """Called from the hub thread. False when the consumer's loop is gone."""
+        try:
+            self._loop.call_soon_threadsafe(self._deliver, changes)
+            return True
+        except RuntimeError:
+            return False
+
+    def _deliver(self, changes: dict[str, float]) -> None:
+        if self.closed:
+            return
+        superseded = len(self._pending.keys() & changes.keys())
+        if superseded:
+            self._hub._count_conflated(superseded)
+        self._pending.update(changes)
+        self._ready.set()
+
+    async def get(self, timeout: float | None = None) -> dict[str, float]:
+        """Next batch of changed prices (``{}`` on timeout or after ``close``)."""
+        if not self._pending and not self.closed:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return {}
+        self._ready.clear()
+        changes, self._pending = self._pending, {}
+        return changes
+
+    def update(self, tickers: Iterable[str]) -> None:
+        """Replace the ticker set; newly added tickers are delivered on the next tick (or now, if known)."""
+        self._hub._update(self, _normalize(tickers))
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._ready.set()
+            self._hub._remove(self)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict[str, float]:
+        while not self.closed:
+            changes = await self.get()
+            if changes:
+                return changes
+        raise StopAsyncIteration
+
+
+class Listener:
+    """Thread-side subscriber: ``callback(changes)`` runs on the hub thread, so it must be quick."""
+
+    def __init__(self, hub: "PriceHub", tickers: frozenset[str], callback):
+        self.tickers = tickers
+        self.closed = False
+        self._hub = hub
+        self._callback = callback
+
+    def _offer(self, changes: dict[str, float]) -> bool:
+        self._deliver(changes)
+        return True
+
+    def _deliver(self, changes: dict[str, float]) -> None:
+        try:
+            self._callback(changes)
+        except Exception as e:
+            print(f"[PriceHub] listener error: {e}")
+
+    def update(self, tickers: Iterable[str]) -> None:
+        self._hub._update(self, _normalize(tickers))
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._hub._remove(self)
+
+
+class PriceHub:
+    """Daemon thread that fetches the union of subscribed tickers and fans out changes."""
+
+    def __init__(self, interval: float):
+        self.interval = max(float(interval), 1.0)
+        self._lock = threading.Lock()
+        self._subs: set[Subscription | Listener] = set()
+        self._last: dict[str, float] = {}
+        self._new: set[str] = set()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._ticks = 0
+        self._catchup_ticks = 0
+        self._idle_ticks = 0
+        self._errors = 0
+        self._tickers_fetched = 0
+        self._changes = 0
+        self._deliveries = 0
+        self._conflated = 0
+        self._last_tick_at = 0.0
+        self._last_duration = 0.0
+
+    # ── subscriptions ─────────────────────────────────────────────────
+
+    def subscribe(self, tickers: Iterable[str]) -> Subscription:
+        """Register a consumer in the running event loop. Known prices are delivered immediately."""
+        sub = Subscription(self, _normalize(tickers), asyncio.get_running_loop())
+        with self._lock:
+            self._subs.add(sub)
+        self._greet(sub, sub.tickers)
+        self.start()
+        return sub
+
+    def listen(self, tickers: Iterable[str], callback) -> Listener:
+        """Register a background-thread consumer (e.g. the alert engine) instead of an event-loop one."""
+        listener = Listener(self, _normalize(tickers), callback)
+        with self._lock:
+            self._subs.add(listener)
+        self._greet(listener, listener.tickers)
+        self.start()
+        return listener
+
+    def _update(self, sub: Subscription, tickers: frozenset[str]) -> None:
+        with self._lock:
+            if sub.closed:
+                return
+            added = tickers - sub.tickers
+            sub.tickers = tickers
+        if added:
+            self._greet(sub, added)
+
+    def _greet(self, sub: Subscription, tickers: frozenset[str]) -> None:
+        """Hand ``sub`` the last published price of ``tickers``; wake the loop for unknown ones."""
+        with self._lock:
+            known = {t: self._last[t] for t in tickers if t in self._last}
+            unknown = tickers - known.keys()
+            self._new.update(unknown)
+        if known:
+            sub._deliver(known)
+        if unknown:
+            self._wake.set()
+
+    def _remove(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subs.discard(sub)
+
+    def _count_conflated(self, n: int) -> None:
+        with self._lock:
+            self._conflated += n
+
+    # ── ticking ───────────────────────────────────────────────────────
+
+    def tick(self, only: set[str] | None = None) -> int:
+        """Fetch subscribed tickers (or just ``only``) once and push changes. Returns changed count."""
+        started = time.time()
+        with self._lock:
+            subs = list(self._subs)
+            wanted = set().union(*(s.tickers for s in subs)) if subs else set()
+            if only is not None:
+                wanted &= only
+            # Forget prices nobody subscribes to any more.
+            if only is None:
+                self._last = {t: p for t, p in self._last.items() if t in wanted}
+        if not wanted:
+            with self._lock:
+                self._idle_ticks += 1
+            return 0
+
+        prices = batch_get_prices(sorted(wanted))
+        with self._lock:
+            changed = {
+                t: float(p) for t, p in prices.items()
+                if t in wanted and p and p > 0 and self._last.get(t) != p
+            }
+            self._last.update(changed)
+
+        deliveries = 0
+        for sub in subs:
+            if sub.closed:
+                continue
+            mine = {t: changed[t] for t in sub.tickers if t in changed}
+            if not mine:
+                continue
+            if sub._offer(mine):
+                deliveries += 1
+            else:
+                sub.closed = True
+                self._remove(sub)
+
+        with self._lock:
+            if only is None:
+                self._ticks += 1
+                self._last_tick_at = started
+                self._last_duration = time.time() - started
+            else:
+                self._catchup_ticks += 1
+            self._tickers_fetched += len(wanted)
+            self._changes += len(changed)
+            self._deliveries += deliveries
+        return len(changed)
+
+    def _loop(self) -> None:
+        next_at = time.monotonic()
+        while not self._stop.is_set():
+            self._wake.wait(max(next_at - time.monotonic(), 0.0))
+            if self._stop.is_set():
+                return
+            self._wake.clear()
+            with self._lock:
+                new, self._new = self._new, set()
+            try:
+                if time.monotonic() >= next_at:
+                    self.tick()
+                    next_at = time.monotonic() + self.interval
+                elif new:
+                    # A subscriber asked for tickers the hub has no price for yet.
+                    self.tick(new)
+            except Exception as e:
+                with self._lock:
+                    self._errors += 1
+                print(f"[PriceHub] tick error: {e}")
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="price-hub", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            tickers = set().union(*(s.tickers for s in self._subs)) if self._subs else set()
+            return {
+                "running": bool(self._thread and self._thread.is_alive()),
+                "interval": self.interval,
+                "subscribers": len(self._subs),
+                "distinct_tickers": len(tickers),
+                "ticks": self._ticks,
+                "catchup_ticks": self._catchup_ticks,
+                "idle_ticks": self._idle_ticks,
+                "errors": self._errors,
+                "tickers_fetched": self._tickers_fetched,
+                "price_changes": self._changes,
+                "deliveries": self._deliveries,
+                "conflated": self._conflated,
+                "last_tick_at": self._last_tick_at,
+                "last_duration": round(self._last_duration, 3),
+            }
+
+
+price_hub = PriceHub(PRICE_HUB_INTERVAL)
@@ -0,0 +1,141 @@
+"""Background refresher that keeps the hot ticker set warm in the market cache.
+
+The hot set is every ticker a request path is likely to ask for: POPULAR_STOCKS,
+MARKET_INDICES, all portfolio holdings, all watchlists and every symbol with an
+active alert. It is recomputed each cycle and re-fetched in chunked 5d/15m batch
+downloads (one download refreshes both price and sparkline) every
+PRICE_REFRESH_INTERVAL seconds — shorter than the price TTL, so builders like
+_build_portfolio_response and _build_watchlist_response read warm entries
+instead of blocking on Yahoo.
+
+When worker processes share a cache backend (services/shared_cache.py) a
+lease makes only one of them run each cycle; the others read its results.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+from core.config import (
+    MARKET_INDICES,
+    PRICE_REFRESH_CHUNK_SIZE,
+    PRICE_REFRESH_ENABLED,
+    PRICE_REFRESH_INTERVAL,
+)
+from core.models import get_active_alert_symbols, get_all_unique_tickers, get_all_watchlist_tickers
+from services.shared_cache import shared_cache
+from services.yahoo_finance import POPULAR_STOCKS, refresh_usd_thb_rate, update_global_cache_batch
+
+_CYCLE_LEASE = "price-refresher:cycle"
+
+# Symbols read by the dashboard sidebar and ticker tape on every refresh
+_EXTRA_HOT = ["^VIX", "^GSPC", "^IXIC", "^DJI", "BTC-USD", "GLD", "THB=X"]
+
+
+class PriceRefresher:
+    """Daemon thread that re-fetches the hot ticker set before its cache entries expire."""
+
+    def __init__(self, interval: float, chunk_size: int, enabled: bool = True):
+        self.interval = max(float(interval), 30.0)
+        self.chunk_size = max(int(chunk_size), 1)
+        self.enabled = enabled
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._cycles = 0
+        self._skipped = 0
+        self._errors = 0
+        self._last_run_at = 0.0
+        self._last_duration = 0.0
+        self._last_hot_count = 0
+        self._last_updated = 0
+
+    def hot_tickers(self) -> list[str]:
+        sources = [
+            POPULAR_STOCKS,
+            list(MARKET_INDICES.keys()),
+            _EXTRA_HOT,
+            get_all_unique_tickers(),
+            get_all_watchlist_tickers(),
+            get_active_alert_symbols(),
+        ]
+        seen: dict[str, None] = {}
+        for source in sources:
+            for ticker in source or []:
+                t = str(ticker or "").strip().upper()
+                if t:
+                    seen[t] = None
+        return list(seen)
+
+    def run_once(self) -> int:
+        """Refresh the whole hot set now. Returns the number of tickers updated."""
+        started = time.time()
+        tickers = self.hot_tickers()
+        updated = 0
+        for i in range(0, len(tickers), self.chunk_size):
+            if self._stop.is_set():
+                break
+            updated += update_global_cache_batch(tickers[i:i + self.chunk_size])
+        refresh_usd_thb_rate()
+
+        with self._lock:
+            self._cycles += 1
+            self._last_run_at = started
+            self._last_duration = time.time() - started
+            self._last_hot_count = len(tickers)
+            self._last_updated = updated
+        print(f"[Refresher] {updated}/{len(tickers)} hot tickers refreshed in {time.time() - started:.1f}s")
+        return updated
+
+    def run_cycle(self) -> int:
+        """``run_once`` unless another process sharing the cache already ran this interval."""
+        if not shared_cache.acquire(_CYCLE_LEASE, self.interval * 0.9):
+            with self._lock:
+                self._skipped += 1
+            return 0
+        return self.run_once()
+
+    def _loop(self, run_immediately: bool) -> None:
+        if not run_immediately and self._stop.wait(self.interval):
+            return
+        while not self._stop.is_set():
+            try:
+                self.run_cycle()
+            except Exception as e:
+                with self._lock:
+                    self._errors += 1
+                print(f"[Refresher] cycle error: {e}")
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self, run_immediately: bool = True) -> None:
+        if not self.enabled or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, args=(run_immediately,), name="price-refresher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "running": bool(self._thread and self._thread.is_alive()),
+                "interval": self.interval,
+                "chunk_size": self.chunk_size,
+                "cycles": self._cycles,
+                "skipped_cycles": self._skipped,
+                "errors": self._errors,
+                "last_run_at": self._last_run_at,
+                "last_duration": round(self._last_duration, 3),
+                "last_hot_count": self._last_hot_count,
+                "last_updated": self._last_updated,
+            }
+
+
+price_refresher = PriceRefresher(PRICE_REFRESH_INTERVAL, PRICE_REFRESH_CHUNK_SIZE, enabled=PRICE_REFRESH_ENABLED)
@@ -0,0 +1,69 @@
+"""Background revalidation for stale-while-revalidate getters.
+
+When a getter serves an expired-but-recent cache entry it hands the refresh to
+``Revalidator.submit`` and returns immediately. Each (tag, key) pair is refreshed
+at most once at a time: a ticker that is already being revalidated is skipped,
+so a burst of readers of the same stale price triggers a single upstream fetch.
+Refreshes run on a small, bounded thread pool so they never pile up threads.
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+
+class Revalidator:
+    """Deduplicated, bounded background refreshes keyed by (tag, key)."""
+
+    def __init__(self, name: str, max_workers: int = 4):
+        self.name = name
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"swr-{name}")
+        self._lock = threading.Lock()
+        self._pending: set[tuple[str, str]] = set()
+        self._scheduled = 0
+        self._skipped = 0
+        self._errors = 0
+
+    def submit(self, tag: str, keys: list[str], fn: Callable[[list[str]], object]) -> int:
+        """Schedule ``fn(keys_not_already_pending)`` in the background.
+
+        Returns the number of keys actually scheduled (0 when all were pending).
+        """
+        with self._lock:
+            todo = [k for k in dict.fromkeys(keys) if (tag, k) not in self._pending]
+            self._skipped += len(keys) - len(todo)
+            if not todo:
+                return 0
+            self._pending.update((tag, k) for k in todo)
+            self._scheduled += len(todo)
+
+        def _run():
+            try:
+                fn(todo)
+            except Exception as e:
+                with self._lock:
+                    self._errors += 1
+                print(f"⚠️ Revalidate ({self.name}/{tag}) failed: {e}")
+            finally:
+                with self._lock:
+                    self._pending.difference_update((tag, k) for k in todo)
+
+        try:
+            self._pool.submit(_run)
+        except RuntimeError:
+            # Interpreter shutting down — drop the refresh, callers already have a value.
+            with self._lock:
+                self._pending.difference_update((tag, k) for k in todo)
+            return 0
+        return len(todo)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "scheduled": self._scheduled,
+                "skipped_duplicates": self._skipped,
+                "errors": self._errors,
+                "pending": len(self._pending),
+            }
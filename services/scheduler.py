@@ -1,37 +1,93 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from apscheduler.schedulers.background import BackgroundScheduler
+from core.config import BRIEFING_WORKERS
 from core.database import db
 from services.news_fetcher import fetch_stock_news_summary
-from telegram.handlers import bot # ตรวจสอบให้แน่ใจว่า import bot มาจากไฟล์ที่ถูกต้อง
+from services.notifier import notifier
+
+# จำนวนหุ้นต่อคนที่ใส่ในสรุปเช้า (ไม่ให้ข้อความยาวเกินไป)
+BRIEFING_TICKERS_PER_USER = 3
+# ขนาด batch ของ user_id ต่อ query portfolios และจำนวนแถวต่อหน้า (PostgREST ตัดที่ 1000 แถว)
+_USER_CHUNK = 200
+_PAGE_ROWS = 1000
+
+
+def _briefing_holdings(user_ids: list) -> dict:
+    """{user_id: [ticker, ...]} หุ้น 3 ตัวแรกในพอร์ตของแต่ละคน — query ละ 200 คนแทนที่จะ query ทีละคน"""
+    holdings = {}
+    for i in range(0, len(user_ids), _USER_CHUNK):
+        chunk = user_ids[i:i + _USER_CHUNK]
+        offset = 0
+        while True:
+            res = (
+                db.table('portfolios').select('user_id, ticker').in_('user_id', chunk)
+                # ต้องเรียงลำดับให้คงที่ ไม่งั้นแต่ละหน้าของ .range() อาจข้ามหรือซ้ำแถวกัน
+                .order('user_id').order('ticker')
+                .range(offset, offset + _PAGE_ROWS - 1).execute()
+            )
+            rows = res.data or []
+            for row in rows:
+                tickers = holdings.setdefault(row['user_id'], [])
+                ticker = str(row['ticker']).upper()
+                if len(tickers) < BRIEFING_TICKERS_PER_USER and ticker not in tickers:
+                    tickers.append(ticker)
+            if len(rows) < _PAGE_ROWS:
+                break
+            offset += _PAGE_ROWS
+    return holdings
+
+
+def _summarize_all(tickers: list) -> dict:
+    """{ticker: summary} — ดึงข่าว + สรุป AI ครั้งเดียวต่อหุ้น ขนานกันแบบจำกัดจำนวน thread"""
+    if not tickers:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(BRIEFING_WORKERS, len(tickers)), thread_name_prefix="briefing") as pool:
+        return dict(zip(tickers, pool.map(fetch_stock_news_summary, tickers)))
+
 
 def send_morning_briefing():
-    """ฟังก์ชันดึงข่าวและส่งให้ผู้ใช้ระดับ PRO เท่านั้น"""
+    """ฟังก์ชันดึงข่าวและส่งให้ผู้ใช้ระดับ PRO เท่านั้น
+
+    ทำเป็น pipeline: รวมหุ้นที่ไม่ซ้ำกันของผู้ใช้ PRO ทุกคน → สรุปข่าวครั้งเดียวต่อหุ้น
+    (ขนานกัน BRIEFING_WORKERS thread) → ประกอบข้อความของแต่ละคนจากผลที่แชร์กัน
+    จำนวนครั้งที่เรียก Google News / Gemini จึงเท่ากับจำนวนหุ้นที่ไม่ซ้ำ ไม่ใช่ จำนวนคน × 3
+    """
     try:
+        started = time.time()
         # 🌟 1. ดึงผู้ใช้ที่เป็น PRO (และ Admin) เท่านั้น! ลบ VIP ออก
         users_res = db.table('users').select('id, telegram_id, username').in_('role', ['pro', 'admin']).execute()
-        
-        for user in users_res.data:
-            # ... (โค้ดดึงหุ้นและส่ง Telegram ทำงานตามปกติ)
-            user_id = user['id']
-            tid = user['telegram_id']
-            username = user['username']
-            
-            # 2. ดึงหุ้นในพอร์ต (เอาแค่ 3 ตัวแรก เพื่อไม่ให้บอทส่งข้อความยาวเกินไป)
-            port_res = db.table('portfolios').select('ticker').eq('user_id', user_id).limit(3).execute()
-            if not port_res.data:
+        users = [u for u in users_res.data or [] if u.get('telegram_id')]
+        if not users:
+            return
+
+        # 2. ดึงหุ้นในพอร์ตของทุกคนรวดเดียว แล้วรวมเป็นชุดหุ้นที่ไม่ซ้ำกัน
+        holdings = _briefing_holdings([u['id'] for u in users])
+        tickers = sorted({t for ts in holdings.values() for t in ts})
+
+        # 3. สรุปข่าวครั้งเดียวต่อหุ้น
+        summaries = _summarize_all(tickers)
+
+        # 4. ประกอบข้อความของแต่ละคน แล้วเข้าคิวส่ง Telegram ทีเดียว (services/notifier.py คุม rate limit และ retry ให้)
+        messages = []
+        for user in users:
+            user_tickers = holdings.get(user['id'])
+            if not user_tickers:
                 continue # ถ้าพอร์ตว่าง ให้ข้ามคนนี้ไป
-                
-            brief_msg = f"🌅 <b>อรุณสวัสดิ์คุณ {username}!</b>\nนี่คือสรุปข่าวสารหุ้นในพอร์ตของคุณประจำวันนี้ครับ:\n\n"
-            
-            for item in port_res.data:
-                ticker = item['ticker']
-                summary = fetch_stock_news_summary(ticker) # ดึงข่าวจาก Gemini
-                brief_msg += f"📊 <b>{ticker}</b>:\n{summary}\n\n"
-                
+
+            brief_msg = f"🌅 <b>อรุณสวัสดิ์คุณ {user['username']}!</b>\nนี่คือสรุปข่าวสารหุ้นในพอร์ตของคุณประจำวันนี้ครับ:\n\n"
+            for ticker in user_tickers:
+                brief_msg += f"📊 <b>{ticker}</b>:\n{summaries[ticker]}\n\n"
             brief_msg += "💡 <i>Apexify AI - ขอให้วันนี้เป็นวันที่กำไรปังๆ ครับ!</i>"
-            
-            # 3. ส่งข้อความหา User
-            bot.send_message(tid, brief_msg, parse_mode='HTML')
-            
+            messages.append((user['telegram_id'], brief_msg))
+
+        notifier.enqueue_many(messages, kind="briefing")
+        print(
+            f"✅ Morning Briefing: {len(messages)} ข้อความ, {len(tickers)} หุ้น "
+            f"({time.time() - started:.1f}s)"
+        )
+
     except Exception as e:
         print(f"⚠️ Scheduler Error: ไม่สามารถส่ง Morning Briefing ได้ - {e}")
 
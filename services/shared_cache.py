@@ -0,0 +1,435 @@
+"""Pluggable cache backend shared by every worker process on the host.
+
+start.sh / run_api.py run two uvicorn workers (plus the NiceGUI process), and
+each used to hold private copies of prices, the AI matchmaker pool, the S&P
+heatmap and so on — doubling yfinance/Gemini traffic and letting users see
+different data depending on which worker answered.
+
+Backends (``SHARED_CACHE_BACKEND``):
+
+- ``local``  — in-process dict. Default; right for a single process.
+- ``sqlite`` — one SQLite file in WAL mode, in a private directory:
+  ``$XDG_RUNTIME_DIR/apexify`` (tmpfs) when set, else ``.cache/shared`` under
+  the project. No server to run; every process of this user sees the same
+  entries.
+
+The directory is created 0700 and must be owned by this user, and the
+database and its -wal/-shm files must be too (symlinks are refused), so
+another local account cannot plant or edit entries. Values are stored as
+JSON, never pickled, so reading the cache cannot execute code.
+
+A value read back from the ``sqlite`` backend is what JSON can express, not
+necessarily what was stored: tuples and sets come back as lists, dict keys
+as strings, dates as ISO strings. Callers must accept that — e.g. the
+``(fg_value, fg_label)`` pair under MACRO_NS is unpacked, never compared to
+a tuple, and ``_get_seen`` in api/routers/ai.py rebuilds its set. The
+``local`` backend returns the original objects, so a caller that works on
+both must not rely on the difference.
+
+Both expose the same API: timestamped ``get``/``set`` of JSON-able values,
+named leases (``acquire``/``release``) and ``get_or_compute``, which uses a
+lease so exactly one process computes a missing key while the others wait for
+its result. Leases expire, so a crashed worker never blocks the rest for long.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import stat
+import threading
+import time
+from typing import Any, Callable, Hashable
+
+from core.config import BASE_DIR, SHARED_CACHE_BACKEND, SHARED_CACHE_MAX_AGE, SHARED_CACHE_PATH
+
+
+def _json_default(o: Any) -> Any:
+    # Sets, dates and numpy/pandas scalars; tuples already encode as lists
+    if isinstance(o, (set, frozenset)):
+        return sorted(o, key=str)
+    if hasattr(o, "isoformat"):
+        return o.isoformat()
+    if hasattr(o, "item"):
+        return o.item()
+    raise TypeError(f"{type(o).__name__} is not JSON serializable")
+
+
+def _encode(value: Any) -> str:
+    return json.dumps(value, default=_json_default, separators=(",", ":"))
+
+
+def _check_private(path: str, is_dir: bool) -> None:
+    """Refuse ``path`` unless it is a real file/dir owned by this user; strip group/other access."""
+    st = os.lstat(path)
+    kind_ok = stat.S_ISDIR(st.st_mode) if is_dir else stat.S_ISREG(st.st_mode)
+    if not kind_ok or st.st_uid != os.getuid():
+        raise PermissionError(f"{path} is not a {'directory' if is_dir else 'file'} owned by this user")
+    mode = 0o700 if is_dir else 0o600
+    if stat.S_IMODE(st.st_mode) & ~mode:
+        os.chmod(path, mode)
+
+
+class SharedCacheBackend:
+    """Base class — subclasses implement storage and leases; ``get_or_compute`` is shared."""
+
+    name = "base"
+    is_shared = False
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "sets": 0, "computes": 0, "waits": 0, "errors": 0}
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self._counters[name] += n
+
+    # ── storage ──
+    def get(self, key: str) -> tuple[Any, float] | None:
+        raise NotImplementedError
+
+    def get_many(self, keys: list[str]) -> dict[str, tuple[Any, float]]:
+        out = {}
+        for key in keys:
+            hit = self.get(key)
+            if hit is not None:
+                out[key] = hit
+        return out
+
+    def set(self, key: str, value: Any, ts: float | None = None) -> None:
+        raise NotImplementedError
+
+    def set_many(self, values: dict[str, Any], ts: float | None = None) -> None:
+        for key, value in values.items():
+            self.set(key, value, ts)
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    # ── leases ──
+    def acquire(self, name: str, ttl: float) -> bool:
+        """Take the named lease for ``ttl`` seconds. False if someone else holds it."""
+        raise NotImplementedError
+
+    def release(self, name: str) -> None:
+        raise NotImplementedError
+
+    def held(self, name: str) -> bool:
+        """True while any process holds an unexpired lease ``name``."""
+        raise NotImplementedError
+
+    # ── compute ──
+    def get_or_compute(
+        self,
+        key: str,
+        ttl: float,
+        fn: Callable[[], Any],
+        lease_ttl: float = 60.0,
+        wait_timeout: float = 30.0,
+    ) -> tuple[Any, float]:
+        """Return a value younger than ``ttl``; compute it in exactly one process if needed.
+
+        ``fn`` returning None means "nothing to cache" and is passed through uncached.
+        If the computing process does not publish within ``wait_timeout`` the
+        waiter computes on its own rather than failing the request.
+        """
+        hit = self.get(key)
+        if hit is not None and time.time() - hit[1] < ttl:
+            return hit
+
+        lease = f"compute:{key}"
+        deadline = time.time() + wait_timeout
+        while True:
+            if self.acquire(lease, lease_ttl):
+                try:
+                    hit = self.get(key)
+                    if hit is not None and time.time() - hit[1] < ttl:
+                        return hit
+                    self._count("computes")
+                    value = fn()
+                    now = time.time()
+                    if value is not None:
+                        self.set(key, value, now)
+                    return value, now
+                finally:
+                    self.release(lease)
+
+            self._count("waits")
+            while self.held(lease) and time.time() < deadline:
+                time.sleep(0.05)
+            hit = self.get(key)
+            if hit is not None and time.time() - hit[1] < ttl:
+                return hit
+            if time.time() >= deadline:
+                self._count("computes")
+                value = fn()
+                return value, time.time()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {"backend": self.name, "shared": self.is_shared, **self._counters}
+
+
+class LocalBackend(SharedCacheBackend):
+    """In-process backend: a dict and lease table guarded by one lock."""
+
+    name = "local"
+
+    def __init__(self, max_age: float = SHARED_CACHE_MAX_AGE):
+        super().__init__()
+        self.max_age = float(max_age)
+        self._lock = threading.Lock()
+        self._data: dict[str, tuple[Any, float]] = {}
+        self._leases: dict[str, tuple[Hashable, float]] = {}
+        self._sets_since_prune = 0
+
+    def get(self, key: str) -> tuple[Any, float] | None:
+        with self._lock:
+            hit = self._data.get(key)
+        self._count("hits" if hit is not None else "misses")
+        return hit
+
+    def set(self, key: str, value: Any, ts: float | None = None) -> None:
+        stamp = time.time() if ts is None else ts
+        with self._lock:
+            self._data[key] = (value, stamp)
+            self._sets_since_prune += 1
+            if self._sets_since_prune >= 1000:
+                self._sets_since_prune = 0
+                cutoff = time.time() - self.max_age
+                for k in [k for k, (_, t) in self._data.items() if t < cutoff]:
+                    del self._data[k]
+        self._count("sets")
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def acquire(self, name: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            current = self._leases.get(name)
+            if current is not None and current[1] > now:
+                return False
+            self._leases[name] = (threading.get_ident(), now + ttl)
+            return True
+
+    def release(self, name: str) -> None:
+        with self._lock:
+            current = self._leases.get(name)
+            if current is not None and current[0] == threading.get_ident():
+                del self._leases[name]
+
+    def held(self, name: str) -> bool:
+        with self._lock:
+            current = self._leases.get(name)
+            return current is not None and current[1] > time.time()
+
+
+class SqliteBackend(SharedCacheBackend):
+    """Host-wide backend on a SQLite file in a private directory. One connection per thread."""
+
+    name = "sqlite"
+    is_shared = True
+
+    def __init__(self, path: str, max_age: float = SHARED_CACHE_MAX_AGE):
+        super().__init__()
+        self.path = path
+        self.max_age = float(max_age)
+        self._local = threading.local()
+        self._sets_since_prune = 0
+        self._prepare_path()
+        conn = self._conn()
+        # kv.value is JSON text (schema "json1"; older pickled files are dropped below)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            row = conn.execute("SELECT value FROM meta WHERE name = 'format'").fetchone()
+            if row is None or row[0] != "json1":
+                conn.execute("DROP TABLE IF EXISTS kv")
+                conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('format', 'json1')")
+            conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, ts REAL NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_kv_ts ON kv (ts)")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        for suffix in ("-wal", "-shm"):
+            if os.path.lexists(path + suffix):
+                _check_private(path + suffix, is_dir=False)
+
+    def _prepare_path(self) -> None:
+        """Create the directory (0700) and database file (0600) ourselves, or refuse foreign ones."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        _check_private(directory, is_dir=True)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.lexists(self.path + suffix):
+                _check_private(self.path + suffix, is_dir=False)
+        # O_NOFOLLOW: a symlink swapped in after the check is not followed
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_NOFOLLOW, 0o600)
+        try:
+            if os.fstat(fd).st_uid != os.getuid():
+                raise PermissionError(f"{self.path} is not owned by this user")
+        finally:
+            os.close(fd)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # A forked child must not reuse the parent's connection.
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _lease_owner(self) -> str:
+        return f"{os.getpid()}:{threading.get_ident()}"
+
+    def get(self, key: str) -> tuple[Any, float] | None:
+        try:
+            row = self._conn().execute("SELECT value, ts FROM kv WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            self._error("get", e)
+            return None
+        if row is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        try:
+            return json.loads(row[0]), row[1]
+        except ValueError as e:
+            self._error("decode", e)
+            return None
+
+    def get_many(self, keys: list[str]) -> dict[str, tuple[Any, float]]:
+        out: dict[str, tuple[Any, float]] = {}
+        if not keys:
+            return out
+        try:
+            conn = self._conn()
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                for key, text, ts in conn.execute(f"SELECT key, value, ts FROM kv WHERE key IN ({marks})", chunk):
+                    out[key] = (json.loads(text), ts)
+        except (sqlite3.Error, ValueError) as e:
+            self._error("get_many", e)
+            return {}
+        self._count("hits", len(out))
+        self._count("misses", len(keys) - len(out))
+        return out
+
+    def set(self, key: str, value: Any, ts: float | None = None) -> None:
+        self.set_many({key: value}, ts)
+
+    def set_many(self, values: dict[str, Any], ts: float | None = None) -> None:
+        if not values:
+            return
+        stamp = time.time() if ts is None else ts
+        try:
+            rows = [(k, _encode(v), stamp) for k, v in values.items()]
+        except (TypeError, ValueError) as e:
+            self._error("encode", e)
+            return
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany(
+                    "INSERT INTO kv (key, value, ts) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, ts = excluded.ts "
+                    "WHERE excluded.ts >= kv.ts",
+                    rows,
+                )
+                self._sets_since_prune += len(rows)
+                if self._sets_since_prune >= 5000:
+                    self._sets_since_prune = 0
+                    conn.execute("DELETE FROM kv WHERE ts < ?", (time.time() - self.max_age,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            self._error("set", e)
+            return
+        self._count("sets", len(rows))
+
+    def delete(self, key: str) -> None:
+        try:
+            self._conn().execute("DELETE FROM kv WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            self._error("delete", e)
+
+    def acquire(self, name: str, ttl: float) -> bool:
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM leases WHERE name = ? AND expires <= ?", (name, now))
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO leases (name, owner, expires) VALUES (?, ?, ?)",
+                    (name, self._lease_owner(), now + ttl),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return cur.rowcount == 1
+        except sqlite3.Error as e:
+            # Fail open: computing twice beats failing the request.
+            self._error("acquire", e)
+            return True
+
+    def release(self, name: str) -> None:
+        try:
+            self._conn().execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, self._lease_owner()))
+        except sqlite3.Error as e:
+            self._error("release", e)
+
+    def held(self, name: str) -> bool:
+        try:
+            row = self._conn().execute(
+                "SELECT 1 FROM leases WHERE name = ? AND expires > ?", (name, time.time())
+            ).fetchone()
+            return row is not None
+        except sqlite3.Error as e:
+            self._error("held", e)
+            return False
+
+    def _error(self, op: str, e: Exception) -> None:
+        self._count("errors")
+        print(f"⚠️ Shared cache {op} failed: {e}")
+
+    def stats(self) -> dict:
+        out = super().stats()
+        out["path"] = self.path
+        try:
+            out["entries"] = self._conn().execute("SELECT COUNT(*) FROM kv").fetchone()[0]
+        except sqlite3.Error:
+            out["entries"] = None
+        return out
+
+
+def _default_sqlite_path() -> str:
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR", "")
+    base = os.path.join(runtime_dir, "apexify") if runtime_dir else str(BASE_DIR / ".cache" / "shared")
+    return os.path.join(base, "shared-cache.sqlite")
+
+
+def create_backend(kind: str, path: str = "") -> SharedCacheBackend:
+    kind = (kind or "local").strip().lower()
+    if kind == "sqlite":
+        try:
+            return SqliteBackend(path or _default_sqlite_path())
+        except (sqlite3.Error, OSError) as e:
+            print(f"⚠️ Shared cache unavailable ({e}) — falling back to in-process cache")
+    return LocalBackend()
+
+
+shared_cache = create_backend(SHARED_CACHE_BACKEND, SHARED_CACHE_PATH)
@@ -0,0 +1,84 @@
+"""Single-flight request coalescing for blocking upstream calls.
+
+Price getters run on worker threads (asyncio.to_thread / NiceGUI run.io_bound),
+so when a popular ticker expires many threads ask Yahoo for the same data at
+once. ``SingleFlight.do`` lets the first caller for a key run the fetch while
+every concurrent caller with the same key waits and receives the same result
+(or the same exception). Nothing is cached once the call completes — caching
+stays the job of services/market_cache.py.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Hashable
+
+
+class _Call:
+    __slots__ = ("event", "result", "error", "waiters")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+        self._requests = 0
+        self._executions = 0
+        self._coalesced = 0
+        self._errors = 0
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` once per in-flight ``key``; share the outcome.
+
+        Results are shared by reference, so callers must treat them as read-only.
+        """
+        with self._lock:
+            self._requests += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._executions += 1
+            else:
+                call.waiters += 1
+                self._coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "upstream_calls": self._executions,
+                "saved_calls": self._coalesced,
+                "errors": self._errors,
+                "in_flight": len(self._calls),
+                "saved_ratio": round(self._coalesced / self._requests, 4) if self._requests else 0.0,
+            }
@@ -1,23 +1,91 @@
 import yfinance as yf
+import numpy as np
 import pandas as pd
 from datetime import datetime, UTC
-from core.config import MARKET_INDICES
-import requests # 🌟 เพิ่มไว้บรรทัดบนสุดของไฟล์
+from core.config import (
+    HISTORY_CACHE_DIR,
+    HISTORY_CACHE_ENABLED,
+    INDICATOR_STATE_MAX_ENTRIES,
+    MARKET_INDICES,
+    MARKET_MAX_STALENESS,
+    OHLCV_STORE_MAX_SERIES,
+    PRICE_FETCH_CHUNK_SIZE,
+)
 import time
-# 🌟 พื้นที่จดจำราคาหุ้นส่วนกลาง (Global Cache)
-GLOBAL_PRICE_CACHE = {}
-GLOBAL_SPARKLINE_CACHE = {}
-PRICE_CACHE_TIME = {}
-SPARKLINE_CACHE_TIME = {}
-SPARKLINE_CACHE_TTL = 600  # 10 minutes
-PRICE_CACHE_TTL = 300  # 5 minutes — longer TTL reduces yfinance calls
-
-# Ticker info cache (name, div_yield, etc.) — longer TTL since it rarely changes
-_TICKER_INFO_CACHE: dict = {}
-_TICKER_INFO_TIME: dict = {}
-_TICKER_INFO_TTL = 600  # 10 minutes
-
-# Popular stocks to preload — prices & sparklines cached on startup + refreshed periodically
+from services.http_client import http_client
+from services.market_cache import (
+    DIVIDEND_NS,
+    FX_NS,
+    PRICE_NS,
+    SECTOR_ROTATION_NS,
+    SIMPLE_SECTOR_NS,
+    SPARKLINE_NS,
+    TICKER_INFO_NS,
+    TOP_MOVERS_NS,
+    market_cache,
+)
+from services import chart_payload, indicators
+from services.history_disk_cache import HistoryDiskCache
+from services.indicator_state import IndicatorTracker
+from services.ohlcv_store import OHLCVStore
+from services.price_fetcher import LAST_KNOWN_TIER, TieredPriceFetcher
+from services.revalidator import Revalidator
+from services.single_flight import SingleFlight
+# 🌟 พื้นที่จดจำราคาหุ้นส่วนกลาง — ทุก cache อยู่ใน market_cache (TTL + LRU ต่อ namespace)
+SPARKLINE_CACHE_TTL = market_cache.ttl(SPARKLINE_NS)  # 10 minutes
+PRICE_CACHE_TTL = market_cache.ttl(PRICE_NS)  # 5 minutes — longer TTL reduces yfinance calls
+
+
+# Concurrent identical downloads (same tickers/period/interval) share one upstream call
+yf_download_flight = SingleFlight("yf.download")
+
+
+def _download(tickers, **kwargs):
+    """yf.download routed through single-flight. The returned frame is shared — read only."""
+    key_tickers = tickers if isinstance(tickers, str) else tuple(sorted(tickers))
+    key = (key_tickers, tuple(sorted(kwargs.items())))
+    return yf_download_flight.do(key, yf.download, tickers, **kwargs)
+
+
+# Stale-while-revalidate: expired entries younger than MARKET_MAX_STALENESS are
+# served at once (marked stale) and refreshed here in the background.
+price_revalidator = Revalidator("market")
+
+
+# Every price getter resolves through intraday → daily → last-known tiers here.
+price_fetcher = TieredPriceFetcher(
+    _download,
+    last_known=lambda t: market_cache.peek(PRICE_NS, t),
+    chunk_size=PRICE_FETCH_CHUNK_SIZE,
+)
+
+
+# Columnar OHLCV history shared by charts, indicators, duel, DRIP and growth,
+# persisted to disk so restarts and sibling workers start warm.
+ohlcv_store = OHLCVStore(
+    _download,
+    max_series=OHLCV_STORE_MAX_SERIES,
+    disk=HistoryDiskCache(HISTORY_CACHE_DIR, enabled=HISTORY_CACHE_ENABLED),
+)
+
+# Running RSI/MACD/Bollinger state per chart so refreshes only compute new bars.
+indicator_tracker = IndicatorTracker(max_entries=INDICATOR_STATE_MAX_ENTRIES)
+
+
+def _as_of(ts: float | None) -> str | None:
+    return datetime.fromtimestamp(ts, UTC).isoformat() if ts else None
+
+
+def peek_cached_price(ticker: str, default: float = 0.0) -> float:
+    """Last known price for ticker regardless of age (no network)."""
+    return market_cache.peek(PRICE_NS, ticker, default)
+
+
+def peek_cached_sparkline(ticker: str) -> list[float]:
+    """Last known sparkline for ticker regardless of age (no network)."""
+    return market_cache.peek(SPARKLINE_NS, ticker, [])
+
+# Popular stocks kept warm by services/price_refresher.py (prices & sparklines)
 POPULAR_STOCKS = [
     # US Mega Cap
     "AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "META", "TSLA", "BRK-B", "TSM", "AVGO",
@@ -36,70 +104,13 @@ POPULAR_STOCKS = [
     "XLK", "XLV", "XLF", "XLE", "XLY", "XLP", "XLI", "XLU", "XLRE", "XLB", "XLC",
 ]
 
-_PRELOAD_DONE = False
+# Live USD→THB exchange rate (TTL 5 min, fallback rate until first fetch)
+_THB_DEFAULT_RATE = 34.5
 
-def preload_popular_stocks():
-    """Preload prices & sparklines for popular stocks in batch. Called on server startup."""
-    global _PRELOAD_DONE
-    if _PRELOAD_DONE:
-        return
-    print(f"[Preload] Loading {len(POPULAR_STOCKS)} popular stocks...")
+def refresh_usd_thb_rate() -> float | None:
+    """Force-fetch USD→THB and store it in the cache. Returns None on failure."""
     try:
-        # Batch download prices (daily) — single API call for all tickers
-        now = time.time()
-        data = yf.download(POPULAR_STOCKS, period="5d", interval="1d", progress=False, ignore_tz=True)
-        if not data.empty:
-            for t in POPULAR_STOCKS:
-                try:
-                    if isinstance(data.columns, pd.MultiIndex):
-                        series = data['Close'][t].dropna()
-                    else:
-                        series = data['Close'].dropna()
-                    if len(series) > 0:
-                        price = float(series.iloc[-1])
-                        if price > 0:
-                            GLOBAL_PRICE_CACHE[t] = price
-                            PRICE_CACHE_TIME[t] = now
-                except Exception:
-                    pass
-        print(f"[Preload] Prices loaded: {len(GLOBAL_PRICE_CACHE)} tickers")
-    except Exception as e:
-        print(f"[Preload] Price load error: {e}")
-
-    try:
-        # Batch download sparklines (15min) — single API call
-        spark_data = yf.download(POPULAR_STOCKS, period="5d", interval="15m", progress=False, ignore_tz=True)
-        if not spark_data.empty:
-            for t in POPULAR_STOCKS:
-                try:
-                    if isinstance(spark_data.columns, pd.MultiIndex):
-                        series = spark_data['Close'][t].dropna()
-                    else:
-                        series = spark_data['Close'].dropna()
-                    if len(series) > 0:
-                        closes = [float(c) for c in series.tolist()][-40:]
-                        GLOBAL_SPARKLINE_CACHE[t] = closes
-                        SPARKLINE_CACHE_TIME[t] = now
-                except Exception:
-                    pass
-        print(f"[Preload] Sparklines loaded: {len(GLOBAL_SPARKLINE_CACHE)} tickers")
-    except Exception as e:
-        print(f"[Preload] Sparkline load error: {e}")
-
-    _PRELOAD_DONE = True
-    print(f"[Preload] Done!")
-
-
-# Live USD→THB exchange rate (TTL 5 min)
-_THB_RATE_CACHE: dict = {'rate': 34.5, 'ts': 0.0}
-
-def get_usd_thb_rate() -> float:
-    """ดึงอัตราแลกเปลี่ยน USD→THB แบบเรียลไทม์ผ่าน yfinance (cache 5 นาที)"""
-    now = time.time()
-    if now - _THB_RATE_CACHE['ts'] < 300:
-        return _THB_RATE_CACHE['rate']
-    try:
-        data = yf.download('THB=X', period='5d', interval='1d', progress=False)
+        data = _download('THB=X', period='5d', interval='1d', progress=False)
         if not data.empty:
             close = data['Close']
             if isinstance(close, pd.DataFrame):
@@ -107,39 +118,62 @@ def get_usd_thb_rate() -> float:
             series = close.dropna()
             price = float(series.iloc[-1]) if not series.empty else 0.0
             if price > 0:
-                _THB_RATE_CACHE['rate'] = price
-                _THB_RATE_CACHE['ts'] = now
+                market_cache.set(FX_NS, 'USDTHB', price)
+                return price
     except Exception:
         pass
-    return _THB_RATE_CACHE['rate']
-def update_global_cache_batch(tickers: list):
-    """🌟 อัปเดตราคาแบบ Intraday (ทุก 5-15 นาที) เพื่อกราฟ Sparkline ที่ขยับจริง"""
-    if not tickers: return
+    return None
+
+
+def get_usd_thb_rate() -> float:
+    """ดึงอัตราแลกเปลี่ยน USD→THB แบบเรียลไทม์ผ่าน yfinance (cache 5 นาที)"""
+    cached = market_cache.get(FX_NS, 'USDTHB')
+    if cached is not None:
+        return cached
+    rate = refresh_usd_thb_rate()
+    if rate:
+        return rate
+    return market_cache.peek(FX_NS, 'USDTHB', _THB_DEFAULT_RATE)
+
+
+def update_global_cache_batch(tickers: list) -> int:
+    """🌟 อัปเดตราคาแบบ Intraday (ทุก 5-15 นาที) เพื่อกราฟ Sparkline ที่ขยับจริง
+
+    One 5d/15m download refreshes both the price and the sparkline entry of every
+    ticker. Returns how many tickers were updated.
+    """
+    if not tickers: return 0
+    prices: dict[str, float] = {}
+    sparklines: dict[str, list[float]] = {}
     try:
         # ดึง 5 วันย้อนหลัง กราฟแท่งละ 15 นาที (ทำให้ Sparkline ขยับระหว่างวัน)
-        data = yf.download(tickers, period="5d", interval="15m", progress=False, ignore_tz=True)
-        if data.empty: return
+        now = time.time()
+        data = _download(tickers, period="5d", interval="15m", progress=False, ignore_tz=True)
+        if data.empty: return 0
         for ticker in tickers:
             try:
-                if len(tickers) > 1 and isinstance(data.columns, pd.MultiIndex):
+                if isinstance(data.columns, pd.MultiIndex):
                     series = data['Close'][ticker].dropna()
                 else:
                     series = data['Close'].dropna()
                     
                 if len(series) > 0:
                     closes = [float(c) for c in series.tolist()]
-                    GLOBAL_PRICE_CACHE[ticker] = closes[-1] 
-                    SPARKLINE_CACHE_TIME[ticker] = time.time()
-                    GLOBAL_SPARKLINE_CACHE[ticker] = closes[-40:] # เอาแค่ 40 แท่งล่าสุดให้เส้นสวยๆ
+                    prices[ticker] = closes[-1]
+                    sparklines[ticker] = closes[-40:] # เอาแค่ 40 แท่งล่าสุดให้เส้นสวยๆ
             except Exception: pass
+        # One write per namespace (also one shared-cache transaction when workers share a backend)
+        market_cache.set_many(PRICE_NS, prices, ts=now)
+        market_cache.set_many(SPARKLINE_NS, sparklines, ts=now)
     except Exception as e:
         print(f"⚠️ Global Cache Update Error: {e}")
+    return len(prices)
 
 def get_market_summary():
     market_data = []
     try:
         tickers = list(MARKET_INDICES.keys())
-        data = yf.download(tickers, period="5d", interval="1d", progress=False, ignore_tz=True)
+        data = _download(tickers, period="5d", interval="1d", progress=False, ignore_tz=True)
         for symbol, name in MARKET_INDICES.items():
             try:
                 if isinstance(data.columns, pd.MultiIndex):
@@ -154,90 +188,40 @@ def get_market_summary():
     except: pass
     return market_data
 
-def get_live_price(ticker: str) -> float:
-    now = time.time()
-    
-    # Use cache if recent enough
-    if ticker in GLOBAL_PRICE_CACHE and (now - PRICE_CACHE_TIME.get(ticker, 0)) < PRICE_CACHE_TTL:
-        return GLOBAL_PRICE_CACHE[ticker]
-        
-    def _extract_price(data, ticker):
-        if data.empty:
-            return None
-        try:
-            if isinstance(data.columns, pd.MultiIndex):
-                series = data['Close'][ticker].dropna()
-            else:
-                series = data['Close'].dropna()
-            if series.empty:
-                return None
-            return float(series.iloc[-1])
-        except Exception:
-            return None
+def _fetch_live_price(ticker: str) -> float | None:
+    """Fetch one price from Yahoo (tiered) and cache it. None unless a network tier served it."""
+    hit = _fetch_prices_tiered([ticker]).get(ticker)
+    if hit is None or hit[1] == LAST_KNOWN_TIER:
+        return None
+    return hit[0]
 
-    try:
-        # ลอง 1-minute ก่อน (เร็วและสดที่สุด)
-        data = yf.download(ticker, period="1d", interval="1m", progress=False)
-        price = _extract_price(data, ticker)
 
-        # fallback → daily ถ้า 1-minute ไม่มีข้อมูล (เช่น off-market hours)
-        if price is None or price <= 0:
-            data = yf.download(ticker, period="5d", interval="1d", progress=False)
-            price = _extract_price(data, ticker)
+def get_live_quote(ticker: str) -> dict:
+    """Price with freshness metadata: ``{"price", "as_of", "stale"}``.
 
-        if price is None or price <= 0:
-            return GLOBAL_PRICE_CACHE.get(ticker, 0.0)
+    Fresh cache → returned as is. Expired but younger than MARKET_MAX_STALENESS →
+    returned immediately with ``stale=True`` while one background refresh runs.
+    Older or absent → blocks on Yahoo, falling back to the last known price.
+    """
+    hit = market_cache.get_with_age(PRICE_NS, ticker, MARKET_MAX_STALENESS)
+    if hit is not None:
+        price, ts, stale = hit
+        if stale:
+            price_revalidator.submit(PRICE_NS, [ticker], _revalidate_prices)
+        return {"price": price, "as_of": _as_of(ts), "stale": stale}
 
-        GLOBAL_PRICE_CACHE[ticker] = price
-        PRICE_CACHE_TIME[ticker] = now
-        return price
-    except:
-        return GLOBAL_PRICE_CACHE.get(ticker, 0.0)
+    price = _fetch_live_price(ticker)
+    if price is not None:
+        return {"price": price, "as_of": _as_of(time.time()), "stale": False}
+    last = market_cache.entry(PRICE_NS, ticker)
+    if last is not None:
+        return {"price": last[0], "as_of": _as_of(last[1]), "stale": True}
+    return {"price": 0.0, "as_of": None, "stale": True}
 
-def batch_get_prices(tickers: list[str]) -> dict[str, float]:
-    """Fetch prices for multiple tickers in a single yf.download call. Cache-first."""
-    now = time.time()
-    result: dict[str, float] = {}
-    need_fetch: list[str] = []
-
-    for t in tickers:
-        if t in GLOBAL_PRICE_CACHE and (now - PRICE_CACHE_TIME.get(t, 0)) < PRICE_CACHE_TTL:
-            result[t] = GLOBAL_PRICE_CACHE[t]
-        else:
-            need_fetch.append(t)
-
-    if not need_fetch:
-        return result
-
-    try:
-        data = yf.download(need_fetch, period="5d", interval="1d", progress=False, auto_adjust=True)
-        if not data.empty:
-            for t in need_fetch:
-                try:
-                    if isinstance(data.columns, pd.MultiIndex):
-                        series = data["Close"][t].dropna()
-                    else:
-                        series = data["Close"].dropna()
-                    if not series.empty:
-                        price = float(series.iloc[-1])
-                        if price > 0:
-                            GLOBAL_PRICE_CACHE[t] = price
-                            PRICE_CACHE_TIME[t] = now
-                            result[t] = price
-                            continue
-                except Exception:
-                    pass
-                result[t] = GLOBAL_PRICE_CACHE.get(t, 0.0)
-    except Exception:
-        for t in need_fetch:
-            result[t] = GLOBAL_PRICE_CACHE.get(t, 0.0)
-
-    return result
 
+def get_live_price(ticker: str) -> float:
+    return get_live_quote(ticker)["price"]
 
-_TOP_MOVERS_CACHE: list = []
-_TOP_MOVERS_TIME: float = 0
-_TOP_MOVERS_TTL = 300  # 5 minutes
 
 _TOP_MOVERS_WATCH = [
     "AAPL", "MSFT", "NVDA", "GOOGL", "AMZN", "META", "TSLA", "AMD", "NFLX", "PYPL",
@@ -248,21 +232,22 @@ _TOP_MOVERS_WATCH = [
 
 def get_top_movers(n: int = 3) -> list[dict]:
     """Return top N gainers and top N losers by daily % change. Cached 5 min."""
-    global _TOP_MOVERS_CACHE, _TOP_MOVERS_TIME
-    now = time.time()
-    if _TOP_MOVERS_CACHE and (now - _TOP_MOVERS_TIME) < _TOP_MOVERS_TTL:
-        return _TOP_MOVERS_CACHE
+    cache_key = str(n)
+    cached = market_cache.get(TOP_MOVERS_NS, cache_key)
+    if cached:
+        return cached
+    last_known = market_cache.peek(TOP_MOVERS_NS, cache_key, [])
 
     try:
-        data = yf.download(_TOP_MOVERS_WATCH, period="5d", interval="1d", progress=False, auto_adjust=True)
+        data = _download(_TOP_MOVERS_WATCH, period="5d", interval="1d", progress=False, auto_adjust=True)
         if data.empty:
-            return _TOP_MOVERS_CACHE
+            return last_known
         close = data["Close"]
         if isinstance(close, pd.DataFrame):
             prev = close.iloc[-2] if len(close) >= 2 else close.iloc[-1]
             curr = close.iloc[-1]
         else:
-            return _TOP_MOVERS_CACHE
+            return last_known
 
         changes = []
         for t in _TOP_MOVERS_WATCH:
@@ -277,26 +262,20 @@ def get_top_movers(n: int = 3) -> list[dict]:
 
         changes.sort(key=lambda x: x["change_pct"], reverse=True)
         result = changes[:n] + changes[-n:]  # top N gainers + top N losers
-        _TOP_MOVERS_CACHE = result
-        _TOP_MOVERS_TIME = now
+        market_cache.set(TOP_MOVERS_NS, cache_key, result)
         return result
     except Exception:
-        return _TOP_MOVERS_CACHE
+        return last_known
 
 
-def get_sparkline_data(ticker: str, days: int = 7):
+def _fetch_sparkline(ticker: str, days: int = 7) -> list[float]:
+    """Fetch one sparkline from Yahoo (15m, then daily) and cache it. [] on failure."""
     now = time.time()
-    closes = GLOBAL_SPARKLINE_CACHE.get(ticker, [])
-    last_update = SPARKLINE_CACHE_TIME.get(ticker, 0)
-
-    # Reuse cache briefly to reduce API pressure.
-    if closes and (now - last_update) < SPARKLINE_CACHE_TTL:
-        is_up = closes[-1] >= closes[0] if len(closes) > 1 else True
-        return closes, is_up
+    closes = []
 
     # Prefer intraday candles so sparkline can move during the day.
     try:
-        intraday = yf.download(ticker, period="5d", interval="15m", progress=False, ignore_tz=True)
+        intraday = _download(ticker, period="5d", interval="15m", progress=False, ignore_tz=True)
         if not intraday.empty:
             if isinstance(intraday.columns, pd.MultiIndex):
                 series = intraday['Close'][ticker].dropna()
@@ -304,118 +283,118 @@ def get_sparkline_data(ticker: str, days: int = 7):
                 series = intraday['Close'].dropna()
             if len(series) > 0:
                 closes = [float(c) for c in series.tolist()][-40:]
-                GLOBAL_SPARKLINE_CACHE[ticker] = closes
-                SPARKLINE_CACHE_TIME[ticker] = now
+                market_cache.set(SPARKLINE_NS, ticker, closes, ts=now)
     except:
         pass
 
     # Fallback to daily candles if intraday is unavailable.
     if not closes:
         try:
-            data = yf.download(ticker, period=f"{days}d", interval="1d", progress=False)
+            data = _download(ticker, period=f"{days}d", interval="1d", progress=False)
             if not data.empty:
                 if isinstance(data.columns, pd.MultiIndex):
                     closes = data['Close'][ticker].dropna().tolist()
                 else:
                     closes = data['Close'].dropna().tolist()
                 closes = [float(c) for c in closes]
-                GLOBAL_SPARKLINE_CACHE[ticker] = closes
-                SPARKLINE_CACHE_TIME[ticker] = now
+                if closes:
+                    market_cache.set(SPARKLINE_NS, ticker, closes, ts=now)
         except:
-            return [], True
+            return []
+    return closes
 
-    if not closes:
-        return [], True
+
+def get_sparkline_quote(ticker: str, days: int = 7) -> dict:
+    """Sparkline with freshness metadata: ``{"closes", "is_up", "as_of", "stale"}``.
+
+    Same stale-while-revalidate policy as ``get_live_quote``.
+    """
+    hit = market_cache.get_with_age(SPARKLINE_NS, ticker, MARKET_MAX_STALENESS)
+    if hit is not None and hit[0]:
+        closes, ts, stale = hit
+        if stale:
+            price_revalidator.submit(SPARKLINE_NS, [ticker], _revalidate_sparklines)
+    else:
+        closes = _fetch_sparkline(ticker, days)
+        ts, stale = time.time(), False
+        if not closes:
+            last = market_cache.entry(SPARKLINE_NS, ticker)
+            closes, ts = last if last is not None else ([], None)
+            stale = True
     is_up = closes[-1] >= closes[0] if len(closes) > 1 else True
-    return closes, is_up
+    return {"closes": closes, "is_up": is_up, "as_of": _as_of(ts), "stale": stale}
 
 
-def batch_get_prices(tickers: list[str]) -> dict[str, float]:
-    """Fetch prices for multiple tickers in a single yf.download() call."""
-    if not tickers:
-        return {}
-    now = time.time()
-    result = {}
-    need_fetch = []
+def get_sparkline_data(ticker: str, days: int = 7):
+    quote = get_sparkline_quote(ticker, days)
+    return quote["closes"], quote["is_up"]
 
-    for t in tickers:
-        if t in GLOBAL_PRICE_CACHE and (now - PRICE_CACHE_TIME.get(t, 0)) < PRICE_CACHE_TTL:
-            result[t] = GLOBAL_PRICE_CACHE[t]
-        else:
-            need_fetch.append(t)
 
-    if need_fetch:
-        fetched = set()
-        # Try intraday 1-minute first for most accurate live price
-        try:
-            data = yf.download(need_fetch, period="1d", interval="1m", progress=False, ignore_tz=True)
-            if not data.empty:
-                for t in need_fetch:
-                    try:
-                        if len(need_fetch) > 1 and isinstance(data.columns, pd.MultiIndex):
-                            series = data['Close'][t].dropna()
-                        else:
-                            series = data['Close'].dropna()
-                        if len(series) > 0:
-                            price = float(series.iloc[-1])
-                            if price > 0:
-                                GLOBAL_PRICE_CACHE[t] = price
-                                PRICE_CACHE_TIME[t] = now
-                                result[t] = price
-                                fetched.add(t)
-                    except Exception:
-                        pass
-        except Exception:
-            pass
+def batch_get_prices(tickers: list[str]) -> dict[str, float]:
+    """Fetch prices for multiple tickers in a single yf.download() call.
 
-        # Fallback to daily for any tickers not fetched (e.g. off-market hours)
-        still_need = [t for t in need_fetch if t not in fetched]
-        if still_need:
-            try:
-                data = yf.download(still_need, period="5d", interval="1d", progress=False, ignore_tz=True)
-                if not data.empty:
-                    for t in still_need:
-                        try:
-                            if len(still_need) > 1 and isinstance(data.columns, pd.MultiIndex):
-                                series = data['Close'][t].dropna()
-                            else:
-                                series = data['Close'].dropna()
-                            if len(series) > 0:
-                                price = float(series.iloc[-1])
-                                if price > 0:
-                                    GLOBAL_PRICE_CACHE[t] = price
-                                    PRICE_CACHE_TIME[t] = now
-                                    result[t] = price
-                        except Exception:
-                            result[t] = GLOBAL_PRICE_CACHE.get(t, 0.0)
-            except Exception:
-                pass
+    Stale-while-revalidate: expired prices younger than MARKET_MAX_STALENESS are
+    returned as is and refreshed in the background; only older/absent ones block.
+    """
+    if not tickers:
+        return {}
+    fresh, stale, need_fetch = market_cache.get_many_with_age(PRICE_NS, tickers, MARKET_MAX_STALENESS)
+    if stale:
+        price_revalidator.submit(PRICE_NS, list(stale), _revalidate_prices)
+    result = {**fresh, **stale}
+    result.update(_fetch_prices(need_fetch))
 
     # Fill missing
     for t in tickers:
         if t not in result:
-            result[t] = GLOBAL_PRICE_CACHE.get(t, 0.0)
+            result[t] = market_cache.peek(PRICE_NS, t, 0.0)
     return result
 
 
-def batch_get_sparklines(tickers: list[str]) -> dict[str, list[float]]:
-    """Fetch sparkline data for multiple tickers in a single call."""
+def _fetch_prices_tiered(tickers: list[str]) -> dict[str, tuple[float, str]]:
+    """Run the tiered engine and cache every network-served price. ``{ticker: (price, tier)}``."""
     if not tickers:
         return {}
     now = time.time()
-    result = {}
-    need_fetch = []
+    served = price_fetcher.fetch(tickers)
+    fetched = {t: price for t, (price, tier) in served.items() if tier != LAST_KNOWN_TIER}
+    if fetched:
+        market_cache.set_many(PRICE_NS, fetched, ts=now)
+    return served
+
+
+def _fetch_prices(need_fetch: list[str]) -> dict[str, float]:
+    """Prices for ``need_fetch`` via the tiered engine (last-known values included)."""
+    return {t: price for t, (price, _tier) in _fetch_prices_tiered(need_fetch).items()}
+
+
+def _revalidate_prices(tickers: list[str]) -> None:
+    _fetch_prices_tiered(tickers)
+
+
+def batch_get_sparklines(tickers: list[str]) -> dict[str, list[float]]:
+    """Fetch sparkline data for multiple tickers in a single call (stale-while-revalidate)."""
+    if not tickers:
+        return {}
+    fresh, stale, need_fetch = market_cache.get_many_with_age(SPARKLINE_NS, tickers, MARKET_MAX_STALENESS)
+    if stale:
+        price_revalidator.submit(SPARKLINE_NS, list(stale), _revalidate_sparklines)
+    result = {**fresh, **stale}
+    result.update(_fetch_sparklines(need_fetch))
 
     for t in tickers:
-        cached = GLOBAL_SPARKLINE_CACHE.get(t, [])
-        if cached and (now - SPARKLINE_CACHE_TIME.get(t, 0)) < SPARKLINE_CACHE_TTL:
-            result[t] = cached
-        else:
-            need_fetch.append(t)
+        if t not in result:
+            result[t] = market_cache.peek(SPARKLINE_NS, t, [])
+    return result
+
 
+def _fetch_sparklines(need_fetch: list[str]) -> dict[str, list[float]]:
+    """Download 5d/15m sparklines for ``need_fetch`` and cache them."""
+    now = time.time()
+    result: dict[str, list[float]] = {}
     if need_fetch:
         try:
-            data = yf.download(need_fetch, period="5d", interval="15m", progress=False, ignore_tz=True)
+            data = _download(need_fetch, period="5d", interval="15m", progress=False, ignore_tz=True)
             if not data.empty:
                 for t in need_fetch:
                     try:
@@ -425,25 +404,27 @@ def batch_get_sparklines(tickers: list[str]) -> dict[str, list[float]]:
                             series = data['Close'].dropna()
                         if len(series) > 0:
                             closes = [float(c) for c in series.tolist()][-40:]
-                            GLOBAL_SPARKLINE_CACHE[t] = closes
-                            SPARKLINE_CACHE_TIME[t] = now
+                            market_cache.set(SPARKLINE_NS, t, closes, ts=now)
                             result[t] = closes
                     except Exception:
                         pass
         except Exception:
             pass
-
-    for t in tickers:
-        if t not in result:
-            result[t] = GLOBAL_SPARKLINE_CACHE.get(t, [])
     return result
 
 
+def _revalidate_sparklines(tickers: list[str]) -> None:
+    if len(tickers) == 1:
+        _fetch_sparkline(tickers[0])
+    else:
+        _fetch_sparklines(tickers)
+
+
 def get_ticker_info(ticker: str) -> dict:
     """Get ticker info (name, div_yield, day_high, etc.) with caching."""
-    now = time.time()
-    if ticker in _TICKER_INFO_CACHE and (now - _TICKER_INFO_TIME.get(ticker, 0)) < _TICKER_INFO_TTL:
-        return _TICKER_INFO_CACHE[ticker]
+    cached = market_cache.get(TICKER_INFO_NS, ticker)
+    if cached is not None:
+        return cached
     info = {}
     try:
         tk = yf.Ticker(ticker)
@@ -466,26 +447,36 @@ def get_ticker_info(ticker: str) -> dict:
         }
     except Exception:
         info = {"name": ticker, "div_yield": 0, "day_high": 0, "day_low": 0, "volume": 0, "market_cap": 0}
-    _TICKER_INFO_CACHE[ticker] = info
-    _TICKER_INFO_TIME[ticker] = now
+    market_cache.set(TICKER_INFO_NS, ticker, info)
     return info
 
 
-def get_candlestick_data(ticker: str, period: str = "3mo"):
+def get_candlestick_data(ticker: str, period: str = "3mo", interval: str = "1d"):
     try:
-        data = yf.download(ticker, period=period, interval="1d", progress=False)
-        if data.empty: return []
-        if isinstance(data.columns, pd.MultiIndex):
-            data = data.xs(ticker, level=1, axis=1)
-        ohlc = []
-        for index, row in data.iterrows():
-            ohlc.append({"date": index.strftime('%Y-%m-%d'), "open": float(row['Open']), "high": float(row['High']), "low": float(row['Low']), "close": float(row['Close']), "volume": int(row['Volume'])})
-        return ohlc
+        bars = ohlcv_store.get(ticker, interval, period)
+        if bars.empty: return []
+        return chart_payload.to_rows(*chart_payload.build_columns(bars))["candles"]
     except: return []
 
+
+def get_chart_series(ticker: str, period: str, interval: str, specs: list[str]):
+    """(bars, {spec: values}) for a chart — indicators reuse the tracker's running state."""
+    bars = ohlcv_store.get(ticker, interval, period)
+    if bars.empty or not specs:
+        return bars, {}
+    return bars, indicator_tracker.compute((ticker.upper(), interval, period), bars, specs)
+
+
+def get_close_history(ticker: str, period: str = "30d", interval: str = "1d") -> list[float]:
+    """Closing prices from the shared OHLCV store (e.g. macro HUD sparklines)."""
+    try:
+        return ohlcv_store.get(ticker, interval, period).close.tolist()
+    except Exception:
+        return []
+
 def get_sp500_ytd():
     try:
-        data = yf.download('VOO', period="ytd", interval="1mo", progress=False)
+        data = _download('VOO', period="ytd", interval="1mo", progress=False)
         if data.empty: return ['Jan'], [0]
         if isinstance(data.columns, pd.MultiIndex):
             closes = data['Close']['VOO'].dropna().tolist()
@@ -518,20 +509,9 @@ def get_stock_duel_data(ticker_a: str, ticker_b: str, years: int = 10, initial_c
         period = 'max' if years >= 50 else f'{years}y'
         interval = '1mo'
 
-        data_a = yf.download(ticker_a, period=period, interval=interval, progress=False, auto_adjust=True)
-        data_b = yf.download(ticker_b, period=period, interval=interval, progress=False, auto_adjust=True)
-        if data_a.empty or data_b.empty:
-            return None
-
-        close_a = data_a['Close']
-        close_b = data_b['Close']
-        if isinstance(close_a, pd.DataFrame):
-            close_a = close_a.iloc[:, 0]
-        if isinstance(close_b, pd.DataFrame):
-            close_b = close_b.iloc[:, 0]
-
-        close_a = close_a.dropna()
-        close_b = close_b.dropna()
+        history = ohlcv_store.get_many([ticker_a, ticker_b], interval, period)
+        close_a = history[ticker_a].series()
+        close_b = history[ticker_b].series()
         if close_a.empty or close_b.empty:
             return None
 
@@ -594,19 +574,10 @@ def get_stock_duel_data(ticker_a: str, ticker_b: str, years: int = 10, initial_c
     except Exception:
         return None
 
-_DIV_CACHE: dict = {}
-_DIV_CACHE_TIME: dict = {}
-_DIV_CACHE_TTL = 600  # 10 minutes
-
 def get_real_dividend_data(tickers: list):
     """Fetch dividend data with caching."""
-    dividend_items = {}
-    now = time.time()
-    for ticker in tickers:
-        # Check cache
-        if ticker in _DIV_CACHE and (now - _DIV_CACHE_TIME.get(ticker, 0)) < _DIV_CACHE_TTL:
-            dividend_items[ticker] = _DIV_CACHE[ticker]
-            continue
+    dividend_items, need_fetch = market_cache.get_many(DIVIDEND_NS, list(tickers))
+    for ticker in need_fetch:
         try:
             t = yf.Ticker(ticker)
             info = t.info or {}
@@ -618,28 +589,13 @@ def get_real_dividend_data(tickers: list):
                 'ex_date': ex_date,
                 'amount_per_share': info.get('dividendRate', 0) or 0
             }
-            _DIV_CACHE[ticker] = item
-            _DIV_CACHE_TIME[ticker] = now
+            market_cache.set(DIVIDEND_NS, ticker, item)
             dividend_items[ticker] = item
         except Exception as e:
             print(f"Dividend API Error for {ticker}: {e}")
             dividend_items[ticker] = {'yield': 0, 'ex_date': 'N/A', 'amount_per_share': 0}
     return dividend_items
 
-def _extract_close_series(download_df, ticker: str):
-    if download_df is None or download_df.empty:
-        return pd.Series(dtype=float)
-    try:
-        close_data = download_df['Close']
-        if isinstance(close_data, pd.DataFrame):
-            if ticker in close_data.columns:
-                return close_data[ticker].dropna()
-            return close_data.iloc[:, 0].dropna()
-        return close_data.dropna()
-    except Exception:
-        return pd.Series(dtype=float)
-
-
 def _compute_return_metrics(values: pd.Series):
     if values is None or values.empty or len(values) < 2:
         return {'return_pct': 0.0, 'max_drawdown_pct': 0.0, 'volatility_annual_pct': 0.0}
@@ -687,8 +643,10 @@ def get_portfolio_historical_growth(portfolio_items: list, period: str = "1y", i
         }
 
     try:
-        data = yf.download(tickers, period=period, interval=interval, progress=False, auto_adjust=True)
-        if data.empty:
+        bench_symbol = str(benchmark).upper()
+        history = ohlcv_store.get_many(list(dict.fromkeys(tickers + [bench_symbol])), interval, period)
+        closes = {t: history[t].series() for t in tickers if not history[t].empty}
+        if not closes:
             return {
                 'labels': [],
                 'portfolio_values': [],
@@ -699,19 +657,19 @@ def get_portfolio_historical_growth(portfolio_items: list, period: str = "1y", i
                 'updated_at': datetime.now(UTC).isoformat(),
             }
 
+        data = pd.concat(closes, axis=1)
         portfolio_df = pd.DataFrame(index=data.index)
         portfolio_df['portfolio_value'] = 0.0
 
         for item in portfolio_items:
             t = str(item.get('ticker', '')).strip().upper()
-            if not t:
+            if not t or t not in data.columns:
                 continue
             shares = float(item.get('shares', 0) or 0)
-            close_series = _extract_close_series(data, t).reindex(data.index).ffill().fillna(0.0)
+            close_series = data[t].ffill().fillna(0.0)
             portfolio_df['portfolio_value'] += close_series * shares
 
-        benchmark_df = yf.download(str(benchmark).upper(), period=period, interval=interval, progress=False, auto_adjust=True)
-        bench_close = _extract_close_series(benchmark_df, str(benchmark).upper()).reindex(portfolio_df.index).ffill()
+        bench_close = history[bench_symbol].series().reindex(portfolio_df.index).ffill()
 
         merged = pd.DataFrame(index=portfolio_df.index)
         merged['portfolio_value'] = portfolio_df['portfolio_value']
@@ -793,93 +751,44 @@ def calculate_rsi_from_prices(prices, period=14):
 def get_support_resistance(ticker: str):
     """คำนวณหาแนวรับ-แนวต้านอัตโนมัติจากข้อมูล 3 เดือนย้อนหลัง"""
     try:
-        ohlc = get_candlestick_data(ticker, period="3mo")
-        if not ohlc: return 0, 0
+        bars = ohlcv_store.get(ticker, "1d", "3mo")
+        if bars.empty: return 0, 0
         
-        lows = sorted([d['low'] for d in ohlc])
-        highs = sorted([d['high'] for d in ohlc], reverse=True)
+        lows = np.sort(bars.low)
+        highs = np.sort(bars.high)[::-1]
         
         # เฉลี่ยจุดต่ำสุด 5 จุด และสูงสุด 5 จุด เพื่อความแม่นยำ
-        support = sum(lows[:5]) / 5 if len(lows) >= 5 else lows[0]
-        resistance = sum(highs[:5]) / 5 if len(highs) >= 5 else highs[0]
+        support = float(lows[:5].mean()) if len(lows) >= 5 else float(lows[0])
+        resistance = float(highs[:5].mean()) if len(highs) >= 5 else float(highs[0])
         return round(support, 2), round(resistance, 2)
     except:
         return 0, 0
 # เพิ่มใน services/yahoo_finance.py
 def calculate_bollinger_bands(prices, period=20, std_dev=2):
-    """คำนวณเส้นกรอบ Bollinger Bands"""
-    import numpy as np
-    
+    """คำนวณเส้นกรอบ Bollinger Bands (ค่าที่ยังไม่มีข้อมูลเป็น '-' สำหรับ ECharts)"""
     if len(prices) < period:
         return [], [], []
-    
-    series = pd.Series(prices)
-    sma = series.rolling(window=period).mean()
-    std = series.rolling(window=period).std()
-    
-    upper = sma + (std * std_dev)
-    lower = sma - (std * std_dev)
-    
-    return round(upper, 2).tolist(), round(sma, 2).tolist(), round(lower, 2).tolist()
+    upper, mid, lower = indicators.bollinger(prices, period, std_dev)
+    return (
+        indicators.to_list(upper, 2, '-'),
+        indicators.to_list(mid, 2, '-'),
+        indicators.to_list(lower, 2, '-'),
+    )
 
 
 def calculate_rsi_series(closes: list, period: int = 14) -> list:
     """คำนวณ RSI ทั้ง series สำหรับวาดกราฟ"""
-    n = len(closes)
-    if n < period + 1:
-        return ['-'] * n
-    result = ['-'] * period
-    gains, losses = [], []
-    for i in range(1, n):
-        d = closes[i] - closes[i - 1]
-        gains.append(max(d, 0.0))
-        losses.append(abs(min(d, 0.0)))
-    avg_gain = sum(gains[:period]) / period
-    avg_loss = sum(losses[:period]) / period
-    # First RSI at index=period
-    if avg_loss == 0:
-        result.append(100.0)
-    else:
-        rs = avg_gain / avg_loss
-        result.append(round(100 - 100 / (1 + rs), 2))
-    # Subsequent RSIs
-    for i in range(period, n - 1):
-        avg_gain = (avg_gain * (period - 1) + gains[i]) / period
-        avg_loss = (avg_loss * (period - 1) + losses[i]) / period
-        if avg_loss == 0:
-            result.append(100.0)
-        else:
-            rs = avg_gain / avg_loss
-            result.append(round(100 - 100 / (1 + rs), 2))
-    return result
+    return indicators.to_list(indicators.rsi(closes, period), 2, '-')
 
 
 def calculate_macd_series(closes: list, fast: int = 12, slow: int = 26, signal: int = 9):
     """คำนวณ MACD line, Signal line, Histogram สำหรับวาดกราฟ"""
-    def _ema(data, period):
-        k = 2 / (period + 1)
-        ema_vals = [data[0]]
-        for v in data[1:]:
-            ema_vals.append(v * k + ema_vals[-1] * (1 - k))
-        return ema_vals
-
-    if len(closes) < slow + signal:
-        empty = ['-'] * len(closes)
-        return empty, empty, empty
-
-    fast_ema = _ema(closes, fast)
-    slow_ema = _ema(closes, slow)
-    macd_line = [round(f - s, 4) for f, s in zip(fast_ema, slow_ema)]
-    signal_line_raw = _ema(macd_line[slow - 1:], signal)
-    pad = ['-'] * (slow - 1)
-    signal_line = pad + [round(v, 4) for v in signal_line_raw]
-    hist_pad = ['-'] * (slow + signal - 2)
-    histogram = hist_pad + [
-        round(macd_line[slow - 1 + i] - signal_line_raw[i], 4)
-        for i in range(len(signal_line_raw))
-    ]
-    macd_padded = ['-'] * (slow - 1) + macd_line[slow - 1:]
-    return macd_padded, signal_line, histogram
+    line, sig, hist = indicators.macd(closes, fast, slow, signal)
+    return (
+        indicators.to_list(line, 4, '-'),
+        indicators.to_list(sig, 4, '-'),
+        indicators.to_list(hist, 4, '-'),
+    )
 
 
 # ==========================================
@@ -907,7 +816,7 @@ def get_real_fear_and_greed():
     url = "https://production.dataviz.cnn.io/index/fearandgreed/graphdata"
     headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
     try:
-        res = requests.get(url, headers=headers, timeout=5)
+        res = http_client.get(url, headers=headers, timeout=5)
         data = res.json()
         score = int(data['fear_and_greed']['score'])
         rating = data['fear_and_greed']['rating']
@@ -928,19 +837,17 @@ def get_analyst_target(ticker):
     except:
         return 0.0, 0.0
 
-_SIMPLE_SECTOR_CACHE: dict = {'data': [], 'ts': 0.0}
-
 def get_real_sector_rotation():
     """เช็คกระแสเงินไหลเข้า Sector ผ่าน ETF ของจริง (cached 5 min)"""
-    now = time.time()
-    if _SIMPLE_SECTOR_CACHE['data'] and (now - _SIMPLE_SECTOR_CACHE['ts']) < 300:
-        return _SIMPLE_SECTOR_CACHE['data']
+    cached = market_cache.get(SIMPLE_SECTOR_NS, 'default')
+    if cached:
+        return cached
 
     sectors = {'Tech': 'XLK', 'Health': 'XLV', 'Finance': 'XLF', 'Energy': 'XLE', 'Consumer': 'XLY'}
     syms = list(sectors.values())
     rotation = []
     try:
-        data = yf.download(syms, period="5d", interval="1d", progress=False, ignore_tz=True)
+        data = _download(syms, period="5d", interval="1d", progress=False, ignore_tz=True)
         for name, sym in sectors.items():
             try:
                 if isinstance(data.columns, pd.MultiIndex):
@@ -953,11 +860,10 @@ def get_real_sector_rotation():
             except:
                 continue
     except:
-        return _SIMPLE_SECTOR_CACHE.get('data', [])
+        return market_cache.peek(SIMPLE_SECTOR_NS, 'default', [])
 
     rotation.sort(key=lambda x: x['flow_pct'], reverse=True)
-    _SIMPLE_SECTOR_CACHE['data'] = rotation
-    _SIMPLE_SECTOR_CACHE['ts'] = now
+    market_cache.set(SIMPLE_SECTOR_NS, 'default', rotation)
     return rotation
 
 
@@ -1032,7 +938,7 @@ def get_real_drip_backtest(ticker: str, years: int = 10, initial_capital: float
 
     try:
         period = 'max' if years >= 50 else f'{years}y'
-        hist = yf.Ticker(symbol).history(period=period, interval='1mo', auto_adjust=False)
+        hist = ohlcv_store.get(symbol, '1mo', period, adjusted=False).frame()
         if hist.empty or len(hist) < 2:
             return None
         hist = hist.dropna(subset=['Close'])
@@ -1114,13 +1020,12 @@ def get_real_drip_backtest(ticker: str, years: int = 10, initial_capital: float
         return None
 
 
-_SECTOR_ROTATION_CACHE: dict = {'data': [], 'ts': 0.0}
-_SECTOR_ROTATION_TTL = 300  # 5 minutes
-
 def get_real_sector_rotation(window: str = '1mo', sector_map=None):
-    now = time.time()
-    if _SECTOR_ROTATION_CACHE['data'] and (now - _SECTOR_ROTATION_CACHE['ts']) < _SECTOR_ROTATION_TTL:
-        return _SECTOR_ROTATION_CACHE['data']
+    # Keyed by window + custom map so different windows no longer share one slot
+    cache_key = f"{window}|{','.join(sorted((sector_map or {}).values()))}"
+    cached = market_cache.get(SECTOR_ROTATION_NS, cache_key)
+    if cached:
+        return cached
 
     sectors = sector_map or {
         'Technology': 'XLK',
@@ -1139,9 +1044,9 @@ def get_real_sector_rotation(window: str = '1mo', sector_map=None):
     # Batch download all sector ETFs at once
     syms = list(sectors.values())
     try:
-        data = yf.download(syms, period=window, interval='1d', progress=False, ignore_tz=True)
+        data = _download(syms, period=window, interval='1d', progress=False, ignore_tz=True)
     except Exception:
-        return _SECTOR_ROTATION_CACHE.get('data', [])
+        return market_cache.peek(SECTOR_ROTATION_NS, cache_key, [])
 
     result = []
     for name, sym in sectors.items():
@@ -1167,6 +1072,5 @@ def get_real_sector_rotation(window: str = '1mo', sector_map=None):
     for i, item in enumerate(result, start=1):
         item['rank'] = i
 
-    _SECTOR_ROTATION_CACHE['data'] = result
-    _SECTOR_ROTATION_CACHE['ts'] = now
+    market_cache.set(SECTOR_ROTATION_NS, cache_key, result)
     return result
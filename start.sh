@@ -8,6 +8,9 @@ echo "=== Starting Apexify ==="
 echo "Main port: $PORT (Nginx → Frontend + API)"
 echo "API internal port: $API_PORT"
 
+# Workers share one private cache file so they don't duplicate upstream fetches
+export SHARED_CACHE_BACKEND="${SHARED_CACHE_BACKEND:-sqlite}"
+
 # Start FastAPI backend (internal, not exposed directly)
 uvicorn api.main:app \
   --host 127.0.0.1 \
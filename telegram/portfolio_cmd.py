@@ -1,6 +1,7 @@
 from core.database import db
 from core.models import get_user_by_telegram, get_portfolio
-from services.yahoo_finance import get_live_price
+from services.portfolio_valuator import portfolio_valuator
+from services.yahoo_finance import batch_get_prices
 
 def register_portfolio_handlers(bot):
     
@@ -22,32 +23,24 @@ def register_portfolio_handlers(bot):
                 return
             
             msg = f"📊 **สรุปพอร์ตการลงทุนของคุณ** 📊\n\n"
-            total_invested, current_value = 0, 0
+            prices = batch_get_prices([item['ticker'] for item in portfolio])
+            val = portfolio_valuator.value(portfolio, prices)
             
-            for item in portfolio:
-                ticker = item['ticker']
-                shares = float(item['shares'])
-                avg_cost = float(item['avg_cost'])
+            for item, ticker, shares, avg_cost, live_price, profit, profit_pct in zip(
+                portfolio, val.tickers, val.shares.tolist(), val.avg_cost.tolist(),
+                val.price.tolist(), val.pnl.tolist(), val.pnl_pct.tolist(),
+            ):
                 group = item.get('asset_group', 'ALL')
-                
-                live_price = get_live_price(ticker)
-                
-                invested = shares * avg_cost
-                current = shares * live_price
-                profit = current - invested
-                profit_pct = (profit / invested * 100) if invested > 0 else 0
-                
-                total_invested += invested
-                current_value += current
-                
                 icon = "🟢" if profit >= 0 else "🔴"
                 msg += f"{icon} **{ticker}** `[{group}]`\n"
                 msg += f"   • จำนวน: {shares:,.4f} หุ้น\n"
                 msg += f"   • ทุนเฉลี่ย: ${avg_cost:,.2f} | ล่าสุด: ${live_price:,.2f}\n"
                 msg += f"   • กำไร: ${profit:,.2f} ({profit_pct:+.2f}%)\n\n"
             
-            total_profit = current_value - total_invested
-            total_profit_pct = (total_profit / total_invested * 100) if total_invested > 0 else 0
+            current_value = val.totals['total_value']
+            total_invested = val.totals['total_cost']
+            total_profit = val.totals['total_pnl']
+            total_profit_pct = val.totals['total_pnl_pct']
             total_icon = "🟢" if total_profit >= 0 else "🔴"
             
             msg += f"====================\n"
@@ -1,9 +1,11 @@
 from nicegui import ui, app
 from core.models import get_user_by_telegram
 from web.i18n import tr
-from services.yahoo_finance import calculate_bollinger_bands, calculate_rsi_series, calculate_macd_series
-import yfinance as yf
-import pandas as pd
+from services import chart_payload
+from services.yahoo_finance import get_chart_series
+
+# จำนวนแท่งสูงสุดที่ส่งไปวาด (ช่วงยาวจะถูกรวมแท่งแบบ OHLC)
+CHART_POINTS = 1500
 
 
 async def show_candlestick_chart(ticker: str):
@@ -26,26 +28,20 @@ async def show_candlestick_chart(ticker: str):
         'raw_data': None,
     }
 
+    # คำนวณอินดิเคเตอร์ทั้งหมดตอนโหลดข้อมูล (tracker คำนวณเฉพาะแท่งใหม่) — toggle RSI/MACD ไม่ต้องคำนวณซ้ำ
+    chart_specs = ['sma:9', 'sma:20', 'bollinger', 'rsi', 'macd']
+
     def fetch_dynamic_data(symbol, period, interval):
+        """Columnar payload (t/o/h/l/c/v + indicator lines) ลดจำนวนแท่งเหลือไม่เกิน CHART_POINTS"""
         try:
-            data = yf.download(symbol, period=period, interval=interval, progress=False)
-            if data.empty:
-                return []
-            if isinstance(data.columns, pd.MultiIndex):
-                data = data.xs(symbol, level=1, axis=1)
-            ohlc = []
-            for index, row in data.iterrows():
-                ohlc.append({
-                    'date': index.strftime('%Y-%m-%d'),
-                    'open': float(row['Open']),
-                    'high': float(row['High']),
-                    'low': float(row['Low']),
-                    'close': float(row['Close']),
-                    'volume': int(row['Volume']),
-                })
-            return ohlc
+            bars, values = get_chart_series(symbol, period, interval, chart_specs)
         except Exception:
-            return []
+            return None
+        if bars.empty:
+            return None
+        payload = chart_payload.to_columnar(*chart_payload.build_columns(bars, values, CHART_POINTS))
+        payload['dates'] = chart_payload.date_labels(payload['t'])
+        return payload
 
     try:
         with ui.dialog() as dialog, ui.card().classes(
@@ -155,22 +151,17 @@ async def show_candlestick_chart(ticker: str):
                     show_macd = state['show_macd']
                     n_extra = (1 if show_rsi else 0) + (1 if show_macd else 0)
 
-                    dates = [d['date'] for d in raw_data]
-                    k_data = [[d['open'], d['close'], d['low'], d['high']] for d in raw_data]
-                    closes = [d['close'] for d in raw_data]
+                    dates = raw_data['dates']
+                    k_data = [list(bar) for bar in zip(raw_data['o'], raw_data['c'], raw_data['l'], raw_data['h'])]
 
-                    # MA 9/20
-                    ma9, ma20 = [], []
-                    for i in range(len(k_data)):
-                        ma9.append(round(sum([x[1] for x in k_data[i - 8:i + 1]]) / 9, 2) if i >= 8 else '-')
-                        ma20.append(round(sum([x[1] for x in k_data[i - 19:i + 1]]) / 20, 2) if i >= 19 else '-')
+                    lines = raw_data['indicators']
+                    ma9, ma20 = lines['sma:9'], lines['sma:20']
+                    bb_upper, bb_lower = lines['bb_upper'], lines['bb_lower']
 
-                    bb_upper, _, bb_lower = calculate_bollinger_bands(closes)
-
-                    volumes = []
-                    for d in raw_data:
-                        color = '#32D74B' if d['close'] >= d['open'] else '#FF453A'
-                        volumes.append({'value': d['volume'], 'itemStyle': {'color': color, 'opacity': 0.7}})
+                    volumes = [
+                        {'value': v, 'itemStyle': {'color': '#32D74B' if c >= o else '#FF453A', 'opacity': 0.7}}
+                        for v, o, c in zip(raw_data['v'], raw_data['o'], raw_data['c'])
+                    ]
 
                     # ── Grid layout positions ─────────────────────────────────
                     extra1_top = extra_h = extra2_top = '0%'
@@ -284,7 +275,7 @@ async def show_candlestick_chart(ticker: str):
 
                     # ── RSI panel ──────────────────────────────────────────────
                     if show_rsi:
-                        rsi_series_data = calculate_rsi_series(closes)
+                        rsi_series_data = lines['rsi']
                         rsi_grid_idx = len(grids)
                         grids.append({'left': '2%', 'right': '6%', 'top': extra1_top, 'height': extra_h})
                         all_x_indices.append(rsi_grid_idx)
@@ -337,7 +328,7 @@ async def show_candlestick_chart(ticker: str):
 
                     # ── MACD panel ─────────────────────────────────────────────
                     if show_macd:
-                        macd_line_data, signal_data, hist_data = calculate_macd_series(closes)
+                        macd_line_data, signal_data, hist_data = lines['macd'], lines['macd_signal'], lines['macd_hist']
                         macd_grid_idx = len(grids)
                         macd_top = extra1_top if not show_rsi else extra2_top
                         grids.append({'left': '2%', 'right': '6%', 'top': macd_top, 'height': extra_h})
@@ -0,0 +1,37 @@
+from typing import Awaitable, Callable, Iterable
+
+from nicegui import ui
+
+from services.price_hub import Subscription, price_hub
+
+# How often an idle pump re-checks whether its page is still open
+_IDLE_CHECK_SECONDS = 30.0
+
+
+def stream_prices(tickers: Iterable[str], on_change: Callable[[dict], Awaitable[None]], anchor=None) -> Subscription:
+    """Push changed prices of ``tickers`` from the central price hub into this page.
+
+    ``on_change({ticker: price})`` runs in the page's UI context whenever the
+    hub publishes new prices for any of them — instead of a per-client timer.
+    The pump ends (and unsubscribes) once ``anchor`` (default: a hidden
+    element created here) is deleted with its page.
+    """
+    anchor = anchor if anchor is not None else ui.element('div').classes('hidden')
+    sub = price_hub.subscribe(tickers)
+
+    async def pump():
+        client = anchor.client
+        try:
+            while not anchor.is_deleted and not sub.closed:
+                changes = await sub.get(timeout=_IDLE_CHECK_SECONDS)
+                if not changes or anchor.is_deleted or not client.has_socket_connection:
+                    continue
+                try:
+                    await on_change(changes)
+                except Exception as e:
+                    print(f"[PriceStream] update failed: {e}")
+        finally:
+            sub.close()
+
+    ui.timer(0.1, pump, once=True)
+    return sub
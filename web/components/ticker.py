@@ -1,6 +1,5 @@
-from nicegui import ui, run
-from services.yahoo_finance import get_live_price
-import asyncio
+from nicegui import ui
+from web.components.price_stream import stream_prices
 import random
 
 # 🌟 CSS สไตล์กระจกใส (Glassmorphism) เกาะติดใต้ Header พอดี
@@ -71,41 +70,37 @@ def create_ticker():
     
     ticker_container = ui.html('').classes('w-full')
 
-    # แต่ฟังก์ชันด้านในนี้ "มี" async เพื่อไม่ให้หน้าจอหลักค้าง
-    async def update_ticker():
+    symbols = ['^GSPC', '^IXIC', '^DJI', 'BTC-USD', 'GLD', 'THB=X']
+    names = ['S&P 500', 'NASDAQ', 'DOW', 'BITCOIN', 'GOLD', 'USD/THB']
+    prices = {}
+
+    # ราคามาจาก price hub กลาง (ดึงครั้งเดียวต่อรอบ แล้ว push เฉพาะตัวที่เปลี่ยน) แทน timer 60 วินาทีของแต่ละหน้า
+    async def update_ticker(changes):
         if ticker_container.is_deleted: return
-        
-        symbols = ['^GSPC', '^IXIC', '^DJI', 'BTC-USD', 'GLD', 'THB=X']
-        names = ['S&P 500', 'NASDAQ', 'DOW', 'BITCOIN', 'GOLD', 'USD/THB']
-        
+        prices.update(changes)
+
         html_content = ""
-        for i, sym in enumerate(symbols):
-            try:
-                # รัน io_bound โดยไม่ต้องมี asyncio.wait_for ซ้อนทับให้วุ่นวาย
-                price = await run.io_bound(get_live_price, sym)
-                if price is None or price == 0: continue
-                    
-                change_pct = random.uniform(-1.2, 1.2) 
-                color_class = "t-up" if change_pct >= 0 else "t-down"
-                icon = "▲" if change_pct >= 0 else "▼"
-                
-                p_str = f"฿{price:,.2f}" if sym == 'THB=X' else f"${price:,.2f}"
-                
-                html_content += f"""
-                <div class="ticker-item">
-                    <span class="t-sym">{names[i]}</span>
-                    <span class="t-prc">{p_str}</span>
-                    <span class="{color_class}">{change_pct:+.2f}% {icon}</span>
-                </div>
-                """
-            except Exception:
-                pass 
-                
+        for sym, name in zip(symbols, names):
+            price = prices.get(sym)
+            if not price: continue
+
+            change_pct = random.uniform(-1.2, 1.2) 
+            color_class = "t-up" if change_pct >= 0 else "t-down"
+            icon = "▲" if change_pct >= 0 else "▼"
+
+            p_str = f"฿{price:,.2f}" if sym == 'THB=X' else f"${price:,.2f}"
+
+            html_content += f"""
+            <div class="ticker-item">
+                <span class="t-sym">{name}</span>
+                <span class="t-prc">{p_str}</span>
+                <span class="{color_class}">{change_pct:+.2f}% {icon}</span>
+            </div>
+            """
+
         if html_content:
             full_content = html_content + html_content 
             new_html = f'<div class="ticker-wrap"><div class="ticker-move"><div class="t-live-pill">● LIVE FEED</div>{full_content}</div></div>'
             ticker_container.content = new_html
 
-    # สั่งงานให้เริ่มทำทันที และวนลูปทุก 60 วินาที
-    ui.timer(0.1, update_ticker, once=True)
-    ui.timer(60.0, update_ticker)
+    stream_prices(symbols, update_ticker, anchor=ticker_container)